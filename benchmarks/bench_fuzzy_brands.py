@@ -0,0 +1,97 @@
+# benchmarks/bench_fuzzy_brands.py
+# Times fuzzy brand suggestions (n-gram shortlist + alignment) against an all-pairs scan.
+# Run from the project root: python -m benchmarks.bench_fuzzy_brands
+
+import random
+import string
+import time
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from benchmarks.fixtures import FILLER_WORDS, make_brand_map
+from src.brand_matcher import BrandMatcher
+from src.fuzzy_brands import FuzzyBrandIndex, normalize_text
+
+EXTRA_BRAND_COUNTS = [1_000, 10_000, 30_000]
+N_TITLES = 2_000
+ALL_PAIRS_SAMPLE = 20  # titles timed with the all-pairs scan, extrapolated to N_TITLES
+
+
+def misspell(brand, rng):
+    """One random edit (drop, double, swap or replace a letter) inside the brand."""
+    chars = list(brand)
+    i = rng.randrange(1, len(chars)) if len(chars) > 1 else 0
+    edit = rng.choice(['drop', 'double', 'swap', 'replace'])
+    if edit == 'drop' and len(chars) > 4:
+        del chars[i]
+    elif edit == 'double':
+        chars.insert(i, chars[i])
+    elif edit == 'swap' and i > 0:
+        chars[i - 1], chars[i] = chars[i], chars[i - 1]
+    else:
+        chars[i] = rng.choice(string.ascii_lowercase)
+    return ''.join(chars)
+
+
+def make_unmapped_titles(brands, n_titles, rng):
+    """Titles holding a misspelled brand; returns (titles, intended brand per title)."""
+    targets = rng.choices([b for b in brands if len(b) >= 5], k=n_titles)
+    titles = []
+    for brand in targets:
+        words = rng.choices(FILLER_WORDS, k=rng.randint(1, 3))
+        words.insert(rng.randint(0, len(words)), misspell(brand, rng))
+        titles.append(' '.join(words))
+    return titles, targets
+
+
+def all_pairs_best(title, names):
+    """Reference: best whole-title-window ratio over every brand (what the index avoids)."""
+    text = normalize_text(title)
+    words = text.split()
+    best, best_name = 0.0, None
+    for name in names:
+        target = name.replace(' ', '')
+        for word in words:
+            ratio = SequenceMatcher(None, word, target).ratio()
+            if ratio > best:
+                best, best_name = ratio, name
+    return best_name
+
+
+def run():
+    rng = random.Random(7)
+    results = []
+    for extra in EXTRA_BRAND_COUNTS:
+        matcher = BrandMatcher(make_brand_map(extra, rng))
+        brands = matcher.lookup['BrandName'].tolist()
+        titles, targets = make_unmapped_titles(brands, N_TITLES, rng)
+
+        t0 = time.perf_counter()
+        index = FuzzyBrandIndex(matcher.lookup)
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        suggestions = index.suggest(titles, top_k=1)
+        suggest_s = time.perf_counter() - t0
+        top = suggestions.set_index('Advertiser_Product_Title')['BrandName']
+        hits = sum(top.get(title) == target for title, target in zip(titles, targets))
+
+        names = [normalize_text(b) for b in brands]
+        t0 = time.perf_counter()
+        for title in titles[:ALL_PAIRS_SAMPLE]:
+            all_pairs_best(title, names)
+        all_pairs_s = (time.perf_counter() - t0) / ALL_PAIRS_SAMPLE * N_TITLES
+
+        results.append({
+            'Brands': len(brands), 'Titles': N_TITLES, 'Build_s': round(build_s, 3),
+            'Suggest_s': round(suggest_s, 3), 'AllPairs_s(est)': round(all_pairs_s, 1),
+            'Speedup': round(all_pairs_s / suggest_s, 1), 'Recall@1': round(hits / N_TITLES, 3),
+            'Resolved': round(suggestions['Advertiser_Product_Title'].nunique() / N_TITLES, 3),
+        })
+        print(results[-1])
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(run().to_string(index=False))
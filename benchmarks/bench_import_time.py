@@ -0,0 +1,64 @@
+# benchmarks/bench_import_time.py
+# Cold-start cost of the package, the CLI and each module, each in a fresh interpreter.
+# Run from the project root: python -m benchmarks.bench_import_time
+
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+REPEATS = 5
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'lxml', 'bs4', 'requests', 'pytrends']
+TARGETS = [
+    ('python -m src --help', ['-m', 'src', '--help']),
+    ('import src', ['-c', 'import src']),
+    ('python -m src map --help', ['-m', 'src', 'map', '--help']),
+    ('python -m src trends --help', ['-m', 'src', 'trends', '--help']),
+    ('python -m src report --help', ['-m', 'src', 'report', '--help']),
+    ('python -m src pipeline --help', ['-m', 'src', 'pipeline', '--help']),
+    ('python -m src panel --window 1 (bad args)', ['-m', 'src', 'panel', '--window', '1']),
+    ('import src.brand_matcher', ['-c', 'import src.brand_matcher']),
+    ('import src.check_mapping_progress', ['-c', 'import src.check_mapping_progress']),
+    ('import src.fetch_trends', ['-c', 'import src.fetch_trends']),
+    ('import src.data_acquisition', ['-c', 'import src.data_acquisition']),
+    ('import src.event_study', ['-c', 'import src.event_study']),
+]
+# Appended to every run: report which heavy third-party modules ended up loaded
+REPORT = ("import sys; print('\\nLOADED=' + ','.join(m for m in {heavy!r} if m in sys.modules), file=sys.stderr)")
+
+
+def time_target(args):
+    """Best-of-REPEATS wall time (s) for a fresh interpreter, plus the heavy modules it loaded."""
+    if args[0] == '-c':
+        args = ['-c', args[1] + '; ' + REPORT.format(heavy=HEAVY_MODULES)]
+    else:
+        # Run the module through runpy so the loaded-modules report still gets printed
+        args = ['-c', f"import runpy, sys; sys.argv = {args[1:]!r}\n"
+                      f"try:\n    runpy.run_module({args[1]!r}, run_name='__main__', alter_sys=True)\n"
+                      f"except SystemExit:\n    pass\n" + REPORT.format(heavy=HEAVY_MODULES)]
+    best, loaded = float('inf'), ''
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, *args], capture_output=True, text=True)
+        best = min(best, time.perf_counter() - t0)
+        if proc.returncode:
+            raise RuntimeError(proc.stderr)
+        loaded = proc.stderr.rsplit('LOADED=', 1)[-1].strip()
+    return best, loaded
+
+
+def run():
+    baseline, _ = time_target(['-c', 'pass'])
+    print(f"Bare interpreter: {baseline:.3f}s")
+    results = []
+    for label, args in TARGETS:
+        seconds, loaded = time_target(args)
+        results.append({'Target': label, 'Seconds': round(seconds, 3),
+                        'OverInterpreter_s': round(seconds - baseline, 3), 'HeavyModules': loaded or '-'})
+        print(results[-1])
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(run().to_string(index=False))
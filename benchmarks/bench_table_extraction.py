@@ -0,0 +1,49 @@
+# benchmarks/bench_table_extraction.py
+# Parse time and peak memory: per-table pd.read_html path vs the streaming extractor.
+# Run from the project root: python -m benchmarks.bench_table_extraction
+
+import contextlib
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.fixtures import make_wiki_page
+from src.data_acquisition import extract_with_read_html
+from src.table_extractor import extract_commercials
+
+YEAR_COUNTS = [10, 60, 300]
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # silence the read_html path's progress prints
+        result = func(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def run():
+    results = []
+    for n_years in YEAR_COUNTS:
+        page_html = make_wiki_page(n_years)
+        legacy_df, legacy_s, legacy_mb = measure(extract_with_read_html, page_html)
+        stream_df, stream_s, stream_mb = measure(extract_commercials, page_html)
+        same = legacy_df.to_csv(index=False) == stream_df.to_csv(index=False)
+        results.append({
+            'Years': n_years, 'Rows': len(stream_df), 'Page_MB': round(len(page_html) / 2**20, 2),
+            'ReadHtml_s': round(legacy_s, 3), 'Stream_s': round(stream_s, 3),
+            'Speedup': round(legacy_s / stream_s, 1),
+            'ReadHtml_peak_MB': round(legacy_mb, 1), 'Stream_peak_MB': round(stream_mb, 1),
+            'Same_output': same,
+        })
+        print(results[-1])
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(run().to_string(index=False))
@@ -0,0 +1,97 @@
+# benchmarks/fixtures.py
+# Synthetic, scalable inputs shared by the benchmark scripts and the suite.
+
+import random
+import string
+
+import numpy as np
+import pandas as pd
+
+from src.trends_normalization import ANCHOR_KEYWORD
+
+TICKER_MAP_PATH = 'data/raw/advertiser_ticker_mapping.csv'
+ROWS_PER_TABLE = 40
+BRANDS = ['Budweiser', 'Bud Light', 'Pepsi', 'Doritos', 'Coca-Cola', 'Toyota', 'Kia', "M&M's", 'GoDaddy', 'Tide']
+FILLER_WORDS = ['super', 'bowl', 'ad', 'commercial', 'the', 'new', 'big', 'game', 'spot', 'halftime']
+
+
+def make_wiki_page(n_years, rows_per_table=ROWS_PER_TABLE, seed=0):
+    """Wikipedia-like page: decade H2s, year H3s and one wikitable (with rowspans) per year."""
+    rng = random.Random(seed)
+    parts = ['<html><body><div id="mw-content-text"><div class="mw-parser-output">']
+    for i in range(n_years):
+        year = 1967 + i
+        if i == 0 or year % 10 == 0:
+            decade = year - year % 10
+            parts.append(f'<div class="mw-heading mw-heading2"><h2 id="{decade}s">{decade}s</h2></div>')
+        parts.append(f'<div class="mw-heading mw-heading3"><h3>{year} (<a href="#">{i + 1}</a>)</h3></div>')
+        parts.append('<table class="wikitable sortable"><tbody>'
+                     '<tr><th>Product type</th><th>Product/title</th><th>Title</th><th>Plot/notes</th></tr>')
+        for r in range(rows_per_table):
+            product_type = f'<td rowspan="2">Type {r}</td>' if r % 2 == 0 else ''
+            parts.append(f'<tr>{product_type}<td><a href="/wiki/x">{rng.choice(BRANDS)}</a> Spot {r}</td>'
+                         f'<td>"Ad {year}-{r}"</td><td>Notes for ad {r}.<sup>[{r}]</sup></td></tr>')
+        parts.append('</tbody></table>')
+    parts.append('<div class="mw-heading mw-heading2"><h2>See also</h2></div></div></div></body></html>')
+    return '\n'.join(parts)
+
+
+def make_brand_map(extra_brands, rng):
+    """Real ticker map plus `extra_brands` random synthetic brands."""
+    ticker_map_df = pd.read_csv(TICKER_MAP_PATH)
+    fake = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))).title()
+            for _ in range(extra_brands)]
+    extra = pd.DataFrame({'BrandName': fake, 'StockTicker': 'FAKE', 'ParentCompany': 'Synthetic Co.'})
+    return pd.concat([ticker_map_df, extra], ignore_index=True)
+
+
+def make_sized_brand_map(n_brands, rng):
+    """Brand map with about n_brands rows: the real map topped up (or cut down) to size."""
+    real = pd.read_csv(TICKER_MAP_PATH)
+    if n_brands <= len(real):
+        return real.head(n_brands).reset_index(drop=True)
+    return make_brand_map(n_brands - len(real), rng)
+
+
+def make_titles(ticker_map_df, n_rows, rng):
+    """Ad titles in which roughly two thirds contain a known brand."""
+    brands = ticker_map_df['BrandName'].dropna().tolist()
+    titles = []
+    for _ in range(n_rows):
+        words = rng.choices(FILLER_WORDS, k=rng.randint(1, 4))
+        if rng.random() < 0.66:
+            words.insert(rng.randint(0, len(words)), rng.choice(brands))
+        titles.append(' '.join(words))
+    return pd.Series(titles)
+
+
+def make_trends_batches(n_keywords, n_days=61, batch_size=5, anchor=ANCHOR_KEYWORD, seed=0):
+    """
+    Trends-like batch frames: each holds batch_size-1 keywords plus the anchor,
+    scaled 0-100 within the batch (as Google returns them), with an isPartial column.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-12', periods=n_days, freq='D', name='date')
+    anchor_curve = rng.gamma(4.0, 5.0, n_days)
+    keywords = [f'brand_{i:06d}' for i in range(n_keywords)]
+    frames = []
+    for start in range(0, n_keywords, batch_size - 1):
+        names = keywords[start:start + batch_size - 1]
+        raw = np.column_stack([rng.gamma(2.0, 10.0, (n_days, len(names))), anchor_curve])
+        values = np.rint(raw / raw.max() * 100)
+        frame = pd.DataFrame(values, index=dates, columns=names + [anchor])
+        frame['isPartial'] = False
+        frames.append(frame)
+    return frames
+
+
+def make_trends_panel(path, n_years, n_keywords, geos=('US', 'GB', 'CA'), seed=0):
+    """Trends panel at `path` with every cell filled (years from 2004 on), written one year at a time."""
+    from src.trends_panel import TrendsPanel
+    rng = np.random.default_rng(seed)
+    panel = TrendsPanel.create(path, years=range(2004, 2004 + n_years),
+                               keywords=[f'brand_{i:06d}' for i in range(n_keywords)], geos=geos)
+    for y in range(n_years):
+        panel.values[y] = np.rint(rng.gamma(2.0, 10.0, panel.shape[1:])).clip(0, 100)
+    panel.values.flush()
+    return panel
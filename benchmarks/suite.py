@@ -0,0 +1,293 @@
+# benchmarks/suite.py
+# Benchmark suite over synthetic fixtures of growing size: time, throughput and peak
+# memory per (benchmark, size), saved as JSON and optionally checked against a baseline.
+# Run from the project root: python -m benchmarks.suite [--tier quick|default|full] [--compare BASELINE.json]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import (make_sized_brand_map, make_titles, make_trends_batches, make_trends_panel,
+                                 make_wiki_page)
+from src.brand_matcher import BrandMatcher, build_brand_lookups, get_primary_advertiser_final
+from src.data_acquisition import extract_with_read_html
+from src.fetch_trends import concat_batches
+from src.table_extractor import extract_commercials
+from src.trends_lift import cube_from_panel, trends_lift
+from src.trends_normalization import normalize_batches
+
+RESULTS_DIR = 'benchmarks/results'
+PANEL_QUERY_BRANDS = 20
+REPEATS = 3
+SLOW_RUN_S = 2.0          # after a run this slow, stop repeating
+TIME_TOLERANCE = 0.25     # slower than baseline by more than this share = regression
+MEMORY_TOLERANCE = 0.10
+MIN_TIME_DELTA_S = 0.005  # differences below this are timer noise
+MIN_MEMORY_DELTA_MB = 1.0
+
+
+# --- Fixtures (built once per size and shared between benchmarks) ---
+@lru_cache(maxsize=None)
+def wiki_page(n_years):
+    return make_wiki_page(n_years)
+
+
+@lru_cache(maxsize=None)
+def brand_map(n_brands):
+    return make_sized_brand_map(n_brands, random.Random(n_brands))
+
+
+@lru_cache(maxsize=None)
+def titles(n_rows, n_brands):
+    return make_titles(brand_map(n_brands), n_rows, random.Random(n_rows * 7 + n_brands))
+
+
+@lru_cache(maxsize=None)
+def brand_matcher(n_brands):
+    return BrandMatcher(brand_map(n_brands))
+
+
+@lru_cache(maxsize=None)
+def trends_batches(n_keywords):
+    return tuple(make_trends_batches(n_keywords))
+
+
+_panel_dirs = []  # TemporaryDirectory per cached panel, removed by cleanup_fixtures()
+
+
+@lru_cache(maxsize=None)
+def trends_panel(n_years, n_keywords):
+    panel_dir = tempfile.TemporaryDirectory(prefix='bench_trends_panel_')
+    _panel_dirs.append(panel_dir)
+    return make_trends_panel(os.path.join(panel_dir.name, 'panel'), n_years, n_keywords)
+
+
+def cleanup_fixtures():
+    """Drops the cached on-disk fixtures (full-tier panels are hundreds of MB)."""
+    trends_panel.cache_clear()
+    while _panel_dirs:
+        _panel_dirs.pop().cleanup()
+
+
+def _panel_query_setup(n_years, n_keywords):
+    panel = trends_panel(n_years, n_keywords)
+    brands = random.Random(n_keywords).sample(panel.keywords, PANEL_QUERY_BRANDS)
+    return panel, brands
+
+
+def _lift_setup(n_events, n_keywords):
+    panel = trends_panel(22, n_keywords)
+    rng = np.random.default_rng(n_events)
+    events = pd.DataFrame({'Primary_Advertiser': np.array(panel.keywords)[rng.integers(0, n_keywords, n_events)],
+                           'Year': np.array(panel.years)[rng.integers(0, len(panel.years), n_events)],
+                           'NumAds': 1})
+    return events, cube_from_panel(panel)
+
+
+class Benchmark:
+    """
+    One timed function. setup(**params) builds its arguments (not timed);
+    count(params, result) gives the items processed, for throughput.
+    sizes maps a tier name to the parameter sets run in that tier.
+    """
+
+    def __init__(self, name, setup, func, count, unit, sizes):
+        self.name = name
+        self.setup = setup
+        self.func = func
+        self.count = count
+        self.unit = unit
+        self.sizes = sizes
+
+
+def _loop_setup(n_rows, n_brands):
+    original_case_map, known_brands_sorted = build_brand_lookups(brand_map(n_brands))
+    return titles(n_rows, n_brands), known_brands_sorted, original_case_map
+
+
+def _loop(title_series, known_brands_sorted, original_case_map):
+    return title_series.apply(get_primary_advertiser_final, args=(known_brands_sorted, original_case_map))
+
+
+BENCHMARKS = [
+    Benchmark('extract_stream', lambda n_years: (wiki_page(n_years),), extract_commercials,
+              lambda params, result: len(result), 'rows',
+              {'quick': [{'n_years': 10}, {'n_years': 60}],
+               'default': [{'n_years': 10}, {'n_years': 60}, {'n_years': 300}],
+               'full': [{'n_years': 60}, {'n_years': 300}, {'n_years': 1_000}, {'n_years': 3_000}]}),
+    Benchmark('extract_read_html', lambda n_years: (wiki_page(n_years),), extract_with_read_html,
+              lambda params, result: len(result), 'rows',
+              {'quick': [{'n_years': 10}],
+               'default': [{'n_years': 10}, {'n_years': 60}],
+               'full': [{'n_years': 60}, {'n_years': 300}]}),
+    Benchmark('primary_advertiser_loop', _loop_setup, _loop,
+              lambda params, result: params['n_rows'], 'titles',
+              {'quick': [{'n_rows': 1_000, 'n_brands': 100}, {'n_rows': 1_000, 'n_brands': 1_000}],
+               'default': [{'n_rows': 1_000, 'n_brands': 100}, {'n_rows': 10_000, 'n_brands': 1_000},
+                           {'n_rows': 1_000, 'n_brands': 10_000}],
+               'full': [{'n_rows': 10_000, 'n_brands': 1_000}, {'n_rows': 100_000, 'n_brands': 1_000},
+                        {'n_rows': 10_000, 'n_brands': 10_000}, {'n_rows': 1_000, 'n_brands': 100_000}]}),
+    Benchmark('brand_matcher_compile', lambda n_brands: (brand_map(n_brands),), BrandMatcher,
+              lambda params, result: params['n_brands'], 'brands',
+              {'quick': [{'n_brands': 1_000}],
+               'default': [{'n_brands': 1_000}, {'n_brands': 10_000}],
+               'full': [{'n_brands': 10_000}, {'n_brands': 100_000}]}),
+    Benchmark('brand_matcher_match', lambda n_rows, n_brands: (brand_matcher(n_brands), titles(n_rows, n_brands)),
+              lambda matcher, title_series: matcher.match(title_series),
+              lambda params, result: params['n_rows'], 'titles',
+              {'quick': [{'n_rows': 1_000, 'n_brands': 100}, {'n_rows': 10_000, 'n_brands': 1_000}],
+               'default': [{'n_rows': 1_000, 'n_brands': 100}, {'n_rows': 10_000, 'n_brands': 1_000},
+                           {'n_rows': 100_000, 'n_brands': 10_000}],
+               'full': [{'n_rows': 100_000, 'n_brands': 1_000}, {'n_rows': 1_000_000, 'n_brands': 10_000},
+                        {'n_rows': 1_000_000, 'n_brands': 100_000}]}),
+    Benchmark('trends_concat', lambda n_keywords: (list(trends_batches(n_keywords)),), concat_batches,
+              lambda params, result: params['n_keywords'], 'keywords',
+              {'quick': [{'n_keywords': 100}],
+               'default': [{'n_keywords': 100}, {'n_keywords': 1_000}],
+               'full': [{'n_keywords': 1_000}, {'n_keywords': 10_000}]}),
+    Benchmark('trends_normalize', lambda n_keywords: (list(trends_batches(n_keywords)),), normalize_batches,
+              lambda params, result: params['n_keywords'], 'keywords',
+              {'quick': [{'n_keywords': 100}],
+               'default': [{'n_keywords': 100}, {'n_keywords': 1_000}],
+               'full': [{'n_keywords': 1_000}, {'n_keywords': 10_000}]}),
+    Benchmark('trends_panel_query', _panel_query_setup, lambda panel, brands: panel.query(brands),
+              lambda params, result: PANEL_QUERY_BRANDS * params['n_years'], 'windows',
+              {'quick': [{'n_years': 10, 'n_keywords': 1_000}],
+               'default': [{'n_years': 10, 'n_keywords': 1_000}, {'n_years': 22, 'n_keywords': 5_000}],
+               'full': [{'n_years': 22, 'n_keywords': 5_000}, {'n_years': 22, 'n_keywords': 20_000}]}),
+    Benchmark('trends_lift', _lift_setup, trends_lift,
+              lambda params, result: params['n_events'], 'events',
+              {'quick': [{'n_events': 10_000, 'n_keywords': 1_000}],
+               'default': [{'n_events': 10_000, 'n_keywords': 1_000}, {'n_events': 100_000, 'n_keywords': 5_000}],
+               'full': [{'n_events': 100_000, 'n_keywords': 5_000}, {'n_events': 1_000_000, 'n_keywords': 20_000}]}),
+]
+
+
+def measure(func, args, repeats=REPEATS):
+    """
+    Best and mean wall time over up to `repeats` runs, then one extra run under
+    tracemalloc for the peak of Python-visible allocations (NumPy buffers
+    included, C-library internals such as lxml's tree are not).
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):  # silence progress prints of the code under test
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            result = func(*args)
+            times.append(time.perf_counter() - t0)
+            if times[-1] > SLOW_RUN_S:
+                break
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, min(times), sum(times) / len(times), len(times), peak / 2**20
+
+
+def run_suite(tier='default', only=None, repeats=REPEATS):
+    results = []
+    for bench in BENCHMARKS:
+        if only and not any(pattern in bench.name for pattern in only):
+            continue
+        for params in bench.sizes[tier]:
+            args = bench.setup(**params)
+            result, best, mean, runs, peak_mb = measure(bench.func, args, repeats)
+            items = bench.count(params, result)
+            results.append({
+                'benchmark': bench.name, 'params': params, 'seconds': round(best, 5), 'mean_s': round(mean, 5),
+                'repeats': runs, 'items': int(items), 'unit': bench.unit,
+                'items_per_s': round(items / best, 1) if best > 0 else None, 'peak_mb': round(peak_mb, 2),
+            })
+            print(f"{bench.name:<24} {json.dumps(params):<40} {best:9.4f}s "
+                  f"{results[-1]['items_per_s'] or 0:>14,.0f} {bench.unit}/s  {peak_mb:9.1f} MB peak")
+    return {
+        'tier': tier, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+        'machine': platform.machine(), 'cpus': os.cpu_count(), 'results': results,
+    }
+
+
+def _result_key(result):
+    return result['benchmark'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(current, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Per-result ratios against a baseline run (same benchmark and params) and the
+    list of regressions: slower or more memory-hungry beyond the tolerances.
+    """
+    base = {_result_key(result): result for result in baseline['results']}
+    rows, regressions = [], []
+    for result in current['results']:
+        old = base.get(_result_key(result))
+        if old is None:
+            continue
+        time_ratio = result['seconds'] / old['seconds'] if old['seconds'] else np.nan
+        memory_ratio = result['peak_mb'] / old['peak_mb'] if old['peak_mb'] else np.nan
+        slower = (result['seconds'] > old['seconds'] * (1 + time_tolerance)
+                  and result['seconds'] - old['seconds'] > MIN_TIME_DELTA_S)
+        heavier = (result['peak_mb'] > old['peak_mb'] * (1 + memory_tolerance)
+                   and result['peak_mb'] - old['peak_mb'] > MIN_MEMORY_DELTA_MB)
+        row = {'Benchmark': result['benchmark'], 'Params': json.dumps(result['params']),
+               'Time_ratio': round(time_ratio, 2), 'Memory_ratio': round(memory_ratio, 2),
+               'Regression': ', '.join(label for label, flag in [('time', slower), ('memory', heavier)] if flag) or '-'}
+        rows.append(row)
+        if slower or heavier:
+            regressions.append(row)
+    return pd.DataFrame(rows), regressions
+
+
+def main(tier='default', only=None, repeats=REPEATS, save_path=None, compare_path=None,
+         time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Runs the suite, saves the JSON report and returns 1 if a regression was found against compare_path."""
+    print(f"--- Benchmark suite ({tier} tier) ---")
+    try:
+        report = run_suite(tier=tier, only=only, repeats=repeats)
+    finally:
+        cleanup_fixtures()
+    save_path = save_path or os.path.join(RESULTS_DIR, f"{tier}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+    with open(save_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {save_path}")
+
+    if compare_path:
+        with open(compare_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        table, regressions = compare(report, baseline, time_tolerance, memory_tolerance)
+        print(f"\n--- Compared with {compare_path} ({baseline.get('created_at')}) ---")
+        print(table.to_string(index=False) if not table.empty else "No matching benchmarks in the baseline.")
+        if regressions:
+            print(f"\n{len(regressions)} REGRESSION(S) beyond +{time_tolerance:.0%} time / +{memory_tolerance:.0%} memory.")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark extraction, brand mapping and Trends merging at scale.")
+    parser.add_argument('--tier', choices=['quick', 'default', 'full'], default='default',
+                        help="Fixture sizes: quick (CI smoke), default, full (nightly, up to 1e6 titles / 1e5 brands).")
+    parser.add_argument('--only', nargs='+', default=None, help="Run benchmarks whose name contains any of these.")
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--save', default=None, help=f"Report path (default: {RESULTS_DIR}/<tier>-<timestamp>.json).")
+    parser.add_argument('--compare', default=None, help="Baseline report to check for regressions (exit code 1).")
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args()
+    sys.exit(main(tier=args.tier, only=args.only, repeats=args.repeats, save_path=args.save,
+                  compare_path=args.compare, time_tolerance=args.time_tolerance,
+                  memory_tolerance=args.memory_tolerance))
@@ -1,8 +1,53 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
 """
-Created on Sun Apr  6 16:30:57 2025
+Super Bowl ad impact: scraping, brand mapping, Google Trends and event-study tools.
 
-@author: emmanuellopez-aparicio
+Importing the package is cheap. The names below are loaded from their
+modules on first access, so `from src import BrandMatcher` pulls in pandas
+but not the scraper (lxml, bs4, requests), pytrends or pyarrow.
+Command line: python -m src {scrape,map,trends,panel,lift,report,pipeline} [--help]
 """
 
+import importlib
+
+# public name -> module that defines it ('module:attribute' when the public name differs)
+_EXPORTS = {
+    'BrandMatcher': 'src.brand_matcher',
+    'load_brand_matcher': 'src.brand_matcher',
+    'MappingState': 'src.mapping_progress',
+    'FuzzyBrandIndex': 'src.fuzzy_brands',
+    'fetch_html': 'src.html_cache',
+    'AdSource': 'src.ad_sources',
+    'scrape_sources': 'src.ad_sources',
+    'extract_commercials': 'src.table_extractor',
+    'iter_commercial_rows': 'src.table_extractor',
+    'super_bowl_sundays': 'src.super_bowl_dates',
+    'TrendsScheduler': 'src.trends_scheduler',
+    'build_jobs': 'src.trends_scheduler',
+    'normalize_batches': 'src.trends_normalization',
+    'TrendsPanel': 'src.trends_panel',
+    'build_ad_events': 'src.trends_lift',
+    'compute_trends_lift': 'src.trends_lift:trends_lift',
+    'read_dataset': 'src.storage',
+    'write_dataset': 'src.storage',
+    'load_commercials': 'src.storage',
+    'build_events': 'src.event_study',
+    'run_event_study': 'src.event_study',
+    'significance_table': 'src.resampling',
+    'Pipeline': 'src.pipeline',
+    'Stage': 'src.pipeline',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, _, attribute = _EXPORTS[name].partition(':')
+    value = getattr(importlib.import_module(module), attribute or name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,50 @@
+# src/__main__.py
+# Run from the project root: python -m src <command> [options]
+
+import argparse
+import importlib
+import sys
+
+from src.cli import COMMANDS
+from src.instrumentation import LOG_FORMATS, METRICS_DIR, configure_logging, instrumented_run
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog='python -m src', description="Super Bowl ad impact pipeline.")
+    # Global options go before the command: python -m src --profile scrape --offline
+    parser.add_argument('--metrics', action='store_true',
+                        help=f"Write a metrics JSON file to {METRICS_DIR}/<command>-<timestamp>.json.")
+    parser.add_argument('--metrics-path', default=None, help="Write the metrics JSON file here instead (implies --metrics).")
+    parser.add_argument('--profile', action='store_true',
+                        help="Run under cProfile; top functions go in the metrics file, raw stats next to it (.prof). "
+                             "Implies --metrics.")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Trace allocations with tracemalloc (peak per span, top allocation sites; per-span "
+                             "peaks only for serial runs). Implies --metrics.")
+    parser.add_argument('--log-level', default='WARNING', help="Level for the package's log records (stderr).")
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text')
+    subparsers = parser.add_subparsers(dest='command', metavar='command', required=True)
+    for name, (_, _, help_text) in COMMANDS.items():
+        # The command's own parser (below) handles its options and --help
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    module_name, add_arguments, help_text = COMMANDS[args.command]
+    command_parser = argparse.ArgumentParser(prog=f'python -m src {args.command}', description=help_text)
+    command_args = add_arguments(command_parser).parse_args(rest)
+    # Only now, with valid arguments, load the command's module (pandas, scraper or Trends stack)
+    module = importlib.import_module(module_name)
+
+    configure_logging(args.log_level, args.log_format)
+    if not (args.metrics or args.metrics_path or args.profile or args.trace_memory):
+        module.run(command_args)
+        return
+    with instrumented_run(args.command, metrics_path=args.metrics_path, profile=args.profile,
+                          trace_memory=args.trace_memory, argv=argv):
+        module.run(command_args)
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    main()
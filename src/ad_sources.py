@@ -0,0 +1,219 @@
+# src/ad_sources.py
+
+import glob
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from src.config import SOURCE_WORKERS
+from src.html_cache import HTML_CACHE_DIR, fetch_html
+from src.instrumentation import incr, span
+from src.table_extractor import FINAL_COLS, REQUIRED_COLUMNS, WIKIPEDIA_COLUMNS, ColumnMapping, iter_commercial_rows
+
+WIKI_URL = "https://en.wikipedia.org/wiki/List_of_Super_Bowl_commercials"
+MAX_WORKERS = SOURCE_WORKERS  # sources fetched/parsed at the same time
+ROW_BATCH = 1_000   # rows handed to the merger per lock acquisition
+SOURCE_COL = 'Source'
+OUTPUT_COLS = FINAL_COLS + [SOURCE_COL]
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class AdSource:
+    """
+    One list of Super Bowl ads. Subclasses implement fetch(), returning the
+    page(s) to parse; rows come out of the streaming table extractor with this
+    source's declarative column mapping.
+    """
+
+    kind = None
+
+    def __init__(self, name, columns=None, required=None):
+        self.name = name
+        self.column_mapping = ColumnMapping(columns or WIKIPEDIA_COLUMNS, required or REQUIRED_COLUMNS)
+
+    def fetch(self, offline=False, max_age=None):
+        """HTML string, open file or list of those (multi-page sources)."""
+        raise NotImplementedError
+
+    def iter_rows(self, offline=False, max_age=None):
+        pages = self.fetch(offline=offline, max_age=max_age)
+        return iter_commercial_rows(pages, column_mapping=self.column_mapping)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class WikiListSource(AdSource):
+    """A wiki page fetched through the HTML snapshot cache (conditional requests, offline replay)."""
+
+    kind = 'wiki'
+
+    def __init__(self, name, url, columns=None, required=None, fixture_path=None, cache_dir=HTML_CACHE_DIR):
+        super().__init__(name, columns, required)
+        self.url = url
+        self.fixture_path = fixture_path
+        self.cache_dir = cache_dir
+
+    def fetch(self, offline=False, max_age=None):
+        return fetch_html(self.url, cache_dir=self.cache_dir, offline=offline, fixture_path=self.fixture_path,
+                          max_age=max_age)
+
+
+class LocalPagesSource(AdSource):
+    """Locally mirrored archive pages: a path or glob pattern, parsed in sorted order."""
+
+    kind = 'file'
+
+    def __init__(self, name, path, columns=None, required=None):
+        super().__init__(name, columns, required)
+        self.path = path
+
+    def fetch(self, offline=False, max_age=None):
+        paths = sorted(glob.glob(self.path))
+        if not paths:
+            raise FileNotFoundError(f"No pages match '{self.path}'")
+        pages = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        return pages
+
+
+# source spec 'type' -> AdSource subclass; register new plugins here
+SOURCE_TYPES = {cls.kind: cls for cls in (WikiListSource, LocalPagesSource)}
+
+
+def source_from_spec(spec):
+    """
+    Builds a source from a declarative spec, e.g.
+    {"name": "wiki-2010s", "type": "wiki", "url": "https://...",
+     "columns": {"Advertiser_Product_Title": ["advertiser", "brand*"], "Title": ["spot"]},
+     "required": [["Advertiser_Product_Title"]]}
+    "columns"/"required" default to the Wikipedia list's rules.
+    """
+    spec = dict(spec)
+    kind = spec.pop('type', None)
+    if kind not in SOURCE_TYPES:
+        raise ValueError(f"Unknown source type '{kind}' for source {spec.get('name')!r} "
+                         f"(expected one of {sorted(SOURCE_TYPES)})")
+    return SOURCE_TYPES[kind](**spec)
+
+
+def load_sources(path):
+    """Sources from a JSON file holding a list of specs (see source_from_spec)."""
+    with open(path, encoding='utf-8') as f:
+        return [source_from_spec(spec) for spec in json.load(f)]
+
+
+def default_sources(fixture_path=None):
+    return [WikiListSource('wikipedia', WIKI_URL, fixture_path=fixture_path)]
+
+
+def _fold(value):
+    return None if value is None else _WHITESPACE.sub(' ', value).strip().casefold()
+
+
+def dedup_key(record):
+    """(Year, advertiser, title) with case and whitespace folded; None when there is nothing to key on."""
+    advertiser, title = record['Advertiser_Product_Title'], record['Title']
+    if advertiser is None and title is None:
+        return None
+    return record['Year'], _fold(advertiser), _fold(title)
+
+
+class CommercialsMerger:
+    """
+    Thread-safe accumulator for rows streamed in from several sources.
+
+    Rows are deduplicated across sources on dedup_key: when two sources list
+    the same (Year, advertiser, title), the row of the source listed first
+    wins, whatever order the sources finish in. Repeats inside one source are
+    kept, since a single list can legitimately hold two spots with the same
+    name. Output is in source order, then page order.
+    """
+
+    def __init__(self, source_names):
+        self.names = list(source_names)
+        self.rank = {name: i for i, name in enumerate(self.names)}
+        self.lock = threading.Lock()
+        self.rows = []          # [rank, seq, record]; record is set to None once a better source replaces it
+        self.owner = {}         # dedup key -> (rank, row entries of that source)
+        self.received = dict.fromkeys(self.names, 0)
+
+    def add(self, source_name, records):
+        rank = self.rank[source_name]
+        with self.lock:
+            for record in records:
+                self.received[source_name] += 1
+                key = dedup_key(record)
+                entry = [rank, len(self.rows), record]
+                if key is not None:
+                    owner = self.owner.get(key)
+                    if owner is None or owner[0] > rank:
+                        if owner is not None:
+                            # An earlier-listed source has the same ad: drop the later source's copies
+                            for stale in owner[1]:
+                                stale[2] = None
+                        self.owner[key] = (rank, [entry])
+                    elif owner[0] == rank:
+                        owner[1].append(entry)
+                    else:
+                        continue
+                self.rows.append(entry)
+
+    def to_frame(self):
+        with self.lock:
+            kept = sorted((entry for entry in self.rows if entry[2] is not None), key=lambda entry: entry[:2])
+            records = [{**entry[2], SOURCE_COL: self.names[entry[0]]} for entry in kept]
+        return pd.DataFrame.from_records(records, columns=OUTPUT_COLS)
+
+
+def _scrape_one(source, merger, offline, max_age):
+    start = time.perf_counter()
+    batch = []
+    with span('sources.scrape', source=source.name):
+        for record in source.iter_rows(offline=offline, max_age=max_age):
+            batch.append(record)
+            if len(batch) >= ROW_BATCH:
+                merger.add(source.name, batch)
+                batch = []
+        merger.add(source.name, batch)
+    return time.perf_counter() - start
+
+
+def scrape_sources(sources, max_workers=MAX_WORKERS, offline=False, max_age=None):
+    """
+    Fetches and parses every source on a bounded thread pool and streams the
+    rows into one deduplicated frame (FINAL_COLS plus Source). Fetching is
+    I/O-bound, so extra sources mostly overlap with the slowest one.
+    Returns (frame, per-source summary frame); a failing source is reported
+    in the summary and does not stop the others.
+    """
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Source names must be unique: {names}")
+    merger = CommercialsMerger(names)
+    status = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as pool:
+        futures = {pool.submit(_scrape_one, source, merger, offline, max_age): source for source in sources}
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                status[source.name] = {'Status': 'ok', 'Seconds': round(future.result(), 3), 'Error': ''}
+                incr('sources.ok')
+            except Exception as e:
+                status[source.name] = {'Status': 'failed', 'Seconds': None, 'Error': str(e)}
+                incr('sources.failed')
+                print(f"WARNING: Source '{source.name}' failed: {e}")
+    commercials_df = merger.to_frame()
+    kept = commercials_df[SOURCE_COL].value_counts()
+    summary = pd.DataFrame([{'Source': name, 'Type': source.kind, **status[name], 'Rows': int(kept.get(name, 0)),
+                             'Duplicates': merger.received[name] - int(kept.get(name, 0))}
+                            for name, source in zip(names, sources)])
+    incr('sources.duplicates', int(summary['Duplicates'].sum()))
+    return commercials_df, summary
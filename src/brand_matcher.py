@@ -0,0 +1,253 @@
+# src/brand_matcher.py
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import incr, span
+
+# Columns returned for every matched title (canonical values from the ticker map)
+MATCH_COLS = ['BrandName', 'StockTicker', 'ParentCompany']
+
+# Compiled matchers are pickled here, keyed by the ticker map's content hash
+CACHE_DIR = 'data/cache'
+# Bump when BrandMatcher's internals change so stale pickles are ignored
+CACHE_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def build_brand_lookups(ticker_map_df):
+    """
+    Builds the lowercase -> original BrandName dict and the length-sorted
+    brand list exactly as check_mapping_progress.py / notebook 02 do.
+    Duplicate brands (case-insensitive) keep their first row.
+    """
+    if ticker_map_df is None or ticker_map_df.empty or 'BrandName' not in ticker_map_df.columns:
+        return {}, []
+    lc_brands = ticker_map_df.dropna(subset=['BrandName'])['BrandName'].astype(str).str.lower()
+    unique_lc_indices = lc_brands.drop_duplicates(keep='first').index
+    lc_map_temp = ticker_map_df.loc[unique_lc_indices]
+    original_case_map = pd.Series(
+        lc_map_temp.BrandName.astype(str).values,
+        index=lc_map_temp.BrandName.astype(str).str.lower()
+    ).to_dict()
+    known_brands_sorted = sorted(original_case_map.keys(), key=len, reverse=True)
+    return original_case_map, known_brands_sorted
+
+
+def get_primary_advertiser_final(adv_prod_title, brands_sorted_list, lc_to_orig_map):
+    """
+    Reference per-row matcher (one substring test per brand, longest first).
+    Kept for comparison with BrandMatcher; prefer BrandMatcher.match for batches.
+    """
+    if pd.isna(adv_prod_title): return None
+    text_to_search = str(adv_prod_title).lower()
+    match_found_lc = None
+    for brand_lower in brands_sorted_list:
+        if brand_lower in text_to_search:
+             match_found_lc = brand_lower
+             break
+    if match_found_lc:
+         return lc_to_orig_map.get(match_found_lc)
+    else:
+         return None
+
+
+class BrandMatcher:
+    """
+    Aho-Corasick automaton over the lowercase brand names of a ticker map.
+
+    The map is compiled once; each title is then scanned in a single pass
+    regardless of how many brands there are. As with the original loop the
+    longest brand found anywhere in the title wins (ties go to the brand that
+    comes first in the map). With word_boundary=True a brand only counts when
+    it is not glued to letters/digits on either side ("Kia" will not match "Nokia").
+    """
+
+    def __init__(self, ticker_map_df, word_boundary=False):
+        self.word_boundary = word_boundary
+        self.original_case_map, self.known_brands_sorted = build_brand_lookups(ticker_map_df)
+
+        # Canonical lookup rows, one per lowercase brand (first occurrence wins)
+        lookup = pd.DataFrame({'BrandName': list(self.original_case_map.values())},
+                              index=list(self.original_case_map.keys()))
+        if ticker_map_df is not None and not lookup.empty:
+            first_rows = ticker_map_df.drop_duplicates(subset=['BrandName'], keep='first').set_index('BrandName')
+            for col in MATCH_COLS[1:]:
+                if col in first_rows.columns:
+                    lookup[col] = lookup['BrandName'].map(first_rows[col])
+        self.lookup = lookup.reindex(columns=MATCH_COLS)
+
+        self.patterns = list(self.lookup.index)
+        self._compile()
+
+    def _compile(self):
+        # goto[state] -> {char: next_state}; state 0 is the root
+        goto = [{}]
+        terminal = [-1]  # pattern id ending exactly at this state
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({}); terminal.append(-1)
+                state = nxt
+            if pattern:
+                terminal[state] = pid
+
+        # Breadth-first pass for failure links, longest-output and dictionary-suffix links
+        fail = [0] * len(goto)
+        best = list(terminal)      # longest pattern ending at this state
+        dict_link = [-1] * len(goto)  # next state on the fail chain that ends a pattern
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]; head += 1
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0) if state else 0
+                fail[nxt] = f
+                dict_link[nxt] = f if terminal[f] != -1 else dict_link[f]
+                if best[nxt] == -1:
+                    best[nxt] = best[f]
+                queue.append(nxt)
+
+        self._goto, self._fail = goto, fail
+        self._best, self._terminal, self._dict_link = best, terminal, dict_link
+        # Position in known_brands_sorted (longest first, then map order): the lowest rank found wins
+        position = {pattern: i for i, pattern in enumerate(self.known_brands_sorted)}
+        self._rank = [position[pattern] for pattern in self.patterns]
+
+    def _scan(self, text):
+        """Returns the pattern id of the winning brand in lowercase text, or -1."""
+        goto, fail = self._goto, self._fail
+        best, terminal, dict_link = self._best, self._terminal, self._dict_link
+        patterns, rank = self.patterns, self._rank
+        word_boundary = self.word_boundary
+        n = len(text)
+        state = 0
+        found, found_rank = -1, len(rank)
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not word_boundary:
+                # Shorter patterns ending here rank lower than best[state], so it is the only candidate
+                pid = best[state]
+                if pid != -1 and rank[pid] < found_rank:
+                    found, found_rank = pid, rank[pid]
+                    if found_rank == 0:
+                        break
+                continue
+            # Word-boundary mode: check every pattern ending here, longest first
+            if i + 1 < n and text[i + 1].isalnum():
+                continue
+            s = state if terminal[state] != -1 else dict_link[state]
+            while s != -1:
+                pid = terminal[s]
+                if rank[pid] >= found_rank:
+                    break
+                start = i + 1 - len(patterns[pid])
+                if start == 0 or not text[start - 1].isalnum():
+                    found, found_rank = pid, rank[pid]
+                    break
+                s = dict_link[s]
+        return found
+
+    def match_one(self, adv_prod_title):
+        """Returns the canonical BrandName for a single title, or None."""
+        if pd.isna(adv_prod_title) or not self.patterns:
+            return None
+        pid = self._scan(str(adv_prod_title).lower())
+        return None if pid == -1 else self.lookup['BrandName'].iat[pid]
+
+    def match(self, titles):
+        """
+        Matches a whole column in one call.
+        Returns a DataFrame aligned to `titles` with BrandName, StockTicker and
+        ParentCompany (NaN where nothing matched). Each distinct title is only
+        scanned once.
+        """
+        titles = pd.Series(titles) if not isinstance(titles, pd.Series) else titles
+        with span('brand_matcher.match', titles=len(titles)):
+            codes, uniques = pd.factorize(titles, use_na_sentinel=True)
+            if self.patterns:
+                unique_pids = np.array([self._scan(str(t).lower()) for t in uniques] + [-1], dtype=np.int64)
+            else:
+                unique_pids = np.full(len(uniques) + 1, -1, dtype=np.int64)
+            # code -1 (missing title) picks up the trailing -1 sentinel
+            pids = unique_pids[codes]
+        incr('titles.scanned', len(uniques))
+        incr('titles.matched', int((pids != -1).sum()))
+        incr('titles.unmatched', int((pids == -1).sum()))
+
+        # reindex turns pattern id -1 into an all-NaN row
+        result = self.lookup.reset_index(drop=True).reindex(pids)
+        result.index = titles.index
+        return result
+
+
+def file_sha256(path):
+    """Content hash of a file, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_brand_matcher(ticker_map_path, word_boundary=False, cache_dir=CACHE_DIR):
+    """
+    Returns a compiled BrandMatcher for the ticker map at `ticker_map_path`.
+
+    The compiled matcher (automaton plus lookup tables) is pickled under
+    `cache_dir`, keyed by a SHA-256 of the CSV contents, so it is only rebuilt
+    when the mapping file actually changes. Pass cache_dir=None to skip the cache.
+    """
+    if cache_dir is None:
+        return BrandMatcher(pd.read_csv(ticker_map_path), word_boundary=word_boundary)
+
+    map_name = os.path.splitext(os.path.basename(ticker_map_path))[0]
+    mode = 'wb' if word_boundary else 'sub'
+    prefix = f"{map_name}.v{CACHE_VERSION}.{mode}."
+    cache_path = os.path.join(cache_dir, f"{prefix}{file_sha256(ticker_map_path)[:16]}.pkl")
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                matcher = pickle.load(f)
+            incr('brand_index.cache_hit')
+            return matcher
+        except Exception as e:
+            logger.warning("Ignoring unreadable brand index cache",
+                           extra={'fields': {'path': cache_path, 'error': str(e)}})
+
+    incr('brand_index.cache_miss')
+    with span('brand_matcher.compile'):
+        matcher = BrandMatcher(pd.read_csv(ticker_map_path), word_boundary=word_boundary)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Drop indexes compiled from older versions of this mapping file
+    for name in os.listdir(cache_dir):
+        other_mode_current = name.startswith(f"{map_name}.v{CACHE_VERSION}.") and not name.startswith(prefix)
+        if name.startswith(f"{map_name}.") and name.endswith('.pkl') and not other_mode_current:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                pass  # another thread/process cleaned it up first
+    # A unique temp file per writer (pipeline stages load the matcher from several threads)
+    with tempfile.NamedTemporaryFile(dir=cache_dir, prefix=os.path.basename(cache_path) + '.', suffix='.tmp',
+                                     delete=False) as f:
+        pickle.dump(matcher, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, cache_path)  # atomic, so concurrent runs never read half a file
+    return matcher
@@ -1,12 +1,19 @@
 # src/check_mapping_progress.py
+# Run from the project root: python -m src.check_mapping_progress [--incremental] [--suggest]
 
+import argparse
+import logging
 import pandas as pd
 import os
 import sys
+import time
 
-print(f"--- Mapping Progress Check ---")
-print(f"DEBUG: Running script using Python executable: {sys.executable}")
-print(f"DEBUG: Using Pandas version: {pd.__version__}")
+from src.brand_matcher import load_brand_matcher
+from src.cli import add_map_arguments as add_arguments
+from src.fuzzy_brands import FuzzyBrandIndex
+from src.instrumentation import span
+from src.mapping_progress import MappingState, commercials_fingerprint, state_path
+from src.storage import load_commercials
 
 # --- Configuration (Revised Paths) ---
 TICKER_MAP_FILENAME = 'advertiser_ticker_mapping.csv'
@@ -16,94 +23,126 @@ RAW_DATA_DIR = 'data/raw'
 PROCESSED_DIR = 'data/processed'
 ticker_map_path = os.path.join(RAW_DATA_DIR, TICKER_MAP_FILENAME)
 commercials_path = os.path.join(PROCESSED_DIR, COMMERCIALS_FILENAME)
+suggestions_path = os.path.join(PROCESSED_DIR, 'unmapped_brand_suggestions.csv')
 # --- End of Revised Configuration ---
 
-# --- Load Ticker Map ---
-ticker_map_df = pd.DataFrame()
-original_case_map = {}
-known_brands_sorted = []
-try:
-    ticker_map_df = pd.read_csv(ticker_map_path)
-    print(f"\nTicker mapping loaded successfully from '{ticker_map_path}'. Shape: {ticker_map_df.shape}")
-    if not ticker_map_df.empty and 'BrandName' in ticker_map_df.columns and ticker_map_df['BrandName'].notna().any():
-        lc_brands = ticker_map_df.dropna(subset=['BrandName'])['BrandName'].str.lower()
-        unique_lc_indices = lc_brands.drop_duplicates(keep='first').index
-        lc_map_temp = ticker_map_df.loc[unique_lc_indices]
-        original_case_map = pd.Series(
-            lc_map_temp.BrandName.values,
-            index=lc_map_temp.BrandName.str.lower()
-        ).to_dict()
-        known_brands_set = set(original_case_map.keys())
-        known_brands_sorted = sorted(list(known_brands_set), key=len, reverse=True)
-        print(f"Prepared {len(known_brands_sorted)} unique known brands for matching.")
-    else:
-        print("Ticker map is empty or invalid.")
-except FileNotFoundError:
-    print(f"ERROR: Ticker mapping file not found at '{ticker_map_path}'")
-except Exception as e:
-     print(f"Error loading or processing ticker map: {e}")
-
-# --- Load Commercials Data ---
-commercials_df = pd.DataFrame()
-try:
-    commercials_df = pd.read_csv(commercials_path)
-    print(f"\nCommercials data loaded successfully from '{commercials_path}'. Shape: {commercials_df.shape}")
-except FileNotFoundError:
-    print(f"ERROR: Commercials data file not found at '{commercials_path}'")
-except Exception as e:
-    print(f"An error occurred loading the commercials CSV: {e}")
-
-
-# --- Define Extraction Function ---
-def get_primary_advertiser_final(adv_prod_title, brands_sorted_list, lc_to_orig_map):
-    if pd.isna(adv_prod_title): return None
-    text_to_search = str(adv_prod_title).lower()
-    match_found_lc = None
-    for brand_lower in brands_sorted_list:
-        if brand_lower in text_to_search:
-             match_found_lc = brand_lower
-             break
-    if match_found_lc:
-         return lc_to_orig_map.get(match_found_lc)
-    else:
-         return None
-
-# --- Apply Function and Check Progress ---
-if not commercials_df.empty and known_brands_sorted and original_case_map:
-    print("\nApplying extraction function...")
+logger = logging.getLogger(__name__)
+
+
+def print_summary(state):
+    """Coverage stats and top mapped/unmapped lists from the running counts."""
+    total_rows = state.total_rows()
+    mapped_rows = state.mapped_rows()
+    unmapped_rows = total_rows - mapped_rows
+    percent_mapped = (mapped_rows / total_rows) * 100 if total_rows > 0 else 0
+
+    print("\n--- Mapping Summary ---")
+    print(f"Total Commercials: {total_rows}")
+    print(f"Mapped to Primary Advertiser: {mapped_rows} ({percent_mapped:.1f}%)")
+    print(f"Could NOT be mapped:         {unmapped_rows}")
+
+    if mapped_rows > 0:
+        print("\nTop 30 Mapped Primary Advertisers:")
+        print(pd.DataFrame(state.top_mapped(30)))
+
+    if state.unmapped_counts:
+        print("\nTop 50 UNMAPPED Original 'Advertiser_Product_Title' Entries:")
+        print(pd.DataFrame(state.top_unmapped(50)))
+
+
+def print_suggestions(state, brand_matcher, n_titles=50):
+    """Fuzzy brand suggestions for the most frequent unmapped titles (saved for triage)."""
+    unmapped = state.top_unmapped(n_titles)
+    if unmapped.empty:
+        return
+    start = time.perf_counter()
+    suggestions = FuzzyBrandIndex(brand_matcher.lookup).suggest(unmapped.index)
+    print(f"\n--- Fuzzy Suggestions for the Top {len(unmapped)} Unmapped Titles "
+          f"({suggestions['Advertiser_Product_Title'].nunique()} resolved, {time.perf_counter() - start:.2f}s) ---")
+    if not suggestions.empty:
+        print(suggestions[['Advertiser_Product_Title', 'Rank', 'BrandName', 'Confidence', 'MatchedText']]
+              .to_string(index=False))
+        suggestions.to_csv(suggestions_path, index=False)
+        print(f"Suggestions saved to: {suggestions_path}")
+
+
+def main(incremental=False, word_boundary=False, suggest=False):
+    """
+    Matches every commercial against the ticker map and prints coverage.
+
+    With incremental=True the assignments saved by the previous run are
+    reused: the commercials are only re-read when their file changed, and
+    only titles that an added/removed brand (or a new commercial) can affect
+    are re-matched. Every run saves its state for the next incremental one.
+    With suggest=True the top unmapped titles also get fuzzy brand suggestions.
+    """
+    print(f"--- Mapping Progress Check ---")
+    logger.debug("Environment", extra={'fields': {'python': sys.executable, 'pandas': pd.__version__}})
+    start = time.perf_counter()
+
+    # --- Load Brand Index (compiled from the ticker map, cached by file hash) ---
     try:
-        commercials_df['Primary_Advertiser'] = commercials_df['Advertiser_Product_Title'].apply(
-            get_primary_advertiser_final,
-            args=(known_brands_sorted, original_case_map)
-        )
-        print("Extraction complete.")
-
-        # --- Summary Statistics ---
-        total_rows = len(commercials_df)
-        mapped_rows = commercials_df['Primary_Advertiser'].notna().sum()
-        unmapped_rows = commercials_df['Primary_Advertiser'].isna().sum()
-        percent_mapped = (mapped_rows / total_rows) * 100 if total_rows > 0 else 0
-
-        print("\n--- Mapping Summary ---")
-        print(f"Total Commercials: {total_rows}")
-        print(f"Mapped to Primary Advertiser: {mapped_rows} ({percent_mapped:.1f}%)")
-        print(f"Could NOT be mapped:         {unmapped_rows}")
-
-        if mapped_rows > 0:
-             print("\nTop 30 Mapped Primary Advertisers:")
-             display_df = pd.DataFrame(commercials_df['Primary_Advertiser'].value_counts().head(30))
-             print(display_df) # Use print for scripts, display is for notebooks
-
-        if unmapped_rows > 0:
-            print("\nTop 50 UNMAPPED Original 'Advertiser_Product_Title' Entries:")
-            unmapped_subset = commercials_df[commercials_df['Primary_Advertiser'].isnull()]
-            display_df_unmapped = pd.DataFrame(unmapped_subset['Advertiser_Product_Title'].value_counts().head(50))
-            print(display_df_unmapped) # Use print
+        brand_matcher = load_brand_matcher(ticker_map_path, word_boundary=word_boundary)
+        print(f"\nBrand index ready for '{ticker_map_path}'.")
+        if not brand_matcher.patterns:
+            print("Ticker map is empty or invalid.")
+            return
+        print(f"Prepared {len(brand_matcher.patterns)} unique known brands for matching.")
+    except FileNotFoundError:
+        print(f"ERROR: Ticker mapping file not found at '{ticker_map_path}'")
+        return
+    except Exception as e:
+        print(f"Error loading or processing ticker map: {e}")
+        return
 
+    path = state_path(word_boundary)
+    state = MappingState.load(path) if incremental else None
+    if incremental and state is None:
+        print("No saved mapping state yet; running a full match.")
+    state = state or MappingState(word_boundary=word_boundary)
+
+    # --- Load Commercials Data (skipped when unchanged since the last run) ---
+    titles = None
+    try:
+        fingerprint = commercials_fingerprint(commercials_path)
+        if state.fingerprint == fingerprint:
+            print(f"\nCommercials unchanged since the last run ({state.total_rows()} rows); not reloading.")
+        else:
+            # Parquet dataset when present (typed, no CSV inference), otherwise the CSV
+            commercials_df = load_commercials(commercials_path, columns=['Advertiser_Product_Title'])
+            titles = commercials_df['Advertiser_Product_Title']
+            print(f"\nCommercials data loaded successfully. Rows: {len(commercials_df)}")
+    except FileNotFoundError:
+        print(f"ERROR: Commercials data file not found at '{commercials_path}'")
+        return
     except Exception as e:
-        print(f"\nAn error occurred during function application: {e}")
+        print(f"An error occurred loading the commercials data: {e}")
+        return
+
+    # --- Apply Matcher and Check Progress ---
+    print("\nApplying brand matcher...")
+    with span('mapping.update', incremental=incremental):
+        changes = state.update(brand_matcher, titles, fingerprint=fingerprint)
+    print(f"Extraction complete: re-matched {changes['rescanned']} distinct titles "
+          f"({changes['reassigned']} changed assignment) in {time.perf_counter() - start:.2f}s.")
+    if incremental:
+        print(f"  Commercials: +{changes['new_titles']} / -{changes['removed_titles']} titles, "
+              f"{changes['count_changes']} count changes")
+        print(f"  Brand map:   +{changes['added_brands']} / -{changes['removed_brands']} brands, "
+              f"{changes['relabeled_brands']} relabeled")
+    state.save(path)
+
+    print_summary(state)
+    if suggest:
+        print_suggestions(state, brand_matcher)
+
+
+def run(args):
+    main(incremental=args.incremental, word_boundary=args.word_boundary, suggest=args.suggest)
 
-else:
-    print("\nSkipping extraction check because data or map could not be loaded.")
 
-print("\n--- Check Script Finished ---")
\ No newline at end of file
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report how many commercials map to a known brand.")
+    run(add_arguments(parser).parse_args())
+    print("\n--- Check Script Finished ---")
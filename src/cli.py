@@ -0,0 +1,113 @@
+# src/cli.py
+# Command-line options for every `python -m src` command, also used by each module's own script entry point.
+# Only the standard library and src.config are imported here, so building a parser (and printing --help or an
+# argument error) never loads pandas; the command's module is imported by its handler once the arguments parse.
+
+from src.config import (ANCHOR_KEYWORD, DEFAULT_GEO, GEOS, LIFT_PATH, PANEL_DIR, PANEL_DTYPES, PIPELINE_WORKERS,
+                        PROCESSED_DIR, QUERY_WINDOW, REQUESTS_PER_MINUTE, SOURCE_WORKERS, TARGET_YEAR, TRENDS_WORKERS)
+
+
+def add_scrape_arguments(parser):
+    """Command-line options, shared by src.data_acquisition and `python -m src scrape`."""
+    parser.add_argument('--offline', action='store_true', help="Use the stored HTML snapshot only (no network).")
+    parser.add_argument('--fixture', help="Parse this local HTML file instead of fetching.")
+    parser.add_argument('--max-age', type=float, default=None,
+                        help="Seconds a stored snapshot is trusted without revalidating.")
+    parser.add_argument('--engine', choices=['stream', 'read_html'], default='stream',
+                        help="Single-pass streaming extractor (default) or the per-table pd.read_html path.")
+    parser.add_argument('--sources', default=None,
+                        help="JSON list of ad-list source specs to scrape together (default: the Wikipedia list).")
+    parser.add_argument('--workers', type=int, default=SOURCE_WORKERS, help="Sources fetched and parsed at once.")
+    return parser
+
+
+def add_map_arguments(parser):
+    """Command-line options, shared by src.check_mapping_progress and `python -m src map`."""
+    parser.add_argument('--incremental', action='store_true',
+                        help="Reuse the previous run's assignments and only re-match affected titles.")
+    parser.add_argument('--word-boundary', action='store_true',
+                        help="Only match brands that are not glued to other letters/digits.")
+    parser.add_argument('--suggest', action='store_true',
+                        help="Suggest likely brands for the top unmapped titles (fuzzy n-gram match).")
+    return parser
+
+
+def add_trends_arguments(parser):
+    """Command-line options, shared by src.fetch_trends and `python -m src trends`."""
+    parser.add_argument('--years', type=int, nargs='+', default=None,
+                        help=f"Years to fetch (default: {TARGET_YEAR}).")
+    parser.add_argument('--all-years', action='store_true', help="Fetch every year in super_bowl_sundays from 2004 on.")
+    parser.add_argument('--workers', type=int, default=TRENDS_WORKERS)
+    parser.add_argument('--requests-per-minute', type=float, default=REQUESTS_PER_MINUTE)
+    parser.add_argument('--anchor', default=ANCHOR_KEYWORD,
+                        help="Keyword added to every batch for cross-batch scaling ('' to disable).")
+    parser.add_argument('--geos', nargs='+', default=None,
+                        help=f"Trends region codes, e.g. US GB CA ('' = worldwide; default: {' '.join(GEOS)}).")
+    parser.add_argument('--dry-run', action='store_true', help="Use an offline fake Trends client.")
+    return parser
+
+
+def add_panel_arguments(parser):
+    """Command-line options, shared by src.trends_panel and `python -m src panel`."""
+    parser.add_argument('--import-csv', action='store_true',
+                        help=f"Load every google_trends_<year>[_<geo>].csv in {PROCESSED_DIR} into the panel.")
+    parser.add_argument('--query', nargs='+', default=None, metavar='BRAND', help="Brands to return event windows for.")
+    parser.add_argument('--years', type=int, nargs='+', default=None)
+    parser.add_argument('--geos', nargs='+', default=None)
+    parser.add_argument('--window', type=int, nargs=2, default=list(QUERY_WINDOW), metavar=('FIRST', 'LAST'),
+                        help="Day offsets from Super Bowl Sunday (default: %(default)s).")
+    parser.add_argument('--out', default=None, help="Save the queried windows to this CSV.")
+    parser.add_argument('--dtype', choices=PANEL_DTYPES, default='float32', help="Value type for a newly created panel.")
+    parser.add_argument('--panel-dir', default=PANEL_DIR)
+    return parser
+
+
+def add_lift_arguments(parser):
+    """Command-line options, shared by src.trends_lift and `python -m src lift`."""
+    parser.add_argument('--panel', action='store_true', help="Read Trends from the panel store instead of the CSVs.")
+    parser.add_argument('--geo', default=DEFAULT_GEO)
+    parser.add_argument('--panel-dir', default=PANEL_DIR)
+    parser.add_argument('--trends-dir', default=PROCESSED_DIR, help="Directory holding the google_trends_<year> CSVs.")
+    parser.add_argument('--out', default=LIFT_PATH)
+    return parser
+
+
+def add_report_arguments(parser):
+    """Command-line options, shared by src.event_study and `python -m src report`."""
+    parser.add_argument('--resamples', type=int, default=0,
+                        help="Bootstrap/permutation resamples for significance tests (0 = skip).")
+    parser.add_argument('--placebos', type=int, default=500, help="Placebo dates drawn per event.")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: all CPUs).")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def add_pipeline_arguments(parser):
+    """Command-line options, shared by src.pipeline and `python -m src pipeline`."""
+    parser.add_argument('--stages', nargs='+', default=None,
+                        help="Stages to bring up to date, with their upstream stages (default: all).")
+    parser.add_argument('--force', nargs='*', default=None,
+                        help="Re-run these stages (or every selected stage if none are named) ignoring the cache.")
+    parser.add_argument('--workers', type=int, default=PIPELINE_WORKERS, help="Stages run concurrently.")
+    parser.add_argument('--offline', action='store_true', help="Scrape from the stored HTML snapshot only.")
+    parser.add_argument('--fixture', help="Scrape this local HTML file instead of fetching.")
+    parser.add_argument('--max-age', type=float, default=None,
+                        help="Seconds a stored snapshot is trusted without revalidating.")
+    parser.add_argument('--years', type=int, nargs='+', default=None, help="Trends years to fetch.")
+    parser.add_argument('--trends-dry-run', action='store_true', help="Use the offline fake Trends client.")
+    parser.add_argument('--list', action='store_true', help="Print the stages and their dependencies and exit.")
+    return parser
+
+
+# command -> (module with run(args), option builder, help)
+COMMANDS = {
+    'scrape': ('src.data_acquisition', add_scrape_arguments, "Scrape the Wikipedia list of Super Bowl commercials."),
+    'map': ('src.check_mapping_progress', add_map_arguments, "Report how many commercials map to a known brand."),
+    'trends': ('src.fetch_trends', add_trends_arguments, "Fetch Google Trends interest around Super Bowl Sunday."),
+    'panel': ('src.trends_panel', add_panel_arguments, "Build and query the multi-year, multi-geo Google Trends panel."),
+    'lift': ('src.trends_lift', add_lift_arguments,
+             "Search-interest lift around Super Bowl Sunday per advertiser and year."),
+    'report': ('src.event_study', add_report_arguments, "Market-model event study around Super Bowl Sunday."),
+    'pipeline': ('src.pipeline', add_pipeline_arguments,
+                 "Run the scrape -> map -> trends -> event-study pipeline, skipping unchanged stages."),
+}
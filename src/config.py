@@ -0,0 +1,32 @@
+# src/config.py
+# Defaults shared by the command modules and their command-line parsers (src/cli.py).
+# Standard library only: `python -m src <command> --help` reads these without loading pandas.
+
+import os
+
+PROCESSED_DIR = 'data/processed'
+
+# --- Scraping ---
+SOURCE_WORKERS = 4  # ad-list sources fetched/parsed at the same time
+
+# --- Google Trends ---
+TARGET_YEAR = 2024  # <<< SET THE YEAR YOU WANT TO FETCH DATA FOR
+TRENDS_WORKERS = 3  # Concurrent fetch threads
+REQUESTS_PER_MINUTE = 6  # Shared token-bucket rate across all worker threads
+# A steady, mid-popularity search term shared by every batch. It should not
+# spike around the Super Bowl itself, or the brands in its batches lose resolution,
+# so it must not be a Super Bowl advertiser (Amazon, for one, runs game-day ads).
+ANCHOR_KEYWORD = 'Wikipedia'
+DEFAULT_GEO = 'US'
+GEOS = [DEFAULT_GEO]  # Trends region codes ('' = worldwide); every geo is fetched for every year
+WORLD_FILE_SUFFIX = 'WORLD'  # stands in for the '' (worldwide) geo in file and directory names
+
+# --- Trends panel and lift ---
+PANEL_DIR = os.path.join(PROCESSED_DIR, 'trends_panel')
+# float32 keeps anchor-rescaled interest exactly; uint8 stores rounded 0-100 in a quarter of the space
+PANEL_DTYPES = ('float32', 'uint8')
+QUERY_WINDOW = (-7, 7)
+LIFT_PATH = os.path.join(PROCESSED_DIR, 'trends_lift.csv')
+
+# --- Pipeline ---
+PIPELINE_WORKERS = 3  # stages run concurrently
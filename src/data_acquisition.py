@@ -1,142 +1,182 @@
 # src/data_acquisition.py
+# Run from the project root: python -m src.data_acquisition [--offline | --fixture PATH]
 
-import requests
+import argparse
+import logging
 import pandas as pd
-from bs4 import BeautifulSoup
 import re
 import os
 from io import StringIO
 import sys
 
-# --- Print environment info ---
-print(f"DEBUG: Running script using Python executable: {sys.executable}")
-print(f"DEBUG: Using Pandas version: {pd.__version__}")
-# ---
-
-print("--- Starting Data Acquisition ---")
+from src.ad_sources import MAX_WORKERS, WIKI_URL, default_sources, load_sources, scrape_sources
+from src.cli import add_scrape_arguments as add_arguments
+from src.html_cache import HTML_CACHE_DIR, fetch_html
+from src.instrumentation import incr, span
+from src.storage import COMMERCIALS_DATASET, write_dataset
+from src.table_extractor import DEFAULT_COLUMN_MAPPING, FINAL_COLS
 
 # --- Configuration ---
-WIKI_URL = "https://en.wikipedia.org/wiki/List_of_Super_Bowl_commercials"
-REQUEST_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-FINAL_COLS = ['Product_Type', 'Advertiser_Product_Title', 'Title', 'Plot_Notes', 'Decade', 'Year', 'SuperBowlNum']
 OUTPUT_DIR = 'data/processed'
 OUTPUT_FILENAME = 'wiki_super_bowl_commercials_extracted.csv'
 
-# --- Fetch HTML Content ---
-print(f"Fetching data from: {WIKI_URL}")
-try:
-    response = requests.get(WIKI_URL, headers=REQUEST_HEADERS, timeout=15)
-    response.raise_for_status()
-    print("Successfully fetched page content.")
-except requests.exceptions.RequestException as e:
-    print(f"ERROR: Failed to fetch URL: {e}")
-    exit()
-
-# --- Parse HTML and Extract Data (Removed dtype='object') ---
-advertisers_df = None
-all_data = []
-
-try:
-    soup = BeautifulSoup(response.text, 'lxml')
-    content_div = soup.find(id='mw-content-text').find('div', class_='mw-parser-output')
-
-    if not content_div:
-        print("ERROR: Could not find main content div ('div.mw-parser-output'). Scraping cannot proceed.")
-        exit()
+logger = logging.getLogger(__name__)
+
+
+def extract_with_read_html(page_html):
+    """
+    Original extraction path: BeautifulSoup walk over H2/H3/table elements and
+    one pd.read_html call per wikitable. Returns the combined DataFrame or None.
+    Kept for comparison with the single-pass table_extractor engine.
+    """
+    from bs4 import BeautifulSoup
+    all_data = []
+
+    try:
+        soup = BeautifulSoup(page_html, 'lxml')
+        content_div = soup.find(id='mw-content-text').find('div', class_='mw-parser-output')
+
+        if not content_div:
+            logger.error("Could not find main content div ('div.mw-parser-output'). Scraping cannot proceed.")
+            return None
+
+        current_decade = None
+        current_year = None
+        current_sb_num = None
+
+        relevant_elements = content_div.find_all(['h2', 'h3', 'table'])
+        logger.debug("Scanning relevant elements", extra={'fields': {'elements': len(relevant_elements)}})
+
+        for element in relevant_elements:
+            # Process H2...
+            if element.name == 'h2':
+                h2_text = element.get_text(strip=True).replace('[edit]', '')
+                if re.match(r'^\d{4}s$', h2_text):
+                    current_decade = h2_text; current_year = None; current_sb_num = None
+                    logger.debug("Switched decade", extra={'fields': {'decade': current_decade}})
+                elif h2_text in ["See also", "References", "External links"]:
+                    logger.debug("Stopping at heading", extra={'fields': {'heading': h2_text}})
+                    break
+                else: current_decade = None; current_year = None; current_sb_num = None
+            # Process H3...
+            elif element.name == 'h3':
+                if current_decade:
+                    heading_text = element.get_text(strip=True).replace('[edit]', '')
+                    match = re.match(r'(\d{4})\s*(?:\((\w+)\))?', heading_text)
+                    if match:
+                        current_year = match.group(1); current_sb_num = match.group(2)
+                        logger.debug("Set year", extra={'fields': {'year': current_year, 'sb': current_sb_num}})
+                    else: current_year = None; current_sb_num = None
+            # Process Table...
+            elif element.name == 'table' and element.has_attr('class') and 'wikitable' in element['class']:
+                if current_year:
+                    incr('tables.seen')
+                    try:
+                        # --- MODIFICATION: REMOVED dtype='object' ---
+                        with span('read_html.table'):
+                            df_list = pd.read_html(StringIO(str(element)), flavor='bs4', header=0, keep_default_na=True)
+
+                        if df_list:
+                            df = df_list[0].copy()
+                            incr('tables.parsed')
+                            logger.debug("Parsed table", extra={'fields': {'year': current_year, 'columns': df.columns.tolist()}})
+
+                            # --- Column Renaming (same declarative rules as the streaming extractor) ---
+                            rename_map = {col: DEFAULT_COLUMN_MAPPING(col) for col in df.columns
+                                          if DEFAULT_COLUMN_MAPPING(col)}
+                            df.rename(columns=rename_map, inplace=True)
+
+                            # Check essential columns
+                            if DEFAULT_COLUMN_MAPPING.accepts(df.columns):
+                                df['Decade'] = current_decade; df['Year'] = current_year; df['SuperBowlNum'] = current_sb_num
+                                cols_to_keep = [col for col in FINAL_COLS if col in df.columns]
+                                df_processed = df[cols_to_keep].copy()
+                                all_data.append(df_processed)
+                                incr('tables.used'); incr('rows.extracted', len(df_processed))
+                            else:
+                                incr('tables.skipped')
+                                logger.info("Essential columns not found; skipping table",
+                                            extra={'fields': {'year': current_year, 'columns': list(df.columns)}})
+
+                        else: logger.info("pd.read_html returned no table", extra={'fields': {'year': current_year}})
+
+                    # --- RE-ADDED ValueError CATCH specifically ---
+                    except ValueError as ve:
+                        incr('tables.failed')
+                        logger.warning("Could not parse table; skipping", extra={'fields': {'year': current_year, 'error': str(ve)}})
+                    except Exception as e:
+                        incr('tables.failed')
+                        logger.exception("Unexpected error parsing table", extra={'fields': {'year': current_year}})
+
+                    # Reset year after processing/attempting this table
+                    current_year = None
+                    current_sb_num = None
+
+        if all_data:
+            return pd.concat([df.reindex(columns=FINAL_COLS) for df in all_data], ignore_index=True)
+    except Exception as e:
+        logger.exception("Unexpected error during parsing or processing")
+    return None
+
+
+def main(offline=False, fixture_path=None, max_age=None, engine='stream', sources_path=None,
+         max_workers=MAX_WORKERS):
+    logger.debug("Environment", extra={'fields': {'python': sys.executable, 'pandas': pd.__version__}})
+    print("--- Starting Data Acquisition ---")
+
+    if engine == 'read_html':
+        # --- Fetch HTML Content (stored snapshot / conditional request / local fixture) ---
+        print(f"Fetching data from: {WIKI_URL}")
+        try:
+            with span('scrape.fetch'):
+                page_html = fetch_html(WIKI_URL, cache_dir=HTML_CACHE_DIR, offline=offline,
+                                       fixture_path=fixture_path, max_age=max_age)
+            print("Successfully fetched page content.")
+        except Exception as e:
+            print(f"ERROR: Failed to fetch URL: {e}")
+            return
+
+        # --- Parse HTML and Extract Data ---
+        with span('scrape.extract', engine=engine):
+            final_commercials_df = extract_with_read_html(page_html)
     else:
-        print("DEBUG: Found content_div successfully.")
-
-    current_decade = None
-    current_year = None
-    current_sb_num = None
-
-    print("\nScanning relevant elements (H2, H3, Table)...")
-    relevant_elements = content_div.find_all(['h2', 'h3', 'table'])
-    print(f"DEBUG: Found {len(relevant_elements)} relevant elements (H2, H3, TABLE).")
-
-    for element in relevant_elements:
-        # Process H2...
-        if element.name == 'h2':
-            h2_text = element.get_text(strip=True).replace('[edit]', '')
-            if re.match(r'^\d{4}s$', h2_text):
-                current_decade = h2_text; current_year = None; current_sb_num = None
-                print(f"** Switched to Decade: {current_decade}")
-            elif h2_text in ["See also", "References", "External links"]:
-                print(f"DEBUG: Stopping processing at H2: {h2_text}")
-                break
-            else: current_decade = None; current_year = None; current_sb_num = None
-        # Process H3...
-        elif element.name == 'h3':
-            if current_decade:
-                heading_text = element.get_text(strip=True).replace('[edit]', '')
-                match = re.match(r'(\d{4})\s*(?:\((\w+)\))?', heading_text)
-                if match:
-                    current_year = match.group(1); current_sb_num = match.group(2)
-                    print(f"  ** Set Year/SB: {current_year} / {current_sb_num or 'N/A'}")
-                else: current_year = None; current_sb_num = None
-        # Process Table...
-        elif element.name == 'table' and element.has_attr('class') and 'wikitable' in element['class']:
-            if current_year:
-                print(f"DEBUG: Found wikitable potentially for Year: {current_year}")
-                try:
-                    print(f"   -> Attempting to parse table with pd.read_html (NO dtype specified)...") # Updated message
-                    # --- MODIFICATION: REMOVED dtype='object' ---
-                    df_list = pd.read_html(StringIO(str(element)), flavor='bs4', header=0, keep_default_na=True)
-
-                    if df_list:
-                        df = df_list[0].copy()
-                        print(f"   -> Successfully parsed table. Original Cols: {df.columns.tolist()}")
-
-                        # --- Column Renaming ---
-                        rename_map = {}
-                        for col in df.columns:
-                            col_orig = str(col).strip(); col_norm = col_orig.lower()
-                            if col_norm == 'product type': rename_map[col_orig] = 'Product_Type'
-                            elif col_norm in ['product/title', 'advertiser/product']: rename_map[col_orig] = 'Advertiser_Product_Title'
-                            elif col_norm == 'title': rename_map[col_orig] = 'Title'
-                            elif col_norm.startswith('plot/notes'): rename_map[col_orig] = 'Plot_Notes'
-                        df.rename(columns=rename_map, inplace=True)
-                        print(f"   -> Renamed Cols Present: {list(rename_map.values())}")
-
-                        # Check essential columns
-                        if 'Product_Type' in df.columns and ('Advertiser_Product_Title' in df.columns or 'Title' in df.columns):
-                            print(f"   -> Essential renamed columns found.")
-                            df['Decade'] = current_decade; df['Year'] = current_year; df['SuperBowlNum'] = current_sb_num
-                            cols_to_keep = [col for col in FINAL_COLS if col in df.columns]
-                            df_processed = df[cols_to_keep].copy()
-                            all_data.append(df_processed)
-                            print(f"  -> === ADDED Standardized DATA for {current_year} ===")
-                        else: print(f"   -> *** Essential Renamed Columns NOT FOUND for {current_year}. Skipping table. ***")
-
-                    else: print(f"   -> pd.read_html returned empty list for {current_year}.")
-
-                # --- RE-ADDED ValueError CATCH specifically ---
-                except ValueError as ve:
-                     print(f"   -> VALUE ERROR parsing table for year {current_year}: {ve}. Skipping table.")
-                except Exception as e:
-                    print(f"   -> UNEXPECTED error parsing table for year {current_year}: {e}")
-
-                # Reset year after processing/attempting this table
-                current_year = None
-                current_sb_num = None
-
-
-    # --- Combine and Save Results ---
-    if all_data:
-        final_commercials_df = pd.concat([df.reindex(columns=FINAL_COLS) for df in all_data], ignore_index=True)
+        # --- Fetch and parse every source concurrently into one deduplicated frame ---
+        try:
+            sources = load_sources(sources_path) if sources_path else default_sources(fixture_path)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"ERROR: Could not load sources from '{sources_path}': {e}")
+            return
+        print(f"Scraping {len(sources)} source(s): {', '.join(source.name for source in sources)}")
+        with span('scrape.extract', engine=engine):
+            final_commercials_df, source_summary = scrape_sources(sources, max_workers=max_workers,
+                                                                  offline=offline, max_age=max_age)
+        print("\n--- Sources ---")
+        print(source_summary.to_string(index=False))
+
+    # --- Save Results ---
+    if final_commercials_df is not None and not final_commercials_df.empty:
         print("\n--- Finished Extraction ---")
         print(f"Total commercials extracted: {len(final_commercials_df)}")
         print("\n--- Preview of Final Combined DataFrame ---")
-        # ... (rest of print/save logic) ...
         print(final_commercials_df.head())
         output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILENAME)
-        final_commercials_df.to_csv(output_path, index=False)
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        with span('scrape.save'):
+            final_commercials_df.to_csv(output_path, index=False)
+            dataset_dir = write_dataset(final_commercials_df, COMMERCIALS_DATASET, mode='overwrite')
         print(f"\nData successfully saved to: {output_path}")
+        print(f"Year-partitioned Parquet dataset written to: {dataset_dir}")
     else:
         print("\nNo commercial data was successfully extracted and processed.")
-        # ... (rest of no data message) ...
 
-except Exception as e:
-    print(f"\nAn unexpected error occurred during parsing or processing: {e}")
 
-print("\n--- Data Acquisition Script Finished ---")
\ No newline at end of file
+def run(args):
+    main(offline=args.offline, fixture_path=args.fixture, max_age=args.max_age, engine=args.engine,
+         sources_path=args.sources, max_workers=args.workers)
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the Wikipedia list of Super Bowl commercials.")
+    run(add_arguments(parser).parse_args())
+    print("\n--- Data Acquisition Script Finished ---")
@@ -0,0 +1,248 @@
+# src/event_study.py
+# Run from the project root: python -m src.event_study
+
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.brand_matcher import load_brand_matcher
+from src.cli import add_report_arguments as add_arguments
+from src.instrumentation import span
+from src.storage import load_commercials
+from src.super_bowl_dates import super_bowl_sundays
+
+# --- Configuration ---
+RAW_DATA_DIR = 'data/raw'
+PROCESSED_DIR = 'data/processed'
+TICKER_MAP_PATH = os.path.join(RAW_DATA_DIR, 'advertiser_ticker_mapping.csv')
+COMMERCIALS_PATH = os.path.join(PROCESSED_DIR, 'wiki_super_bowl_commercials_extracted.csv')
+# Wide Close-price store saved by notebook 02 (date index, one column per ticker); .parquet also accepted
+PRICES_PATH = os.path.join(PROCESSED_DIR, 'stock_prices_close_auto_adjusted.csv')
+RESULTS_PATH = os.path.join(PROCESSED_DIR, 'event_study_results.csv')
+ABNORMAL_RETURNS_PATH = os.path.join(PROCESSED_DIR, 'event_study_abnormal_returns.csv')
+SIGNIFICANCE_PATH = os.path.join(PROCESSED_DIR, 'event_study_significance.csv')
+
+logger = logging.getLogger(__name__)
+
+MARKET_INDEX = '^GSPC'
+# Windows are in trading days relative to day 0, the first trading day on/after Super Bowl Sunday
+ESTIMATION_WINDOW = (-250, -11)
+EVENT_WINDOW = (-5, 5)
+CAR_WINDOWS = [(0, 0), (0, 1), (-1, 1), (0, 5), (-5, 5)]
+MIN_ESTIMATION_OBS = 120
+
+
+def load_prices(path=PRICES_PATH):
+    """Wide price table (DatetimeIndex x ticker) from the local CSV or Parquet store."""
+    if path.endswith('.parquet'):
+        prices = pd.read_parquet(path)
+    else:
+        prices = pd.read_csv(path, index_col=0)
+    prices.index = pd.to_datetime(prices.index)
+    prices = prices.sort_index().apply(pd.to_numeric, errors='coerce')
+    return prices[~prices.index.duplicated(keep='last')]
+
+
+def compute_returns(prices, log=False):
+    """Daily simple (or log) returns; gaps stay NaN instead of being forward-filled."""
+    if log:
+        return np.log(prices).diff()
+    return prices.pct_change(fill_method=None)
+
+
+def build_events(commercials_df, matcher=None, sb_dates=super_bowl_sundays):
+    """
+    One event per (StockTicker, Year) with at least one matched ad.
+    Adds the ad count, the brands involved and the Super Bowl Sunday date.
+    With matcher=None the frame must already be mapped (Primary_Advertiser,
+    StockTicker and ParentCompany columns, as written by the pipeline's map stage).
+    """
+    if matcher is None:
+        matched = commercials_df[['Primary_Advertiser', 'StockTicker', 'ParentCompany']].rename(
+            columns={'Primary_Advertiser': 'BrandName'})
+    else:
+        matched = matcher.match(commercials_df['Advertiser_Product_Title'])
+    ads = pd.DataFrame({
+        'Year': pd.to_numeric(commercials_df['Year'], errors='coerce').to_numpy(),
+        'StockTicker': matched['StockTicker'].to_numpy(),
+        'ParentCompany': matched['ParentCompany'].to_numpy(),
+        'BrandName': matched['BrandName'].to_numpy(),
+    }).dropna(subset=['Year', 'StockTicker'])
+    ads['Year'] = ads['Year'].astype(int)
+    ads = ads[ads['Year'].isin(list(sb_dates))]
+
+    events = ads.groupby(['StockTicker', 'Year'], sort=True).agg(
+        ParentCompany=('ParentCompany', 'first'),
+        Brands=('BrandName', lambda s: '; '.join(sorted(s.dropna().unique()))),
+        NumAds=('BrandName', 'size'),
+    ).reset_index()
+    events['EventDate'] = pd.to_datetime(events['Year'].map(sb_dates))
+    return events
+
+
+def event_day_index(trading_dates, event_dates):
+    """Row of the first trading day on/after each event date (Super Bowl Sunday -> Monday)."""
+    return np.searchsorted(trading_dates.to_numpy(), pd.DatetimeIndex(event_dates).to_numpy(), side='left')
+
+
+def window_label(window):
+    return f"[{window[0]:+d},{window[1]:+d}]"
+
+
+def run_event_study(returns, events, market=MARKET_INDEX, estimation_window=ESTIMATION_WINDOW,
+                    event_window=EVENT_WINDOW, car_windows=CAR_WINDOWS, min_estimation_obs=MIN_ESTIMATION_OBS):
+    """
+    Market-model event study for every (ticker, event date) at once.
+
+    All events are gathered into (event x day) matrices with a single fancy
+    index into the returns array, so alpha/beta/sigma, abnormal returns and
+    CARs are computed with masked matrix operations and no per-event loop.
+    Events with a missing ticker, too few estimation days or a window that
+    runs off the price history get NaN.
+
+    Returns (results, abnormal_returns): one row per event with Alpha, Beta,
+    Sigma, EstObs, EventDay0 and CAR / t-stat per window, plus an
+    (event x relative day) frame of abnormal returns.
+    """
+    ev_start, ev_end = event_window
+    for window in car_windows:
+        if window[0] < ev_start or window[1] > ev_end or window[0] > window[1]:
+            raise ValueError(f"CAR window {window} must lie inside the event window {event_window}")
+    if market not in returns.columns:
+        raise KeyError(f"Market index '{market}' not found in the returns columns")
+
+    n_days, n_tickers = returns.shape
+    # A trailing all-NaN row/column absorbs out-of-range days and unknown tickers
+    padded = np.full((n_days + 1, n_tickers + 1), np.nan)
+    padded[:n_days, :n_tickers] = returns.to_numpy(dtype=np.float64, na_value=np.nan)
+    market_returns = padded[:, returns.columns.get_loc(market)]
+
+    ticker_cols = returns.columns.get_indexer(events['StockTicker'])
+    ticker_cols = np.where(ticker_cols >= 0, ticker_cols, n_tickers)
+    day0 = event_day_index(returns.index, events['EventDate'])
+    # An event dated after the last trading day has no day 0; its windows would land on unrelated dates
+    in_history = day0 < n_days
+
+    def gather(first, last):
+        rows = day0[:, None] + np.arange(first, last + 1)[None, :]
+        rows = np.where((rows >= 0) & (rows < n_days) & in_history[:, None], rows, n_days)
+        return padded[rows, ticker_cols[:, None]], market_returns[rows]
+
+    # --- Estimation window: per-event OLS of stock on market returns ---
+    y, x = gather(*estimation_window)
+    mask = np.isfinite(y) & np.isfinite(x)
+    n_obs = mask.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = np.where(mask, x, 0.0).sum(axis=1) / n_obs
+        mean_y = np.where(mask, y, 0.0).sum(axis=1) / n_obs
+        dx = np.where(mask, x - mean_x[:, None], 0.0)
+        dy = np.where(mask, y - mean_y[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        beta = (dx * dy).sum(axis=1) / sxx
+        alpha = mean_y - beta * mean_x
+        resid = np.where(mask, dy - beta[:, None] * dx, 0.0)
+        sigma = np.sqrt((resid * resid).sum(axis=1) / (n_obs - 2))
+    usable = (n_obs >= min_estimation_obs) & (sxx > 0)
+    alpha[~usable] = np.nan; beta[~usable] = np.nan; sigma[~usable] = np.nan
+
+    # --- Event window: abnormal returns and CARs ---
+    ey, ex = gather(ev_start, ev_end)
+    abnormal = ey - (alpha[:, None] + beta[:, None] * ex)
+    offsets = np.arange(ev_start, ev_end + 1)
+
+    results = events.reset_index(drop=True).copy()
+    results['EventDay0'] = pd.Series(returns.index.append(pd.DatetimeIndex([pd.NaT]))[np.minimum(day0, n_days)])
+    results['Alpha'] = alpha
+    results['Beta'] = beta
+    results['Sigma'] = sigma
+    results['EstObs'] = n_obs
+    for window in car_windows:
+        cols = slice(window[0] - ev_start, window[1] - ev_start + 1)
+        window_ar = abnormal[:, cols]
+        days = np.isfinite(window_ar).sum(axis=1)
+        car = np.where(days == window_ar.shape[1], np.nansum(window_ar, axis=1), np.nan)
+        label = window_label(window)
+        results[f'CAR{label}'] = car
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results[f't{label}'] = car / (sigma * np.sqrt(window_ar.shape[1]))
+
+    abnormal_returns = pd.DataFrame(abnormal, columns=pd.Index(offsets, name='RelativeDay'))
+    abnormal_returns.index = pd.MultiIndex.from_frame(results[['StockTicker', 'Year']])
+    return results, abnormal_returns
+
+
+def summarize_cars(results, car_windows=CAR_WINDOWS):
+    """Cross-sectional mean CAR per window with a simple t-test and share of positive CARs."""
+    rows = []
+    for window in car_windows:
+        car = results[f'CAR{window_label(window)}'].dropna()
+        n = len(car)
+        std = car.std(ddof=1) if n > 1 else np.nan
+        rows.append({
+            'Window': window_label(window), 'Events': n, 'MeanCAR': car.mean(), 'MedianCAR': car.median(),
+            'StdCAR': std, 't_stat': car.mean() / (std / np.sqrt(n)) if n > 1 and std > 0 else np.nan,
+            'PctPositive': (car > 0).mean() * 100 if n else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(n_resamples=0, n_placebos=500, n_jobs=None, seed=0):
+    print(f"--- Event Study: Super Bowl Ads vs. Abnormal Returns ---")
+    logger.debug("Environment", extra={'fields': {'python': sys.executable, 'pandas': pd.__version__}})
+
+    try:
+        prices = load_prices(PRICES_PATH)
+        print(f"Loaded prices for {prices.shape[1]} tickers, {prices.index.min().date()} to {prices.index.max().date()}.")
+    except FileNotFoundError:
+        print(f"ERROR: Price store not found at '{PRICES_PATH}'. Run the download cells in notebook 02 first.")
+        return
+    try:
+        commercials_df = load_commercials(COMMERCIALS_PATH)
+        matcher = load_brand_matcher(TICKER_MAP_PATH)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        return
+
+    events = build_events(commercials_df, matcher)
+    print(f"Built {len(events)} (ticker, year) events from {int(events['NumAds'].sum())} matched ads.")
+    missing = sorted(set(events['StockTicker']) - set(prices.columns))
+    if missing:
+        print(f"WARNING: No prices for {len(missing)} tickers (their events get NaN): {missing}")
+
+    returns = compute_returns(prices)
+    with span('event_study.estimate', events=len(events)):
+        results, abnormal_returns = run_event_study(returns, events)
+    print(f"Estimated {results['Beta'].notna().sum()} of {len(results)} events.")
+    print("\n--- Cross-sectional CAR summary ---")
+    print(summarize_cars(results).to_string(index=False))
+
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    results.to_csv(RESULTS_PATH, index=False)
+    abnormal_returns.to_csv(ABNORMAL_RETURNS_PATH)
+    print(f"\nResults saved to: {RESULTS_PATH}")
+    print(f"Abnormal returns saved to: {ABNORMAL_RETURNS_PATH}")
+
+    if n_resamples:
+        from src.resampling import significance_table
+        print(f"\nRunning {n_resamples} bootstrap/permutation resamples ({n_placebos} placebo dates per event)...")
+        with span('event_study.significance', resamples=n_resamples):
+            significance = significance_table(returns, results, n_resamples=n_resamples, n_placebos=n_placebos,
+                                              seed=seed, n_jobs=n_jobs)
+        print(significance.to_string(index=False))
+        significance.to_csv(SIGNIFICANCE_PATH, index=False)
+        print(f"Significance tests saved to: {SIGNIFICANCE_PATH}")
+
+
+def run(args):
+    main(n_resamples=args.resamples, n_placebos=args.placebos, n_jobs=args.jobs, seed=args.seed)
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Market-model event study around Super Bowl Sunday.")
+    run(add_arguments(parser).parse_args())
+    print("\n--- Event Study Script Finished ---")
@@ -0,0 +1,143 @@
+# src/fuzzy_brands.py
+
+import re
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from src.brand_matcher import MATCH_COLS
+
+NGRAM = 3
+# Brands must share at least this share of their n-grams with a title to be shortlisted
+MIN_OVERLAP = 0.4
+# Candidates per title that get the (slower) alignment score
+SHORTLIST = 25
+MIN_CONFIDENCE = 0.8
+TOP_K = 3
+
+_POSSESSIVE = re.compile(r"(\w)['’]s\b")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(text):
+    """Lowercase, drop possessive 's, collapse punctuation/whitespace to single spaces."""
+    text = _POSSESSIVE.sub(r"\1", str(text).lower())
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def char_ngrams(text, n=NGRAM):
+    """Distinct character n-grams of a normalized string, padded so word edges count."""
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class FuzzyBrandIndex:
+    """
+    Character n-gram index over the brand map for resolving titles the exact
+    matcher missed (misspellings, possessives, spacing, sub-brands).
+
+    Resolution runs in two stages so the cost does not grow with brands x titles:
+    1. the title's n-grams are looked up in an inverted index and the overlap
+       with every brand is counted in one np.bincount; brands covering at least
+       MIN_OVERLAP of their n-grams form a shortlist of at most SHORTLIST;
+    2. each shortlisted brand is aligned against word windows of the title of
+       about the brand's length (difflib ratio, spaces ignored), which gives the
+       confidence.
+
+    `lookup` is a BrandMatcher.lookup frame: lowercase brand index with
+    BrandName, StockTicker and ParentCompany columns.
+    """
+
+    def __init__(self, lookup, n=NGRAM):
+        self.n = n
+        self.lookup = lookup.reset_index(drop=True)
+        names = [normalize_text(name) for name in self.lookup['BrandName']]
+        self.names = names
+        self.compact = [name.replace(' ', '') for name in names]
+        self.word_counts = np.array([len(name.split()) for name in names], dtype=np.int64)
+
+        vocab = {}
+        brand_ids, gram_ids = [], []
+        sizes = np.zeros(len(names), dtype=np.int64)
+        for bid, name in enumerate(names):
+            if not name:
+                continue
+            grams = char_ngrams(name, n)
+            sizes[bid] = len(grams)
+            for gram in grams:
+                brand_ids.append(bid)
+                gram_ids.append(vocab.setdefault(gram, len(vocab)))
+        self.vocab = vocab
+        self.sizes = sizes
+
+        # CSR-style postings: brands for n-gram g are postings[offsets[g]:offsets[g + 1]]
+        gram_ids = np.asarray(gram_ids, dtype=np.int64)
+        order = np.argsort(gram_ids, kind='stable')
+        self.postings = np.asarray(brand_ids, dtype=np.int64)[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(gram_ids, minlength=len(vocab)))])
+
+    def shortlist(self, text, min_overlap=MIN_OVERLAP, limit=SHORTLIST):
+        """(brand ids, overlap shares) of the best candidates for a normalized title."""
+        grams = [self.vocab[gram] for gram in char_ngrams(text, self.n) if gram in self.vocab]
+        if not grams:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        hits = np.concatenate([self.postings[self.offsets[g]:self.offsets[g + 1]] for g in grams])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            overlap = np.bincount(hits, minlength=len(self.sizes)) / self.sizes
+        candidates = np.flatnonzero(overlap >= min_overlap)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-overlap[candidates], limit - 1)[:limit]]
+        return candidates, overlap[candidates]
+
+    def _align(self, words, bid):
+        """Best ratio of the brand against title windows of its word count +/- 1, and that window."""
+        target = self.compact[bid]
+        width = int(self.word_counts[bid])
+        best, best_window = 0.0, ''
+        matcher = SequenceMatcher(autojunk=False)
+        matcher.set_seq2(target)
+        for size in range(max(1, width - 1), min(len(words), width + 1) + 1):
+            for start in range(len(words) - size + 1):
+                window = words[start:start + size]
+                matcher.set_seq1(''.join(window))
+                if matcher.real_quick_ratio() <= best or matcher.quick_ratio() <= best:
+                    continue
+                ratio = matcher.ratio()
+                if ratio > best:
+                    best, best_window = ratio, ' '.join(window)
+        return best, best_window
+
+    def suggest_one(self, title, top_k=TOP_K, min_confidence=MIN_CONFIDENCE):
+        """Ranked (brand id, confidence, overlap, matched text) tuples for one title."""
+        if pd.isna(title):
+            return []
+        text = normalize_text(title)
+        candidates, overlap = self.shortlist(text)
+        words = text.split()
+        scored = []
+        for bid, share in zip(candidates, overlap):
+            confidence, window = self._align(words, bid)
+            if confidence >= min_confidence:
+                scored.append((int(bid), confidence, float(share), window))
+        # Higher confidence first; longer brands win ties ("bud light" over "bud")
+        scored.sort(key=lambda item: (-item[1], -len(self.compact[item[0]]), -item[2]))
+        return scored[:top_k]
+
+    def suggest(self, titles, top_k=TOP_K, min_confidence=MIN_CONFIDENCE):
+        """
+        Ranked suggestions for many titles as a tidy frame: one row per
+        (title, rank) with the brand's map columns, Confidence (0-1 alignment
+        score), Overlap (share of the brand's n-grams found) and MatchedText.
+        Each distinct title is resolved once.
+        """
+        rows = []
+        for title in pd.unique(pd.Series(titles, dtype=object).dropna()):
+            for rank, (bid, confidence, share, window) in enumerate(
+                    self.suggest_one(title, top_k=top_k, min_confidence=min_confidence), start=1):
+                brand = self.lookup.iloc[bid]
+                rows.append({'Advertiser_Product_Title': title, 'Rank': rank,
+                             **{col: brand[col] for col in MATCH_COLS},
+                             'Confidence': round(confidence, 3), 'Overlap': round(share, 3), 'MatchedText': window})
+        columns = ['Advertiser_Product_Title', 'Rank', *MATCH_COLS, 'Confidence', 'Overlap', 'MatchedText']
+        return pd.DataFrame(rows, columns=columns)
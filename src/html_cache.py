@@ -0,0 +1,139 @@
+# src/html_cache.py
+
+import hashlib
+import json
+import os
+import re
+import time
+
+from src.instrumentation import incr, span
+
+# Raw page snapshots live here: <cache_dir>/<url key>/<revision>.html plus latest.json
+HTML_CACHE_DIR = 'data/raw/html_cache'
+REQUEST_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
+# MediaWiki embeds the page revision in its config block
+REVISION_RE = re.compile(r'"wgRevisionId"\s*:\s*(\d+)')
+
+
+class SnapshotMissingError(FileNotFoundError):
+    """Raised in offline mode when no stored snapshot exists for a URL."""
+
+
+def url_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+
+def page_revision(html):
+    """Wikipedia revision id when present, otherwise a content hash."""
+    match = REVISION_RE.search(html)
+    if match:
+        return match.group(1)
+    return 'sha1-' + hashlib.sha1(html.encode('utf-8')).hexdigest()[:16]
+
+
+def _meta_path(url, cache_dir):
+    return os.path.join(cache_dir, url_key(url), 'latest.json')
+
+
+def load_snapshot(url, cache_dir=HTML_CACHE_DIR):
+    """Returns (html, meta) for the latest stored snapshot of url, or (None, None)."""
+    meta_path = _meta_path(url, cache_dir)
+    if not os.path.exists(meta_path):
+        return None, None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    html_path = os.path.join(cache_dir, url_key(url), meta['file'])
+    if not os.path.exists(html_path):
+        return None, None
+    with open(html_path, encoding='utf-8') as f:
+        return f.read(), meta
+
+
+def save_snapshot(url, html, etag=None, last_modified=None, cache_dir=HTML_CACHE_DIR):
+    """Stores html as a new revision of url and points latest.json at it."""
+    revision = page_revision(html)
+    url_dir = os.path.join(cache_dir, url_key(url))
+    os.makedirs(url_dir, exist_ok=True)
+    html_file = f"{revision}.html"
+    html_path = os.path.join(url_dir, html_file)
+    if not os.path.exists(html_path):
+        with open(html_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(html_path + '.tmp', html_path)
+    meta = {
+        'url': url, 'revision': revision, 'file': html_file,
+        'etag': etag, 'last_modified': last_modified, 'checked_at': time.time(),
+    }
+    _write_meta(url, meta, cache_dir)
+    return meta
+
+
+def _write_meta(url, meta, cache_dir):
+    meta_path = _meta_path(url, cache_dir)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def fetch_html(url, cache_dir=HTML_CACHE_DIR, offline=False, fixture_path=None,
+               max_age=None, headers=None, timeout=15):
+    """
+    Returns the HTML for url, going to the network as little as possible.
+
+    - fixture_path: read this local file instead (fully offline replay).
+    - offline: serve the latest stored snapshot; raise SnapshotMissingError if none.
+    - max_age: seconds a stored snapshot is trusted without revalidation.
+    - otherwise revalidate with If-None-Match / If-Modified-Since; a 304 reuses
+      the stored snapshot, a 200 is stored as a new revision.
+    Network errors fall back to the stored snapshot when there is one.
+    """
+    if fixture_path:
+        with open(fixture_path, encoding='utf-8') as f:
+            print(f"Replaying local fixture: {fixture_path}")
+            incr('html.fixture')
+            return f.read()
+
+    cached_html, meta = load_snapshot(url, cache_dir)
+    if offline:
+        if cached_html is None:
+            raise SnapshotMissingError(f"No stored snapshot for {url} in '{cache_dir}'")
+        print(f"Offline mode: using stored snapshot (revision {meta['revision']}).")
+        incr('html.snapshot_hit')
+        return cached_html
+
+    if cached_html is not None and max_age is not None and time.time() - meta.get('checked_at', 0) < max_age:
+        print(f"Using stored snapshot (revision {meta['revision']}, checked < {max_age}s ago).")
+        incr('html.snapshot_hit')
+        return cached_html
+
+    import requests  # only needed when actually going to the network
+    request_headers = dict(REQUEST_HEADERS if headers is None else headers)
+    if cached_html is not None:
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        incr('html.requests')
+        with span('html.request'):
+            response = requests.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and cached_html is not None:
+            print(f"Not modified since last fetch; using stored snapshot (revision {meta['revision']}).")
+            incr('html.not_modified')
+            meta['checked_at'] = time.time()
+            _write_meta(url, meta, cache_dir)
+            return cached_html
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        if cached_html is None:
+            raise
+        print(f"WARNING: Fetch failed ({e}); falling back to stored snapshot (revision {meta['revision']}).")
+        incr('html.fallback')
+        return cached_html
+
+    meta = save_snapshot(url, response.text, etag=response.headers.get('ETag'),
+                         last_modified=response.headers.get('Last-Modified'), cache_dir=cache_dir)
+    print(f"Fetched and stored snapshot (revision {meta['revision']}).")
+    incr('html.fetched')
+    return response.text
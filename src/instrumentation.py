@@ -0,0 +1,242 @@
+# src/instrumentation.py
+
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+METRICS_DIR = 'data/processed/metrics'
+PROFILE_TOP_N = 40  # functions kept from the cProfile stats, by cumulative time
+MEMORY_TOP_N = 25   # allocation sites kept from the tracemalloc snapshot
+LOG_FORMATS = ('text', 'json')
+
+
+class Metrics:
+    """
+    Thread-safe counters and timing spans for one process.
+
+    Spans nest per thread ("pipeline.map/brand_matcher.match") and keep
+    calls, total/max wall time and, while tracemalloc is tracing, the peak
+    traced memory seen inside the span. Counters are plain named totals
+    (tables parsed, titles matched, API calls, retries, cache hits, ...).
+
+    tracemalloc keeps one process-wide peak, so per-span peaks are only
+    meaningful when spans run one at a time; inside concurrent() (the
+    pipeline running stages in parallel) new spans record no peak.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._concurrent = 0
+        self._open = []  # frames of the spans measuring memory, across all threads
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.spans = {}
+            self.started_at = time.time()
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def concurrent(self):
+        """Marks a block where spans may run in several threads at once."""
+        with self.lock:
+            self._concurrent += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self._concurrent -= 1
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **fields):
+        """Times the block under `name` (nested inside the current span of this thread)."""
+        stack = self._stack()
+        path = f"{stack[-1]['path']}/{name}" if stack else name
+        tracing = tracemalloc.is_tracing() and not self._concurrent
+        frame = {'path': path, 'peak': 0}
+        if tracing:
+            # Carry the peak so far into every open span (their work may run in another
+            # thread, e.g. a pipeline stage), then measure this span from a fresh peak
+            with self.lock:
+                peak = tracemalloc.get_traced_memory()[1]
+                for other in self._open:
+                    other['peak'] = max(other['peak'], peak)
+                tracemalloc.reset_peak()
+                self._open.append(frame)
+        stack.append(frame)
+        logger = logging.getLogger('src.instrumentation')
+        logger.debug("span start", extra={'fields': {'span': path, **fields}})
+        start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            peak = None
+            with self.lock:
+                if tracing:
+                    peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                    self._open.remove(frame)
+                entry = self.spans.setdefault(path, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'peak_mb': None})
+                entry['calls'] += 1
+                entry['total_s'] += elapsed
+                entry['max_s'] = max(entry['max_s'], elapsed)
+                if peak is not None:
+                    entry['peak_mb'] = max(entry['peak_mb'] or 0.0, peak / 2**20)
+            logger.debug("span end", extra={'fields': {'span': path, 'seconds': round(elapsed, 4), **fields}})
+
+    def snapshot(self):
+        with self.lock:
+            spans = {path: {**entry, 'total_s': round(entry['total_s'], 4), 'max_s': round(entry['max_s'], 4),
+                            'peak_mb': None if entry['peak_mb'] is None else round(entry['peak_mb'], 2)}
+                     for path, entry in self.spans.items()}
+            return {'counters': dict(sorted(self.counters.items())), 'spans': dict(sorted(spans.items()))}
+
+
+# Process-wide registry used by the module-level helpers
+METRICS = Metrics()
+
+
+def incr(name, value=1):
+    METRICS.incr(name, value)
+
+
+def span(name, **fields):
+    return METRICS.span(name, **fields)
+
+
+def concurrent():
+    return METRICS.concurrent()
+
+
+# --- Structured logging ---
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        message = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name,
+                 'thread': record.threadName, 'msg': record.getMessage(), **getattr(record, 'fields', {})}
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level='WARNING', fmt='text', stream=None):
+    """
+    Routes the package's loggers ('src.*') to stderr as text or JSON lines.
+    Progress messages for people stay on stdout via print; log records carry
+    the detail (per-table parsing, per-request waits) at DEBUG/INFO.
+    """
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format '{fmt}' (expected one of {LOG_FORMATS})")
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(_JsonFormatter() if fmt == 'json'
+                         else _TextFormatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    package_logger = logging.getLogger('src')
+    package_logger.handlers[:] = [handler]
+    package_logger.setLevel(level.upper() if isinstance(level, str) else level)
+    package_logger.propagate = False
+    return package_logger
+
+
+# --- Run capture ---
+def _profile_rows(profiler):
+    import pstats
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (primitive, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': f"{os.path.relpath(filename) if os.path.isabs(filename) else filename}:{line}({func})",
+                     'calls': calls, 'primitive_calls': primitive,
+                     'tottime_s': round(tottime, 4), 'cumtime_s': round(cumtime, 4)})
+    rows.sort(key=lambda row: row['cumtime_s'], reverse=True)
+    return rows[:PROFILE_TOP_N]
+
+
+def _memory_rows(snapshot):
+    stats = snapshot.statistics('lineno')
+    return [{'site': f"{os.path.relpath(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+             'size_mb': round(stat.size / 2**20, 3), 'blocks': stat.count} for stat in stats[:MEMORY_TOP_N]]
+
+
+def default_metrics_path(name):
+    return os.path.join(METRICS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+
+
+@contextmanager
+def instrumented_run(name, metrics_path=None, profile=False, trace_memory=False, argv=None):
+    """
+    Wraps a whole command: resets the metrics, optionally runs it under
+    cProfile and/or tracemalloc, and writes one JSON metrics file with the
+    environment, total wall time, spans, counters and (when enabled) the top
+    functions by cumulative time and the top allocation sites. The raw
+    cProfile stats go next to it as <metrics>.prof (for snakeviz/pstats).
+    """
+    metrics_path = metrics_path or default_metrics_path(name)
+    METRICS.reset()
+    profiler = None
+    if trace_memory:
+        tracemalloc.start()
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    status = 'ok'
+    start = time.perf_counter()
+    try:
+        with span(name):
+            yield METRICS
+    except BaseException as e:
+        status = f"error: {type(e).__name__}: {e}"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+        report = {
+            'command': name, 'argv': list(sys.argv if argv is None else argv), 'status': status,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(METRICS.started_at)),
+            'wall_s': round(elapsed, 4),
+            'environment': {'python': platform.python_version(), 'executable': sys.executable,
+                            'platform': platform.platform(), 'cpus': os.cpu_count(),
+                            'pandas': getattr(sys.modules.get('pandas'), '__version__', None),
+                            'numpy': getattr(sys.modules.get('numpy'), '__version__', None)},
+            **METRICS.snapshot(),
+        }
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Spans reset tracemalloc's peak as they go; the root span carries the run's true peak
+            root_peak = report['spans'].get(name, {}).get('peak_mb')
+            peak = max(peak, (root_peak or 0) * 2**20)
+            report['memory'] = {'current_mb': round(current / 2**20, 2), 'peak_mb': round(peak / 2**20, 2),
+                                'top_sites': _memory_rows(tracemalloc.take_snapshot())}
+            tracemalloc.stop()
+        os.makedirs(os.path.dirname(metrics_path) or '.', exist_ok=True)
+        if profiler is not None:
+            report['profile'] = {'stats_file': metrics_path + '.prof', 'top_cumulative': _profile_rows(profiler)}
+            profiler.dump_stats(metrics_path + '.prof')
+        with open(metrics_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nMetrics written to: {metrics_path}")
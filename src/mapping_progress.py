@@ -0,0 +1,195 @@
+# src/mapping_progress.py
+
+import hashlib
+import heapq
+import os
+import pickle
+
+import pandas as pd
+
+from src.brand_matcher import CACHE_DIR, MATCH_COLS, file_sha256
+from src.storage import COMMERCIALS_DATASET, DATASETS_DIR, dataset_path
+
+# Bump when MappingState's fields or the matching rules change so old state files are ignored
+STATE_VERSION = 2
+# Above this many added brands a filtered re-scan stops paying off; re-scan every title instead
+MAX_ADDED_BRANDS_FILTER = 200
+
+
+def state_path(word_boundary=False, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"mapping_progress.v{STATE_VERSION}.{'wb' if word_boundary else 'sub'}.pkl")
+
+
+def commercials_fingerprint(csv_path, base_dir=DATASETS_DIR):
+    """
+    Cheap identity of whatever load_commercials would read: the Parquet
+    dataset's file names/sizes/mtimes when it exists, else the CSV's hash.
+    """
+    path = dataset_path(COMMERCIALS_DATASET, base_dir)
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for root, dirs, files in sorted(os.walk(path)):
+            dirs.sort()
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{os.path.relpath(os.path.join(root, name), path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        return 'parquet:' + digest.hexdigest()
+    return 'csv:' + file_sha256(csv_path)
+
+
+def _brand_rows(matcher):
+    """lowercase brand -> (BrandName, StockTicker, ParentCompany) for the matcher's lookup."""
+    lookup = matcher.lookup.astype(object).where(matcher.lookup.notna(), None)
+    return dict(zip(lookup.index, lookup[MATCH_COLS].itertuples(index=False, name=None)))
+
+
+class MappingState:
+    """
+    Mapping coverage kept up to date between runs.
+
+    Stores the brand each distinct Advertiser_Product_Title was assigned to
+    (as its lowercase key, None when unmapped), how often each title occurs,
+    the brand rows it was matched against, and running row counts per brand
+    and per unmapped title. `update` diffs a new commercials column and/or a
+    new matcher against this and only re-scans the titles that can change:
+
+    - titles that are new in the commercials file
+    - titles assigned to a brand that was removed from the map
+    - titles containing a newly added brand (substring pre-filter)
+
+    Renaming a brand's ticker or parent only touches the lookup rows.
+    """
+
+    def __init__(self, word_boundary=False):
+        self.word_boundary = word_boundary
+        self.fingerprint = None
+        self.brand_rows = {}
+        self.title_counts = {}
+        self.assignments = {}
+        self.missing_titles = 0
+        self.mapped_counts = {}
+        self.unmapped_counts = {}
+
+    # --- Persistence ---
+    @classmethod
+    def load(cls, path):
+        """Saved state, or None if there is none (or it cannot be read)."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable mapping state '{path}': {e}")
+            return None
+        return state if isinstance(state, cls) else None
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    # --- Updates ---
+    def _add_rows(self, title, key, n):
+        bucket, bucket_key = (self.mapped_counts, key) if key is not None else (self.unmapped_counts, title)
+        total = bucket.get(bucket_key, 0) + n
+        if total:
+            bucket[bucket_key] = total
+        else:
+            bucket.pop(bucket_key, None)
+
+    def _rescan(self, titles, matcher):
+        titles = list(titles)
+        if not titles:
+            return 0
+        brands = matcher.match(pd.Series(titles, dtype=object))['BrandName']
+        reassigned = 0
+        for title, brand in zip(titles, brands):
+            key = None if pd.isna(brand) else str(brand).lower()
+            count = self.title_counts[title]
+            if title in self.assignments:
+                old_key = self.assignments[title]
+                if old_key == key:
+                    continue
+                self._add_rows(title, old_key, -count)
+                reassigned += 1
+            self.assignments[title] = key
+            self._add_rows(title, key, count)
+        return reassigned
+
+    def update(self, matcher, titles=None, fingerprint=None):
+        """
+        Brings the state in line with `matcher` and (optionally) a new
+        Advertiser_Product_Title column. titles=None means the commercials are
+        unchanged. Returns a dict describing what changed.
+        """
+        changes = {'new_titles': 0, 'removed_titles': 0, 'count_changes': 0, 'added_brands': 0,
+                   'removed_brands': 0, 'relabeled_brands': 0, 'rescanned': 0, 'reassigned': 0}
+        new_titles = []
+        if titles is not None:
+            counts = titles.value_counts(dropna=True)
+            self.missing_titles = int(titles.isna().sum())
+            old_counts = pd.Series(self.title_counts, dtype='int64')
+            delta = counts.sub(old_counts, fill_value=0)
+            delta = delta[delta != 0]
+            for title, diff in zip(delta.index, delta.to_numpy().astype(int)):
+                if title in self.assignments:
+                    self._add_rows(title, self.assignments[title], diff)
+                    new_count = self.title_counts[title] + diff
+                    if new_count:
+                        self.title_counts[title] = new_count
+                        changes['count_changes'] += 1
+                    else:
+                        del self.title_counts[title], self.assignments[title]
+                        changes['removed_titles'] += 1
+                else:
+                    self.title_counts[title] = diff
+                    new_titles.append(title)
+            changes['new_titles'] = len(new_titles)
+            self.fingerprint = fingerprint
+
+        new_rows = _brand_rows(matcher)
+        added = [key for key in new_rows if key not in self.brand_rows]
+        removed = {key for key in self.brand_rows if key not in new_rows}
+        changes['added_brands'], changes['removed_brands'] = len(added), len(removed)
+        changes['relabeled_brands'] = sum(1 for key, row in new_rows.items()
+                                          if key in self.brand_rows and self.brand_rows[key] != row)
+        self.brand_rows = new_rows
+
+        if len(added) > MAX_ADDED_BRANDS_FILTER:
+            affected = set(self.title_counts)
+        else:
+            affected = set(new_titles)
+            if removed:
+                affected.update(title for title, key in self.assignments.items() if key in removed)
+            if added:
+                tracked = pd.Series(list(self.assignments), dtype=object)
+                lower = tracked.str.lower()
+                hit = pd.Series(False, index=tracked.index)
+                for key in added:
+                    hit |= lower.str.contains(key, regex=False)
+                affected.update(tracked[hit])
+        changes['rescanned'] = len(affected)
+        changes['reassigned'] = self._rescan(affected, matcher)
+        return changes
+
+    # --- Reporting ---
+    def total_rows(self):
+        return sum(self.title_counts.values()) + self.missing_titles
+
+    def mapped_rows(self):
+        return sum(self.mapped_counts.values())
+
+    def top_mapped(self, n=30):
+        """Row counts of the n most frequent Primary_Advertiser values."""
+        top = heapq.nsmallest(n, self.mapped_counts.items(), key=lambda item: (-item[1], item[0]))
+        return pd.Series([count for _, count in top], name='count',
+                         index=pd.Index([self.brand_rows[key][0] for key, _ in top], name='Primary_Advertiser'))
+
+    def top_unmapped(self, n=50):
+        """Row counts of the n most frequent unmapped titles."""
+        top = heapq.nsmallest(n, self.unmapped_counts.items(), key=lambda item: (-item[1], item[0]))
+        return pd.Series([count for _, count in top], name='count',
+                         index=pd.Index([title for title, _ in top], name='Advertiser_Product_Title'))
@@ -0,0 +1,425 @@
+# src/pipeline.py
+# Run from the project root: python -m src.pipeline [--stages event_study] [--force]
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+from src.brand_matcher import file_sha256
+from src.cli import add_pipeline_arguments as add_arguments
+from src.config import PIPELINE_WORKERS
+from src.html_cache import HTML_CACHE_DIR
+from src.instrumentation import concurrent, incr, span
+
+# --- Configuration ---
+RAW_DATA_DIR = 'data/raw'
+PROCESSED_DIR = 'data/processed'
+PIPELINE_DIR = 'data/cache/pipeline'
+STATE_FILENAME = 'state.json'       # last input key and output hashes per stage
+RUN_LOG_FILENAME = 'runs.jsonl'     # one record per pipeline run
+OBJECTS_DIRNAME = 'objects'         # stored outputs, <stage>/<input key>/...
+KEEP_VERSIONS = 3                   # stored output versions kept per stage
+MAX_WORKERS = PIPELINE_WORKERS
+
+TICKER_MAP_PATH = os.path.join(RAW_DATA_DIR, 'advertiser_ticker_mapping.csv')
+PAGE_PATH = os.path.join(HTML_CACHE_DIR, 'list_of_super_bowl_commercials.html')
+COMMERCIALS_PATH = os.path.join(PROCESSED_DIR, 'wiki_super_bowl_commercials_extracted.csv')
+MAPPED_PATH = os.path.join(PROCESSED_DIR, 'commercials_mapped.csv')
+RETURNS_PATH = os.path.join(PROCESSED_DIR, 'stock_returns.parquet')
+
+
+def path_hash(path):
+    """SHA-256 of a file, or of every file (name + content hash) under a directory."""
+    if not os.path.isdir(path):
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            digest.update(f"{os.path.relpath(full, path)}:{file_sha256(full)}\n".encode())
+    return digest.hexdigest()
+
+
+def _copy(src, dst):
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+class Stage:
+    """
+    One pipeline step: func(**params) reads `inputs` and writes `outputs`
+    (file or directory paths). Edges between stages follow from one stage's
+    outputs being another's inputs. Bump `version` when func changes in a way
+    that should invalidate stored results. always_run stages (the network
+    fetch) run every time; their downstream still skips when the output
+    content is unchanged.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, always_run=False, version=1):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+        self.always_run = always_run
+        self.version = version
+
+
+class Pipeline:
+    """
+    Runs a DAG of Stages with content-addressed caching.
+
+    A stage's key is a hash of its name, version, params and the content of
+    every input. If the key matches the last run and the outputs are still
+    as that run left them, the stage is skipped; if an older run with the
+    same key is in the object store, its outputs are restored instead of
+    recomputed. Stages whose dependencies are finished run concurrently on a
+    thread pool. Every run appends per-stage status, timing and keys to a
+    JSON-lines run log.
+    """
+
+    def __init__(self, stages, pipeline_dir=PIPELINE_DIR, max_workers=MAX_WORKERS):
+        self.stages = {stage.name: stage for stage in stages}
+        self.pipeline_dir = pipeline_dir
+        self.max_workers = max_workers
+        producers = {path: stage.name for stage in stages for path in stage.outputs}
+        self.deps = {stage.name: {producers[path] for path in stage.inputs if path in producers} - {stage.name}
+                     for stage in stages}
+        self.state = {}
+        state_path = os.path.join(pipeline_dir, STATE_FILENAME)
+        if os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    # --- Graph ---
+    def order(self):
+        """Stage names in a dependency-respecting order (raises on cycles)."""
+        done, ordered = set(), []
+        remaining = dict(self.deps)
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if deps <= done)
+            if not ready:
+                raise ValueError(f"Pipeline has a dependency cycle among {sorted(remaining)}")
+            for name in ready:
+                ordered.append(name); done.add(name); del remaining[name]
+        return ordered
+
+    def upstream(self, targets):
+        """targets plus every stage they (transitively) depend on."""
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}' (known: {sorted(self.stages)})")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.deps[name])
+        return selected
+
+    # --- Caching ---
+    def stage_key(self, stage, input_hashes):
+        payload = json.dumps({'stage': stage.name, 'version': stage.version, 'params': stage.params,
+                              'inputs': input_hashes}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _object_dir(self, stage, key):
+        return os.path.join(self.pipeline_dir, OBJECTS_DIRNAME, stage.name, key[:32])
+
+    def _outputs_current(self, stage, key):
+        entry = self.state.get(stage.name)
+        if not entry or entry.get('key') != key:
+            return False
+        return all(os.path.exists(path) and path_hash(path) == entry['outputs'].get(path) for path in stage.outputs)
+
+    def _store(self, stage, key):
+        object_dir = self._object_dir(stage, key)
+        tmp_dir = f"{object_dir}.{os.getpid()}.tmp"
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        for i, path in enumerate(stage.outputs):
+            _copy(path, os.path.join(tmp_dir, f"{i:02d}_{os.path.basename(path.rstrip(os.sep))}"))
+        if os.path.isdir(object_dir):
+            shutil.rmtree(object_dir)
+        os.replace(tmp_dir, object_dir)
+        # Keep only the newest KEEP_VERSIONS stored results for this stage
+        stage_dir = os.path.dirname(object_dir)
+        versions = sorted((os.path.join(stage_dir, name) for name in os.listdir(stage_dir)),
+                          key=os.path.getmtime, reverse=True)
+        for old in versions[KEEP_VERSIONS:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def _restore(self, stage, key):
+        object_dir = self._object_dir(stage, key)
+        if not os.path.isdir(object_dir):
+            return False
+        for i, path in enumerate(stage.outputs):
+            stored = os.path.join(object_dir, f"{i:02d}_{os.path.basename(path.rstrip(os.sep))}")
+            if not os.path.exists(stored):
+                return False
+        for i, path in enumerate(stage.outputs):
+            _copy(os.path.join(object_dir, f"{i:02d}_{os.path.basename(path.rstrip(os.sep))}"), path)
+        os.utime(object_dir)  # counts as recently used for pruning
+        return True
+
+    # --- Execution ---
+    def _execute(self, stage, force):
+        """Runs (or skips/restores) one stage; returns its run-log record and state entry."""
+        start = time.perf_counter()
+        missing = [path for path in stage.inputs if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"missing input(s) {missing}")
+        input_hashes = {path: path_hash(path) for path in stage.inputs}
+        key = self.stage_key(stage, input_hashes)
+
+        status = None
+        if not force and not stage.always_run:
+            if self._outputs_current(stage, key):
+                status = 'cached'
+            elif self._restore(stage, key):
+                status = 'restored'
+        if status is not None:
+            incr(f'pipeline.{status}')
+        else:
+            print(f"\n=== Stage '{stage.name}' running ===")
+            # Outputs left over from an earlier run must not pass for this run's results
+            for path in stage.outputs:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                elif os.path.exists(path):
+                    os.remove(path)
+            with span(f'pipeline.{stage.name}'):
+                stage.func(**stage.params)
+            incr('pipeline.ran')
+            absent = [path for path in stage.outputs if not os.path.exists(path)]
+            if absent:
+                raise RuntimeError(f"stage finished without writing {absent}")
+            self._store(stage, key)
+            status = 'ran'
+
+        output_hashes = {path: path_hash(path) for path in stage.outputs}
+        record = {'stage': stage.name, 'status': status, 'seconds': round(time.perf_counter() - start, 3),
+                  'key': key[:16], 'inputs': {path: h[:12] for path, h in input_hashes.items()},
+                  'outputs': {path: h[:12] for path, h in output_hashes.items()}}
+        return record, {'key': key, 'outputs': output_hashes, 'finished_at': time.time()}
+
+    def _save_state(self):
+        os.makedirs(self.pipeline_dir, exist_ok=True)
+        state_path = os.path.join(self.pipeline_dir, STATE_FILENAME)
+        with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(state_path + '.tmp', state_path)
+
+    def run(self, targets=None, force=False):
+        """
+        Runs `targets` (default: every stage) and their upstream stages.
+        force=True re-runs them all regardless of the cache; it may also be a
+        collection of stage names to force. Returns the run-log record.
+        """
+        selected = self.upstream(targets) if targets else set(self.stages)
+        forced = set(selected) if force is True else set(force or ())
+        order = [name for name in self.order() if name in selected]
+        run_start = time.perf_counter()
+        records = {}
+        pending = list(order)
+        running = {}
+        # Per-span memory peaks are process-wide, so they are only recorded when stages run one at a time
+        with concurrent() if self.max_workers > 1 else nullcontext(), \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.deps[name] & selected
+                    blocked = [dep for dep in deps if records.get(dep, {}).get('status') in ('failed', 'skipped')]
+                    if blocked:
+                        records[name] = {'stage': name, 'status': 'skipped', 'seconds': 0.0,
+                                         'error': f"upstream stage(s) {sorted(blocked)} did not finish"}
+                        pending.remove(name)
+                    elif all(dep in records for dep in deps):
+                        running[pool.submit(self._execute, self.stages[name], name in forced)] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        records[name], self.state[name] = future.result()
+                    except Exception as e:
+                        records[name] = {'stage': name, 'status': 'failed', 'seconds': None, 'error': str(e)}
+                        print(f"ERROR: Stage '{name}' failed: {e}")
+                    self._save_state()
+
+        stage_records = [records[name] for name in order]
+        run_record = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(time.time() - (time.perf_counter() - run_start))),
+            'seconds': round(time.perf_counter() - run_start, 3),
+            'targets': sorted(targets) if targets else None,
+            'cache_hits': sum(record['status'] in ('cached', 'restored') for record in stage_records),
+            'ran': sum(record['status'] == 'ran' for record in stage_records),
+            'failed': sum(record['status'] in ('failed', 'skipped') for record in stage_records),
+            'stages': stage_records,
+        }
+        os.makedirs(self.pipeline_dir, exist_ok=True)
+        with open(os.path.join(self.pipeline_dir, RUN_LOG_FILENAME), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run_record) + '\n')
+        return run_record
+
+
+# --- Stage functions (heavy modules are imported inside each one) ---
+def scrape_stage(page_path, offline=False, fixture_path=None, max_age=None):
+    """Fetches the Wikipedia page (conditional request / snapshot) for the downstream stages."""
+    from src.ad_sources import WIKI_URL
+    from src.html_cache import fetch_html
+    page_html = fetch_html(WIKI_URL, cache_dir=HTML_CACHE_DIR, offline=offline,
+                           fixture_path=fixture_path, max_age=max_age)
+    os.makedirs(os.path.dirname(page_path), exist_ok=True)
+    with open(page_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(page_html)
+    os.replace(page_path + '.tmp', page_path)
+
+
+def normalize_stage(page_path, commercials_path):
+    """Extracts the commercials tables into the CSV and the Year-partitioned dataset."""
+    from src.storage import COMMERCIALS_DATASET, write_dataset
+    from src.table_extractor import extract_commercials
+    with open(page_path, 'rb') as f:
+        commercials_df = extract_commercials(f)
+    if commercials_df.empty:
+        raise ValueError("no commercials extracted from the page")
+    os.makedirs(os.path.dirname(commercials_path), exist_ok=True)
+    commercials_df.to_csv(commercials_path, index=False)
+    write_dataset(commercials_df, COMMERCIALS_DATASET, mode='overwrite')
+    print(f"Extracted {len(commercials_df)} commercials to {commercials_path}")
+
+
+def map_stage(ticker_map_path, commercials_path, mapped_path):
+    """Adds Primary_Advertiser, StockTicker and ParentCompany to every commercial (CSV and dataset)."""
+    import pandas as pd
+    from src.brand_matcher import load_brand_matcher
+    from src.storage import MAPPED_DATASET, write_dataset
+    commercials_df = pd.read_csv(commercials_path)
+    matched = load_brand_matcher(ticker_map_path).match(commercials_df['Advertiser_Product_Title'])
+    commercials_df['Primary_Advertiser'] = matched['BrandName']
+    commercials_df['StockTicker'] = matched['StockTicker']
+    commercials_df['ParentCompany'] = matched['ParentCompany']
+    commercials_df.to_csv(mapped_path, index=False)
+    write_dataset(commercials_df, MAPPED_DATASET, mode='overwrite')
+    mapped = commercials_df['Primary_Advertiser'].notna().sum()
+    print(f"Mapped {mapped} of {len(commercials_df)} commercials to a brand ({mapped_path})")
+
+
+def trends_stage(years, dry_run=False, max_workers=3):
+    """
+    Fetches Trends into the yearly CSVs; errors propagate. The same run appends
+    to the Trends panel and (live runs) the Parquet dataset, which other
+    commands also write to, so those stores are not stage outputs.
+    """
+    from src.fetch_trends import main as fetch_trends_main
+    fetch_trends_main(years=years, dry_run=dry_run, max_workers=max_workers, strict=True)
+
+
+def prices_stage(prices_path, returns_path):
+    """Loads the wide price store and saves daily simple returns."""
+    from src.event_study import compute_returns, load_prices
+    returns = compute_returns(load_prices(prices_path))
+    returns.to_parquet(returns_path)
+    print(f"Saved returns for {returns.shape[1]} tickers x {returns.shape[0]} days to {returns_path}")
+
+
+def event_study_stage(returns_path, results_path, abnormal_returns_path):
+    import pandas as pd
+    from src.event_study import build_events, run_event_study, summarize_cars
+    from src.storage import load_mapped_commercials
+    events = build_events(load_mapped_commercials(not_null=['StockTicker']))
+    results, abnormal_returns = run_event_study(pd.read_parquet(returns_path), events)
+    print(summarize_cars(results).to_string(index=False))
+    results.to_csv(results_path, index=False)
+    abnormal_returns.to_csv(abnormal_returns_path)
+
+
+def trends_lift_stage(trends_paths, lift_path):
+    """Search-interest lift per (advertiser, year) from the mapped commercials and the yearly Trends files."""
+    from src.storage import load_mapped_commercials
+    from src.trends_lift import build_ad_events, cube_from_csvs, trends_lift
+    results = trends_lift(build_ad_events(load_mapped_commercials()), cube_from_csvs(trends_paths))
+    results.to_csv(lift_path, index=False)
+    print(f"Trends lift for {int((results['TrendsDays'] > 0).sum())} of {len(results)} advertiser-year events "
+          f"saved to {lift_path}")
+
+
+def default_stages(offline=False, fixture_path=None, max_age=None, trends_years=None, trends_dry_run=False,
+                   trends_workers=3):
+    """
+    scrape -> normalize -> map -> event_study, with trends and prices as
+    independent branches; trends_lift joins the map and trends branches.
+    """
+    from src.event_study import ABNORMAL_RETURNS_PATH, PRICES_PATH, RESULTS_PATH
+    from src.fetch_trends import TARGET_YEAR, trends_output_path
+    from src.storage import COMMERCIALS_DATASET, MAPPED_DATASET, dataset_path
+    from src.trends_lift import LIFT_PATH
+    trends_years = [TARGET_YEAR] if trends_years is None else sorted(trends_years)
+    trends_paths = {year: trends_output_path(year, dry_run=trends_dry_run) for year in trends_years}
+    mapped_dataset = dataset_path(MAPPED_DATASET)
+    # Only the per-run CSVs are trends outputs: outputs are deleted before a run and replaced on a
+    # restore, and the panel and Parquet dataset accumulate years across commands. The scheduler's
+    # job ledger and batch files are its resume cache.
+    trends_outputs = list(trends_paths.values())
+    return [
+        Stage('scrape', scrape_stage, outputs=[PAGE_PATH], always_run=True,
+              params={'page_path': PAGE_PATH, 'offline': offline, 'fixture_path': fixture_path, 'max_age': max_age}),
+        Stage('normalize', normalize_stage, inputs=[PAGE_PATH],
+              outputs=[COMMERCIALS_PATH, dataset_path(COMMERCIALS_DATASET)],
+              params={'page_path': PAGE_PATH, 'commercials_path': COMMERCIALS_PATH}),
+        Stage('map', map_stage, inputs=[TICKER_MAP_PATH, COMMERCIALS_PATH], outputs=[MAPPED_PATH, mapped_dataset],
+              params={'ticker_map_path': TICKER_MAP_PATH, 'commercials_path': COMMERCIALS_PATH,
+                      'mapped_path': MAPPED_PATH}, version=3),
+        Stage('trends', trends_stage, inputs=[TICKER_MAP_PATH], outputs=trends_outputs,
+              params={'years': trends_years, 'dry_run': trends_dry_run, 'max_workers': trends_workers}, version=3),
+        Stage('prices', prices_stage, inputs=[PRICES_PATH], outputs=[RETURNS_PATH],
+              params={'prices_path': PRICES_PATH, 'returns_path': RETURNS_PATH}),
+        Stage('event_study', event_study_stage, inputs=[mapped_dataset, RETURNS_PATH],
+              outputs=[RESULTS_PATH, ABNORMAL_RETURNS_PATH],
+              params={'returns_path': RETURNS_PATH, 'results_path': RESULTS_PATH,
+                      'abnormal_returns_path': ABNORMAL_RETURNS_PATH}),
+        Stage('trends_lift', trends_lift_stage, inputs=[mapped_dataset, *trends_paths.values()], outputs=[LIFT_PATH],
+              params={'trends_paths': trends_paths, 'lift_path': LIFT_PATH}),
+    ]
+
+
+def print_run(run_record):
+    print(f"\n--- Pipeline run: {run_record['seconds']:.2f}s, {run_record['ran']} ran, "
+          f"{run_record['cache_hits']} cache hits, {run_record['failed']} failed/skipped ---")
+    for record in run_record['stages']:
+        seconds = '-' if record['seconds'] is None else f"{record['seconds']:.2f}s"
+        print(f"  {record['stage']:<12} {record['status']:<9} {seconds:>8}  {record.get('error', '')}")
+
+
+def run(args):
+    pipeline = Pipeline(default_stages(offline=args.offline, fixture_path=args.fixture, max_age=args.max_age,
+                                       trends_years=args.years, trends_dry_run=args.trends_dry_run),
+                        max_workers=args.workers)
+    if args.list:
+        for name in pipeline.order():
+            stage = pipeline.stages[name]
+            print(f"{name:<12} after {sorted(pipeline.deps[name]) or '-'}  inputs={stage.inputs}  outputs={stage.outputs}")
+        return
+    force = False if args.force is None else (args.force or True)
+    print_run(pipeline.run(targets=args.stages, force=force))
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the scrape -> map -> trends -> event-study pipeline.")
+    run(add_arguments(parser).parse_args())
+    print("\n--- Pipeline Finished ---")
@@ -0,0 +1,212 @@
+# src/resampling.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.event_study import (CAR_WINDOWS, ESTIMATION_WINDOW, EVENT_WINDOW, event_day_index, run_event_study,
+                             window_label)
+from src.super_bowl_dates import super_bowl_sundays
+
+N_RESAMPLES = 10_000
+N_PLACEBOS = 500
+# Resamples are generated in fixed-size shards, each with its own child seed, so
+# results depend only on (seed, n_resamples) and not on how many workers run them
+SHARD_SIZE = 2_000
+# Placebo dates closer than this many trading days to any Super Bowl day 0 are rejected
+EXCLUDE_DAYS = 10
+# Placebo events per event-study pass; bounds the (event x day) matrices to a few hundred MB
+PLACEBO_CHUNK = 20_000
+
+
+def _shard_seeds(seed, n_resamples, shard_size=SHARD_SIZE):
+    n_shards = max(1, -(-n_resamples // shard_size))
+    sizes = [shard_size] * (n_shards - 1) + [n_resamples - shard_size * (n_shards - 1)]
+    return list(zip(np.random.SeedSequence(seed).spawn(n_shards), sizes))
+
+
+def _run_shards(worker, payload, seed, n_resamples, n_jobs):
+    """Runs worker(payload, seed_seq, size) per shard, in-process or on a process pool."""
+    shards = _shard_seeds(seed, n_resamples)
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    if n_jobs <= 1 or len(shards) == 1:
+        parts = [worker(payload, seed_seq, size) for seed_seq, size in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(shards))) as pool:
+            parts = list(pool.map(worker, [payload] * len(shards), *zip(*shards)))
+    return np.concatenate(parts)
+
+
+# --- Shard workers (module level so they can be pickled) ---
+def _bootstrap_shard(payload, seed_seq, size):
+    sums, counts = payload
+    rng = np.random.default_rng(seed_seq)
+    idx = rng.integers(0, len(sums), size=(size, len(sums)))
+    return sums[idx].sum(axis=1) / counts[idx].sum(axis=1)
+
+
+_worker_returns = None
+
+
+def _init_placebo_worker(returns):
+    global _worker_returns
+    _worker_returns = returns
+
+
+def _placebo_chunk(chunk_events, car_windows, study_kwargs):
+    results, _ = run_event_study(_worker_returns, chunk_events, car_windows=car_windows, **study_kwargs)
+    return results[[f'CAR{window_label(window)}' for window in car_windows]].to_numpy()
+
+
+def _permutation_shard(payload, seed_seq, size):
+    pool = payload  # (event x placebo) CARs, NaN where a placebo could not be estimated
+    rng = np.random.default_rng(seed_seq)
+    n_events, n_placebos = pool.shape
+    draws = pool[np.arange(n_events)[None, :], rng.integers(0, n_placebos, size=(size, n_events))]
+    return np.nanmean(draws, axis=1)
+
+
+def bootstrap_mean_car(cars, clusters=None, n_resamples=N_RESAMPLES, ci=0.95, seed=0, n_jobs=None):
+    """
+    Percentile bootstrap CI for the mean CAR.
+
+    With `clusters` (e.g. ParentCompany) whole clusters are resampled, so
+    repeated events of the same company are not treated as independent.
+    Events with a missing cluster label each form their own cluster.
+    Resample indices are drawn as (resample x cluster) matrices per shard.
+    """
+    cars = pd.Series(np.asarray(cars, dtype=np.float64))
+    keep = cars.notna().to_numpy()
+    if clusters is None:
+        groups = np.arange(keep.sum())
+    else:
+        groups = pd.factorize(pd.Series(np.asarray(clusters))[keep])[0]
+        # factorize marks missing labels -1, which bincount rejects: number them after the real clusters
+        missing = groups < 0
+        groups[missing] = groups.max(initial=-1) + 1 + np.arange(missing.sum())
+    values = cars[keep].to_numpy()
+    if len(values) < 2:
+        return {'n': len(values), 'mean': values.mean() if len(values) else np.nan, 'ci_low': np.nan, 'ci_high': np.nan}
+    sums = np.bincount(groups, weights=values)
+    counts = np.bincount(groups).astype(np.float64)
+    boot = _run_shards(_bootstrap_shard, (sums, counts), seed, n_resamples, n_jobs)
+    tail = (1 - ci) / 2 * 100
+    low, high = np.percentile(boot, [tail, 100 - tail])
+    return {'n': len(values), 'clusters': len(sums), 'mean': values.mean(), 'ci_low': low, 'ci_high': high,
+            'boot_se': boot.std(ddof=1)}
+
+
+def draw_placebo_events(returns, events, n_placebos=N_PLACEBOS, exclude_days=EXCLUDE_DAYS,
+                        estimation_window=ESTIMATION_WINDOW, event_window=EVENT_WINDOW, sb_dates=super_bowl_sundays,
+                        seed=0):
+    """
+    Random non-Super-Bowl event dates from each event's own ticker history.
+
+    For every event, n_placebos trading days are drawn uniformly from the span
+    where that ticker has enough history for the estimation and event windows,
+    rejecting days within exclude_days of any Super Bowl day 0 in `sb_dates`
+    (every game in the calendar, not just the years in `events`). Returns a
+    placebo event frame (event-major order, n_placebos rows per event).
+    """
+    rng = np.random.default_rng(seed)
+    n_days = len(returns)
+    dates = returns.index
+    sb_days = pd.DatetimeIndex(list(sb_dates.values()))
+    sb_days = sb_days[(sb_days >= dates.min()) & (sb_days <= dates.max())]
+    sb_rows = np.unique(event_day_index(dates, sb_days))
+    near_sb = np.zeros(n_days + 1, dtype=bool)
+    for offset in range(-exclude_days, exclude_days + 1):
+        rows = sb_rows + offset
+        near_sb[rows[(rows >= 0) & (rows < n_days)]] = True
+
+    # First row with a price for each ticker (unknown tickers get an empty range)
+    first_valid = returns.notna().to_numpy().argmax(axis=0)
+    cols = returns.columns.get_indexer(events['StockTicker'])
+    low = np.where(cols >= 0, first_valid[cols], n_days) - estimation_window[0]
+    high = np.full(len(events), n_days - event_window[1] - 1)
+    span = np.maximum(high - low, 0)
+
+    rows = low[:, None] + (rng.random((len(events), n_placebos)) * span[:, None]).astype(np.int64)
+    for _ in range(10):  # redraw the (few) placebos that landed next to a Super Bowl
+        bad = near_sb[np.clip(rows, 0, n_days)]
+        if not bad.any():
+            break
+        redraw = low[:, None] + (rng.random(rows.shape) * span[:, None]).astype(np.int64)
+        rows = np.where(bad, redraw, rows)
+    invalid = (span[:, None] <= 0) | near_sb[np.clip(rows, 0, n_days)]
+
+    placebo_dates = dates.append(pd.DatetimeIndex([pd.NaT])).to_numpy()[np.where(invalid, n_days, np.clip(rows, 0, n_days))]
+    return pd.DataFrame({
+        'StockTicker': np.repeat(events['StockTicker'].to_numpy(), n_placebos),
+        'Year': np.repeat(events['Year'].to_numpy(), n_placebos),
+        'EventDate': placebo_dates.ravel(),
+    })
+
+
+def placebo_car_pools(returns, events, n_placebos=N_PLACEBOS, car_windows=CAR_WINDOWS, seed=0, n_jobs=None,
+                      **study_kwargs):
+    """
+    (event x placebo) CAR matrix per window. The placebo events go through the
+    vectorized event study in PLACEBO_CHUNK-sized passes, spread over a process
+    pool that receives the returns matrix once per worker.
+    """
+    placebos = draw_placebo_events(returns, events, n_placebos=n_placebos, seed=seed)
+    valid = placebos['EventDate'].notna().to_numpy()
+    valid_events = placebos[valid]
+    chunks = [valid_events.iloc[start:start + PLACEBO_CHUNK] for start in range(0, len(valid_events), PLACEBO_CHUNK)]
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    args = ([chunk, car_windows, study_kwargs] for chunk in chunks)
+    if n_jobs <= 1 or len(chunks) <= 1:
+        _init_placebo_worker(returns)
+        parts = [_placebo_chunk(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks)), initializer=_init_placebo_worker,
+                                 initargs=(returns,)) as pool:
+            parts = list(pool.map(_placebo_chunk, *zip(*args)))
+    cars = np.concatenate(parts) if parts else np.empty((0, len(car_windows)))
+
+    pools = {}
+    for i, window in enumerate(car_windows):
+        pool = np.full(len(placebos), np.nan)
+        pool[valid] = cars[:, i]
+        pools[f'CAR{window_label(window)}'] = pool.reshape(len(events), n_placebos)
+    return pools
+
+
+def permutation_test(observed_cars, placebo_pool, n_resamples=N_RESAMPLES, seed=0, n_jobs=None):
+    """
+    Two-sided test of the observed mean CAR against the distribution of mean
+    CARs when every event is replaced by one of its own ticker's placebo dates.
+    """
+    observed_cars = np.asarray(observed_cars, dtype=np.float64)
+    keep = np.isfinite(observed_cars) & np.isfinite(placebo_pool).any(axis=1)
+    observed = observed_cars[keep].mean() if keep.any() else np.nan
+    if not keep.any():
+        return {'n': 0, 'mean': np.nan, 'null_mean': np.nan, 'p_value': np.nan}
+    null = _run_shards(_permutation_shard, placebo_pool[keep], seed, n_resamples, n_jobs)
+    centre = np.nanmean(null)
+    extreme = np.abs(null - centre) >= abs(observed - centre)
+    return {'n': int(keep.sum()), 'mean': observed, 'null_mean': centre, 'null_sd': np.nanstd(null, ddof=1),
+            'p_value': (1 + extreme.sum()) / (1 + len(null))}
+
+
+def significance_table(returns, results, car_windows=CAR_WINDOWS, n_resamples=N_RESAMPLES, n_placebos=N_PLACEBOS,
+                       cluster_col='ParentCompany', seed=0, n_jobs=None, **study_kwargs):
+    """Bootstrap CI (clustered by cluster_col) and placebo permutation p-value for each CAR window."""
+    usable = results[results['Beta'].notna()].reset_index(drop=True)
+    pools = placebo_car_pools(returns, usable, n_placebos=n_placebos, car_windows=car_windows, seed=seed,
+                              n_jobs=n_jobs, **study_kwargs)
+    clusters = usable[cluster_col] if cluster_col in usable.columns else None
+    rows = []
+    for window in car_windows:
+        col = f'CAR{window_label(window)}'
+        boot = bootstrap_mean_car(usable[col], clusters=clusters, n_resamples=n_resamples, seed=seed, n_jobs=n_jobs)
+        perm = permutation_test(usable[col], pools[col], n_resamples=n_resamples, seed=seed, n_jobs=n_jobs)
+        rows.append({
+            'Window': window_label(window), 'Events': boot['n'], 'Clusters': boot.get('clusters'),
+            'MeanCAR': boot['mean'], 'CI_low': boot['ci_low'], 'CI_high': boot['ci_high'],
+            'PlaceboMean': perm['null_mean'], 'PlaceboSD': perm.get('null_sd'), 'p_permutation': perm['p_value'],
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,137 @@
+# src/storage.py
+
+import os
+import shutil
+
+import pandas as pd
+
+# pyarrow is imported inside the functions that need it, so modules that only
+# use the path helpers (or fall back to CSV) do not pay for it at import time
+
+# Typed Parquet datasets, one hive-style partition directory per Year (Year=2024/...)
+DATASETS_DIR = 'data/processed/datasets'
+COMMERCIALS_DATASET = 'commercials'
+MAPPED_DATASET = 'commercials_mapped'  # commercials plus Primary_Advertiser/StockTicker/ParentCompany (map stage)
+MAPPED_COLUMNS = ['Year', 'Primary_Advertiser', 'StockTicker', 'ParentCompany']
+TRENDS_DATASET = 'google_trends'
+PARTITION_COL = 'Year'
+
+# Columns with a fixed Arrow type (pyarrow type factory names); anything else is stored as string
+COLUMN_TYPES = {
+    'Year': 'int16',
+    'date': 'date32',
+    'interest': 'float32',
+}
+
+
+def dataset_path(name, base_dir=DATASETS_DIR):
+    return os.path.join(base_dir, name)
+
+
+def _to_table(df):
+    """Casts a frame to the typed Arrow schema (COLUMN_TYPES, strings elsewhere)."""
+    import pyarrow as pa
+    df = df.copy()
+    fields = []
+    for col in df.columns:
+        type_name = COLUMN_TYPES.get(col, 'string')
+        if type_name == 'int16':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int16')
+        elif type_name == 'date32':
+            df[col] = pd.to_datetime(df[col]).dt.date
+        elif type_name == 'float32':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        else:
+            df[col] = df[col].astype('string')
+        fields.append(pa.field(col, getattr(pa, type_name)()))
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([(PARTITION_COL, getattr(pa, COLUMN_TYPES[PARTITION_COL])())]), flavor='hive')
+
+
+def write_dataset(df, name, base_dir=DATASETS_DIR, mode='replace_partitions'):
+    """
+    Writes df as a Year-partitioned Parquet dataset.
+
+    mode='replace_partitions' (default) rewrites only the Year partitions present
+    in df, so appending one year leaves the rest of the history untouched;
+    mode='overwrite' replaces the whole dataset.
+    """
+    if mode not in ('replace_partitions', 'overwrite'):
+        raise ValueError(f"Unknown write mode '{mode}'")
+    import pyarrow.dataset as ds
+    path = dataset_path(name, base_dir)
+    if mode == 'overwrite' and os.path.isdir(path):
+        shutil.rmtree(path)
+    df = df.dropna(subset=[PARTITION_COL])
+    ds.write_dataset(
+        _to_table(df), path, format='parquet', partitioning=_partitioning(),
+        existing_data_behavior='delete_matching', basename_template='part-{i}.parquet',
+    )
+    return path
+
+
+def append_year(df, name, year, base_dir=DATASETS_DIR):
+    """Adds (or replaces) a single year's partition."""
+    df = df.assign(**{PARTITION_COL: year})
+    return write_dataset(df, name, base_dir=base_dir, mode='replace_partitions')
+
+
+def read_dataset(name, columns=None, filters=None, not_null=None, years=None, base_dir=DATASETS_DIR):
+    """
+    Reads a dataset with column projection and predicate pushdown.
+
+    filters:  list of (column, op, value) tuples ANDed together, ops as in
+              pyarrow/pandas read_parquet ('==', '!=', '<', '<=', '>', '>=', 'in', 'not in')
+    not_null: columns that must be set
+    years:    (first, last) inclusive Year range, pruned at the partition level
+
+    e.g. read_dataset('commercials_mapped', years=(2015, 2025), not_null=['Primary_Advertiser'])
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    path = dataset_path(name, base_dir)
+    dataset = ds.dataset(path, format='parquet', partitioning=_partitioning())
+    expression = None
+    conditions = list(filters or [])
+    if years is not None:
+        conditions += [(PARTITION_COL, '>=', years[0]), (PARTITION_COL, '<=', years[1])]
+    if conditions:
+        expression = pq.filters_to_expression(conditions)
+    for col in not_null or []:
+        valid = ds.field(col).is_valid()
+        expression = valid if expression is None else expression & valid
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas(date_as_object=False)
+
+
+def export_csv(name, csv_path, base_dir=DATASETS_DIR, **read_kwargs):
+    """Backwards-compatible CSV export of a dataset (or a filtered slice of it)."""
+    df = read_dataset(name, base_dir=base_dir, **read_kwargs)
+    df.to_csv(csv_path, index=False)
+    return csv_path
+
+
+def trends_to_long(wide_df, year):
+    """Wide date x keyword Trends frame -> long (date, keyword, interest, Year) rows."""
+    long_df = wide_df.rename_axis('date').reset_index().melt(
+        id_vars='date', var_name='keyword', value_name='interest')
+    long_df[PARTITION_COL] = year
+    return long_df
+
+
+def load_commercials(csv_path, columns=None, base_dir=DATASETS_DIR):
+    """Commercials from the Parquet dataset when it exists, else from the legacy CSV."""
+    if os.path.isdir(dataset_path(COMMERCIALS_DATASET, base_dir)):
+        return read_dataset(COMMERCIALS_DATASET, columns=columns, base_dir=base_dir)
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def load_mapped_commercials(columns=MAPPED_COLUMNS, not_null=('Primary_Advertiser',), years=None,
+                            base_dir=DATASETS_DIR):
+    """Matched ads from the map stage's dataset; unmatched rows are filtered out in the Parquet scan."""
+    return read_dataset(MAPPED_DATASET, columns=columns, not_null=list(not_null), years=years, base_dir=base_dir)
@@ -0,0 +1,29 @@
+# src/super_bowl_dates.py
+
+import pandas as pd
+
+# Super Bowl Sunday for each season's game, keyed by calendar year of the game
+super_bowl_sundays = {
+    1969: '1969-01-12', 1970: '1970-01-11', 1971: '1971-01-17', 1972: '1972-01-16',
+    1973: '1973-01-14', 1974: '1974-01-13', 1975: '1975-01-12', 1976: '1976-01-18',
+    1977: '1977-01-09', 1978: '1978-01-15', 1979: '1979-01-21', 1980: '1980-01-20',
+    1981: '1981-01-25', 1982: '1982-01-24', 1983: '1983-01-30', 1984: '1984-01-22',
+    1985: '1985-01-20', 1986: '1986-01-26', 1987: '1987-01-25', 1988: '1988-01-31',
+    1989: '1989-01-22', 1990: '1990-01-28', 1991: '1991-01-27', 1992: '1992-01-26',
+    1993: '1993-01-31', 1994: '1994-01-30', 1995: '1995-01-29', 1996: '1996-01-28',
+    1997: '1997-01-26', 1998: '1998-01-25', 1999: '1999-01-31', 2000: '2000-01-30',
+    2001: '2001-01-28', 2002: '2002-02-03', 2003: '2003-01-26', 2004: '2004-02-01',
+    2005: '2005-02-06', 2006: '2006-02-05', 2007: '2007-02-04', 2008: '2008-02-03',
+    2009: '2009-02-01', 2010: '2010-02-07', 2011: '2011-02-06', 2012: '2012-02-05',
+    2013: '2013-02-03', 2014: '2014-02-02', 2015: '2015-02-01', 2016: '2016-02-07',
+    2017: '2017-02-05', 2018: '2018-02-04', 2019: '2019-02-03', 2020: '2020-02-02',
+    2021: '2021-02-07', 2022: '2022-02-13', 2023: '2023-02-12', 2024: '2024-02-11',
+    2025: '2025-02-09'
+}
+
+
+def super_bowl_dates(years=None):
+    """Super Bowl Sundays as a Timestamp Series indexed by year."""
+    dates = pd.Series({year: pd.Timestamp(day) for year, day in super_bowl_sundays.items()}, name='SuperBowlSunday')
+    dates.index.name = 'Year'
+    return dates if years is None else dates.reindex(years)
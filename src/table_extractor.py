@@ -0,0 +1,312 @@
+# src/table_extractor.py
+
+import fnmatch
+import re
+
+import pandas as pd
+
+from src.instrumentation import incr
+
+FINAL_COLS = ['Product_Type', 'Advertiser_Product_Title', 'Title', 'Plot_Notes', 'Decade', 'Year', 'SuperBowlNum']
+STOP_HEADINGS = ["See also", "References", "External links"]
+CHUNK_SIZE = 1 << 16
+# pd.read_html(keep_default_na=True) turns these cell values into NaN as well
+NA_VALUES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+             '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+WHITESPACE_RE = re.compile(r'[\s\xa0]+')
+DISPLAY_NONE_RE = re.compile(r'display:\s*none')
+
+
+# Header patterns (matched against the stripped, lowercased header; fnmatch wildcards allowed)
+# for every kept column of the Wikipedia list
+WIKIPEDIA_COLUMNS = {
+    'Product_Type': ['product type'],
+    'Advertiser_Product_Title': ['product/title', 'advertiser/product'],
+    'Title': ['title'],
+    'Plot_Notes': ['plot/notes*'],
+}
+# A table is kept when every group has at least one of its columns
+REQUIRED_COLUMNS = [['Product_Type'], ['Advertiser_Product_Title', 'Title']]
+
+
+class ColumnMapping:
+    """
+    Declarative table header -> FINAL_COLS rules for one ad-list source.
+    `columns` maps each output column to its header patterns; exact headers
+    are checked before wildcard patterns. `required` lists groups of output
+    columns of which a table needs at least one each to be used.
+    """
+
+    def __init__(self, columns=WIKIPEDIA_COLUMNS, required=REQUIRED_COLUMNS):
+        unknown = sorted((set(columns) | {col for group in required for col in group}) - set(FINAL_COLS))
+        if unknown:
+            raise ValueError(f"Column mapping targets {unknown} are not in FINAL_COLS")
+        self.columns = {target: list(patterns) for target, patterns in columns.items()}
+        self.required = [list(group) for group in required]
+        self.exact = {}
+        self.wildcards = []
+        for target, patterns in self.columns.items():
+            for pattern in patterns:
+                pattern = pattern.strip().lower()
+                if any(char in pattern for char in '*?['):
+                    self.wildcards.append((re.compile(fnmatch.translate(pattern)), target))
+                else:
+                    self.exact.setdefault(pattern, target)
+
+    def __call__(self, col):
+        """FINAL_COLS name for a header, or None if the column is not kept."""
+        col_norm = str(col).strip().lower()
+        if col_norm in self.exact:
+            return self.exact[col_norm]
+        for regex, target in self.wildcards:
+            if regex.match(col_norm):
+                return target
+        return None
+
+    def accepts(self, names):
+        present = set(names)
+        return all(any(col in present for col in group) for group in self.required)
+
+
+DEFAULT_COLUMN_MAPPING = ColumnMapping()
+
+
+def normalize_column(col):
+    """Maps a wikitable header to its FINAL_COLS name, or None if the column is not kept."""
+    return DEFAULT_COLUMN_MAPPING(col)
+
+
+class _CommercialsTarget:
+    """
+    lxml parser target (SAX-style callbacks) that tracks the Decade/Year/
+    SuperBowlNum heading state and turns each wikitable under a year heading
+    into FINAL_COLS rows, expanding rowspan/colspan the way pd.read_html does.
+    Finished rows are appended to self.rows for the caller to drain.
+    """
+
+    def __init__(self, column_mapping=DEFAULT_COLUMN_MAPPING):
+        self.column_mapping = column_mapping
+        self.rows = []
+        self.done = False
+        self.tables_seen = 0
+        self.tables_used = 0
+        self.in_content = False
+        self.depth = 0
+        self.hidden_depth = None      # depth of the display:none element we are inside
+        self.decade = self.year = self.sb_num = None
+
+        self.heading = None           # 'h2' / 'h3' while inside one
+        self.heading_parts = []
+        self.text_buf = []
+
+        self.table_depth = 0          # nesting level inside the wikitable being parsed
+        self.table_active = False
+        self.header = None            # output column name (or None) per position
+        self.row_cells = None
+        self.cell_text = None
+        self.cell_span = (1, 1)
+        self.pending_spans = {}       # column -> [rows left, text]
+
+    # -- text handling -----------------------------------------------------
+    def _flush_heading_text(self):
+        # Heading text mimics BeautifulSoup get_text(strip=True): strip each node, join with ''
+        if self.heading and self.text_buf:
+            self.heading_parts.append(''.join(self.text_buf).strip())
+        self.text_buf = []
+
+    def data(self, text):
+        if self.done or self.hidden_depth is not None:
+            return
+        if self.cell_text is not None:
+            self.cell_text.append(text)
+        elif self.heading:
+            self.text_buf.append(text)
+
+    # -- element events ----------------------------------------------------
+    def start(self, tag, attrib):
+        if self.done:
+            return
+        self.depth += 1
+        if self.hidden_depth is None and DISPLAY_NONE_RE.search(attrib.get('style', '').replace(' ', '')):
+            self.hidden_depth = self.depth
+        classes = attrib.get('class', '').split()
+        if not self.in_content:
+            if tag == 'div' and 'mw-parser-output' in classes:
+                self.in_content = True
+            return
+        self._flush_heading_text()
+
+        if self.table_active:
+            if tag == 'table':
+                self.table_depth += 1
+            elif self.table_depth == 1:
+                if tag == 'tr':
+                    self.row_cells = []
+                elif tag in ('td', 'th') and self.row_cells is not None:
+                    self.cell_text = []
+                    self.cell_span = (_span(attrib.get('rowspan')), _span(attrib.get('colspan')))
+            return
+
+        if tag in ('h2', 'h3'):
+            self.heading = tag
+            self.heading_parts = []
+        elif tag == 'table' and 'wikitable' in classes:
+            self.tables_seen += 1
+            if self.year:
+                self.table_active = True
+                self.table_depth = 1
+                self.header = None
+                self.pending_spans = {}
+
+    def end(self, tag):
+        if self.done:
+            return
+        if self.hidden_depth == self.depth:
+            self.hidden_depth = None
+        self.depth -= 1
+        if not self.in_content:
+            return
+        self._flush_heading_text()
+
+        if self.table_active:
+            if tag == 'table':
+                self.table_depth -= 1
+                if self.table_depth == 0:
+                    self._end_table()
+            elif self.table_depth == 1:
+                if tag in ('td', 'th') and self.cell_text is not None:
+                    text = WHITESPACE_RE.sub(' ', ''.join(self.cell_text)).strip()
+                    self.row_cells.append((text, self.cell_span))
+                    self.cell_text = None
+                elif tag == 'tr' and self.row_cells is not None:
+                    self._end_row(self._expand_spans(self.row_cells))
+                    self.row_cells = None
+            return
+
+        if tag == self.heading:
+            self._end_heading(tag, ''.join(self.heading_parts).replace('[edit]', ''))
+            self.heading = None
+
+    def close(self):
+        return self.tables_used
+
+    # -- state transitions ---------------------------------------------------
+    def _end_heading(self, tag, text):
+        if tag == 'h2':
+            if re.match(r'^\d{4}s$', text):
+                self.decade = text; self.year = None; self.sb_num = None
+            elif text in STOP_HEADINGS:
+                self.done = True
+            else:
+                self.decade = None; self.year = None; self.sb_num = None
+        elif self.decade:
+            match = re.match(r'(\d{4})\s*(?:\((\w+)\))?', text)
+            if match:
+                self.year = match.group(1); self.sb_num = match.group(2)
+            else:
+                self.year = None; self.sb_num = None
+
+    def _expand_spans(self, cells):
+        """Places cells into columns, filling in cells carried down by earlier rowspans."""
+        row = []
+        pending = self.pending_spans
+        for text, (rowspan, colspan) in cells:
+            while len(row) in pending:
+                row.append(self._take_pending(len(row)))
+            for _ in range(colspan):
+                if rowspan > 1:
+                    pending[len(row)] = [rowspan - 1, text]
+                row.append(text)
+        while len(row) in pending:
+            row.append(self._take_pending(len(row)))
+        return row
+
+    def _take_pending(self, col):
+        span = self.pending_spans[col]
+        span[0] -= 1
+        if span[0] == 0:
+            del self.pending_spans[col]
+        return span[1]
+
+    def _end_row(self, row):
+        if self.header is None:
+            self.header = [self.column_mapping(col) for col in row]
+            if not self.column_mapping.accepts(self.header):
+                self.header = []  # essential columns missing: skip the table's rows
+            else:
+                self.tables_used += 1
+            return
+        if not self.header:
+            return
+        record = dict.fromkeys(FINAL_COLS)
+        for name, value in zip(self.header, row):
+            if name and record[name] is None and value not in NA_VALUES:
+                record[name] = value
+        record['Decade'] = self.decade; record['Year'] = self.year; record['SuperBowlNum'] = self.sb_num
+        self.rows.append(record)
+
+    def _end_table(self):
+        self.table_active = False
+        self.pending_spans = {}
+        # Reset year after processing/attempting this table (same as the read_html path)
+        self.year = None
+        self.sb_num = None
+
+
+def _span(value):
+    try:
+        return max(int(str(value).strip().rstrip(';')), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _iter_chunks(source, chunk_size):
+    if isinstance(source, (str, bytes)):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    else:  # file-like object
+        for chunk in iter(lambda: source.read(chunk_size), source.read(0)):
+            yield chunk
+
+
+def iter_commercial_rows(sources, chunk_size=CHUNK_SIZE, stats=None, column_mapping=None):
+    """
+    Streams normalized commercial rows (dicts keyed by FINAL_COLS) out of one
+    or more HTML pages without building a document tree.
+
+    `sources` is an HTML string/bytes, an open file, or a list of those for
+    multi-page sources. Each page is fed to lxml in chunks, so rows are yielded
+    while later parts of the page are still unread. If `stats` is a dict it
+    is filled with tables_seen / tables_used counts. `column_mapping` (a
+    ColumnMapping) replaces the Wikipedia header rules.
+    """
+    from lxml import etree
+    if isinstance(sources, (str, bytes)) or hasattr(sources, 'read'):
+        sources = [sources]
+    for source in sources:
+        target = _CommercialsTarget(column_mapping or DEFAULT_COLUMN_MAPPING)
+        parser = etree.HTMLParser(target=target, encoding='utf-8')
+        for chunk in _iter_chunks(source, chunk_size):
+            parser.feed(chunk)
+            if target.rows:
+                yield from target.rows
+                target.rows = []
+            if target.done:
+                break
+        parser.close()
+        yield from target.rows
+        incr('pages.parsed'); incr('tables.seen', target.tables_seen); incr('tables.used', target.tables_used)
+        if stats is not None:
+            stats['tables_seen'] = stats.get('tables_seen', 0) + target.tables_seen
+            stats['tables_used'] = stats.get('tables_used', 0) + target.tables_used
+
+
+def extract_commercials(sources, chunk_size=CHUNK_SIZE, stats=None, column_mapping=None):
+    """Single-pass extraction into column buffers; returns one DataFrame with FINAL_COLS."""
+    buffers = {col: [] for col in FINAL_COLS}
+    appenders = [(col, buffers[col].append) for col in FINAL_COLS]
+    for record in iter_commercial_rows(sources, chunk_size=chunk_size, stats=stats, column_mapping=column_mapping):
+        for col, append in appenders:
+            append(record[col])
+    incr('rows.extracted', len(buffers[FINAL_COLS[0]]))
+    return pd.DataFrame(buffers, columns=FINAL_COLS)
@@ -0,0 +1,135 @@
+# test_brand_matcher.py
+# BrandMatcher must agree with the reference loop it replaces: python -m pytest src/test_brand_matcher.py
+import os
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.brand_matcher import MATCH_COLS, BrandMatcher, get_primary_advertiser_final
+from src.table_extractor import extract_commercials
+
+TICKER_MAP_PATH = os.path.join('data', 'raw', 'advertiser_ticker_mapping.csv')
+FIXTURE_PATH = os.path.join('data', 'fixtures', 'super_bowl_commercials_sample.html')
+
+
+def reference_match(title, matcher):
+    """get_primary_advertiser_final, plus the letters/digits boundary test in word-boundary mode."""
+    if not matcher.word_boundary:
+        return get_primary_advertiser_final(title, matcher.known_brands_sorted, matcher.original_case_map)
+    if pd.isna(title):
+        return None
+    text = str(title).lower()
+    for brand in matcher.known_brands_sorted:
+        start = text.find(brand)
+        while brand and start != -1:
+            end = start + len(brand)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                return matcher.original_case_map[brand]
+            start = text.find(brand, start + 1)
+    return None
+
+
+def assert_agrees(matcher, titles):
+    titles = pd.Series(titles, dtype=object)
+    expected = [reference_match(title, matcher) for title in titles]
+    result = matcher.match(titles)
+    assert list(result.columns) == MATCH_COLS
+    assert result.index.equals(titles.index)
+    got = [None if pd.isna(brand) else brand for brand in result['BrandName']]
+    mismatches = [(title, g, e) for title, g, e in zip(titles, got, expected) if g != e]
+    assert not mismatches, mismatches[:10]
+    assert [matcher.match_one(title) for title in titles] == expected
+
+
+def brand_map(*brands):
+    return pd.DataFrame({'BrandName': list(brands), 'StockTicker': [f"T{i}" for i in range(len(brands))],
+                         'ParentCompany': [f"Parent {i}" for i in range(len(brands))]})
+
+
+def random_titles(brands, n, seed):
+    """Titles mixing brands, pieces of brands, glued letters and filler words."""
+    rng = random.Random(seed)
+    filler = ['super', 'bowl', 'ad', '"the big game"', 'x', 'no', 'ia', '2024', '-', "'s", '']
+    titles = []
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            brand = rng.choice(brands)
+            choice = rng.random()
+            if choice < 0.4:
+                parts.append(brand)
+            elif choice < 0.6:
+                cut = rng.randint(0, len(brand))
+                parts.append(brand[:cut] if rng.random() < 0.5 else brand[cut:])
+            else:
+                parts.append(rng.choice(filler))
+        glue = rng.choice([' ', '', '-', '/'])
+        title = glue.join(parts)
+        titles.append(title.upper() if rng.random() < 0.2 else title)
+    return titles
+
+
+@pytest.fixture(scope='module')
+def ticker_map():
+    return pd.read_csv(TICKER_MAP_PATH)
+
+
+@pytest.mark.parametrize('word_boundary', [False, True])
+def test_real_map(ticker_map, word_boundary):
+    matcher = BrandMatcher(ticker_map, word_boundary=word_boundary)
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        page_titles = list(extract_commercials(f.read())['Advertiser_Product_Title'])
+    brands = list(ticker_map['BrandName'].dropna().astype(str))
+    assert_agrees(matcher, page_titles + brands + random_titles(brands, 3000, seed=word_boundary))
+
+
+def test_lookup_columns(ticker_map):
+    matcher = BrandMatcher(ticker_map)
+    first = ticker_map.drop_duplicates('BrandName').iloc[0]
+    row = matcher.match(pd.Series([f"{first['BrandName']} ad", 'zzzz'])).iloc[0]
+    assert tuple(row) == tuple(first[MATCH_COLS])
+    assert matcher.match(pd.Series(['zzzz'])).iloc[0].isna().all()
+
+
+@pytest.mark.parametrize('word_boundary', [False, True])
+@pytest.mark.parametrize('brands, titles', [
+    # nested brands: the longest one present wins
+    (['Bud', 'Bud Light', 'Bud Light Lime'],
+     ['Bud Light Lime', 'Bud Light', 'Bud', 'Bud Light Lim', 'bud light lime bud', 'Bud Lightning', 'Budweiser']),
+    # overlapping brands of equal length: the one listed first in the map wins, wherever it occurs
+    (['Audi', 'Visa', 'abcd', 'cdef'], ['Visa and Audi', 'Audi and Visa', 'abcdef', 'cdefabcd', 'xabcdefx']),
+    (['cdef', 'abcd'], ['abcdef', 'abcd cdef', 'cdef abcd']),
+    # failure and dictionary links
+    (['he', 'she', 'his', 'hers', 'ushers'], ['ushers', 'usher', 'ahishers', 'shis', 'she', 'h e']),
+    (['a', 'aa', 'aaa', 'ab', 'bab'], ['aaaa', 'abab', 'baab', 'b', 'xaax']),
+    # word boundaries
+    (['Kia', 'Nokia', 'GE', 'M&M\'s', 'T-Mobile'],
+     ['Nokia Lumia', 'Kia Soul', 'KiaSoul', 'Kia-Soul', 'nokia kia', 'GEICO', 'GE Appliances', 'M&M\'s Almost',
+      'T-Mobile 5G', 'T-Mobiles', 'Kia2024', '(Kia)']),
+    # case-insensitive duplicates keep the first row; empty and missing brand names are ignored
+    (['Pepsi', 'PEPSI', 'pepsi max', None, ''], ['Pepsi Max', 'PEPSI', 'pepsimax']),
+])
+def test_edge_cases(brands, titles, word_boundary):
+    matcher = BrandMatcher(brand_map(*brands), word_boundary=word_boundary)
+    assert_agrees(matcher, titles + random_titles([b for b in brands if b], 500, seed=len(brands)))
+
+
+@pytest.mark.parametrize('word_boundary', [False, True])
+def test_missing_and_empty_titles(ticker_map, word_boundary):
+    matcher = BrandMatcher(ticker_map, word_boundary=word_boundary)
+    titles = pd.Series([None, np.nan, '', ' ', 'Pepsi', None], index=[10, 11, 12, 13, 14, 15], dtype=object)
+    assert_agrees(matcher, titles)
+    result = matcher.match(titles)
+    assert result.loc[[10, 11, 12, 13, 15]].isna().all().all()
+    assert result.loc[14, 'BrandName'] == 'Pepsi'
+
+
+@pytest.mark.parametrize('ticker_map', [brand_map(), pd.DataFrame(columns=MATCH_COLS), None])
+def test_empty_map(ticker_map):
+    matcher = BrandMatcher(ticker_map)
+    titles = pd.Series(['Pepsi', None, ''], dtype=object)
+    assert_agrees(matcher, titles)
+    assert matcher.match(titles).isna().all().all()
+    assert matcher.match(pd.Series([], dtype=object)).empty
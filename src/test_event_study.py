@@ -0,0 +1,119 @@
+# test_event_study.py
+# Market-model event study on synthetic prices with known answers: python -m pytest src/test_event_study.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.event_study import (CAR_WINDOWS, ESTIMATION_WINDOW, EVENT_WINDOW, MARKET_INDEX, MIN_ESTIMATION_OBS,
+                             event_day_index, run_event_study, window_label)
+from src.super_bowl_dates import super_bowl_sundays
+
+DATES = pd.bdate_range('2016-01-01', '2024-02-14')  # ends on day +2 of Super Bowl LVIII (Monday = day 0)
+# ticker -> (year, alpha, beta, residual sigma, abnormal returns injected on event days -5..+5)
+KNOWN = {
+    'AAA': (2019, 0.0005, 1.2, 0.010, [0, 0, 0, 0, 0.002, 0.030, 0.015, -0.005, 0, 0, 0]),
+    'BBB': (2021, -0.0002, 0.6, 0.004, [0.001, -0.002, 0, 0, 0, -0.020, 0, 0, 0.004, 0, 0.010]),
+}
+
+
+def known_events():
+    rows = [(ticker, year) for ticker, (year, *_) in KNOWN.items()]
+    events = pd.DataFrame(rows, columns=['StockTicker', 'Year'])
+    events['EventDate'] = pd.to_datetime(events['Year'].map(super_bowl_sundays))
+    return events
+
+
+def synthetic_returns(seed=0):
+    """
+    Market returns plus one stock per KNOWN event: over the estimation window its
+    residuals are orthogonal to [1, market] with exactly the given sigma, so OLS
+    recovers alpha/beta/sigma exactly; over the event window it is the market
+    model plus the injected abnormal returns.
+    """
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0004, 0.011, len(DATES))
+    returns = pd.DataFrame({MARKET_INDEX: market}, index=DATES)
+    for ticker, (year, alpha, beta, sigma, abnormal) in KNOWN.items():
+        day0 = event_day_index(DATES, [super_bowl_sundays[year]])[0]
+        stock = rng.normal(0, 0.02, len(DATES))  # unrelated noise outside the two windows
+        est = np.arange(day0 + ESTIMATION_WINDOW[0], day0 + ESTIMATION_WINDOW[1] + 1)
+        design = np.column_stack([np.ones(len(est)), market[est]])
+        noise = rng.normal(size=len(est))
+        resid = noise - design @ np.linalg.lstsq(design, noise, rcond=None)[0]
+        resid *= sigma / np.sqrt(resid @ resid / (len(est) - 2))
+        stock[est] = alpha + beta * market[est] + resid
+        event = np.arange(day0 + EVENT_WINDOW[0], day0 + EVENT_WINDOW[1] + 1)
+        stock[event] = alpha + beta * market[event] + np.array(abnormal)
+        returns[ticker] = stock
+    return returns
+
+
+@pytest.fixture(scope='module')
+def study():
+    return run_event_study(synthetic_returns(), known_events())
+
+
+def test_market_model_parameters(study):
+    results, _ = study
+    for ticker, (year, alpha, beta, sigma, _) in KNOWN.items():
+        row = results.set_index('StockTicker').loc[ticker]
+        assert row['Alpha'] == pytest.approx(alpha, abs=1e-12)
+        assert row['Beta'] == pytest.approx(beta, rel=1e-10)
+        assert row['Sigma'] == pytest.approx(sigma, rel=1e-10)
+        assert row['EstObs'] == ESTIMATION_WINDOW[1] - ESTIMATION_WINDOW[0] + 1
+        assert row['EventDay0'] == pd.Timestamp(super_bowl_sundays[year]) + pd.Timedelta(days=1)  # the Monday
+
+
+def test_abnormal_returns_and_cars(study):
+    results, abnormal_returns = study
+    offsets = np.arange(EVENT_WINDOW[0], EVENT_WINDOW[1] + 1)
+    for ticker, (year, _, _, sigma, abnormal) in KNOWN.items():
+        abnormal = np.array(abnormal)
+        np.testing.assert_allclose(abnormal_returns.loc[(ticker, year)].to_numpy(), abnormal, atol=1e-12)
+        row = results.set_index('StockTicker').loc[ticker]
+        for window in CAR_WINDOWS:
+            days = (offsets >= window[0]) & (offsets <= window[1])
+            car = abnormal[days].sum()
+            assert row[f'CAR{window_label(window)}'] == pytest.approx(car, abs=1e-12)
+            assert row[f't{window_label(window)}'] == pytest.approx(car / (sigma * np.sqrt(days.sum())), abs=1e-9)
+
+
+def test_unusable_events_are_nan():
+    returns = synthetic_returns()
+    events = pd.DataFrame({
+        'StockTicker': ['ZZZ', 'AAA', 'AAA', 'BBB'],
+        'Year': [2019, 2016, 2024, 2025],
+        # unknown ticker; ~25 trading days of history; history ends at day +2; no prices at all
+        'EventDate': pd.to_datetime([super_bowl_sundays[2019], super_bowl_sundays[2016], super_bowl_sundays[2024],
+                                     '2025-02-09']),
+    })
+    results, abnormal_returns = run_event_study(returns, events)
+    car_cols = [f'CAR{window_label(window)}' for window in CAR_WINDOWS]
+    for i in (0, 1, 3):
+        assert results.loc[i, ['Alpha', 'Beta', 'Sigma', *car_cols]].isna().all(), results.loc[i]
+        assert abnormal_returns.iloc[i].isna().all()
+    assert results.loc[0, 'EstObs'] == 0 and results.loc[3, 'EstObs'] == 0
+    assert 0 < results.loc[1, 'EstObs'] < MIN_ESTIMATION_OBS
+    assert pd.isna(results.loc[3, 'EventDay0'])
+
+    # Runs off the end of the history: parameters and the days that exist are kept, longer windows are NaN
+    off_end = results.loc[2]
+    assert off_end[['Alpha', 'Beta', 'Sigma']].notna().all()
+    for window in CAR_WINDOWS:
+        assert pd.isna(off_end[f'CAR{window_label(window)}']) == (window[1] > 2), window
+    assert abnormal_returns.iloc[2].loc[3:].isna().all() and abnormal_returns.iloc[2].loc[:2].notna().all()
+
+
+def test_min_estimation_obs():
+    returns = synthetic_returns()
+    est_days = ESTIMATION_WINDOW[1] - ESTIMATION_WINDOW[0] + 1
+    results, _ = run_event_study(returns, known_events(), min_estimation_obs=est_days + 1)
+    assert results[['Alpha', 'Beta', 'Sigma', 'CAR[+0,+0]']].isna().all().all()
+
+
+def test_invalid_arguments():
+    returns = synthetic_returns()
+    with pytest.raises(ValueError):
+        run_event_study(returns, known_events(), car_windows=[(0, 10)])
+    with pytest.raises(KeyError):
+        run_event_study(returns.drop(columns=[MARKET_INDEX]), known_events())
@@ -0,0 +1,192 @@
+# test_html_cache.py
+# Offline replay and revalidation checks for src.html_cache, run from the project root:
+# python -m src.test_html_cache (pytest also collects the test_* functions). Every check runs with
+# sockets disabled; the revalidation checks answer requests.get with canned responses.
+import os
+import socket
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import requests
+
+from src.ad_sources import WIKI_URL
+from src.html_cache import (SnapshotMissingError, fetch_html, load_snapshot, page_revision, save_snapshot,
+                            url_key)
+from src.table_extractor import extract_commercials
+
+FIXTURE_PATH = os.path.join('data', 'fixtures', 'super_bowl_commercials_sample.html')
+FIXTURE_REVISION = '1200000001'  # wgRevisionId in the saved page
+FIXTURE_ROWS = 8
+
+
+@contextmanager
+def no_network():
+    """Makes any attempt to open a socket fail for the duration of the block."""
+    def refuse(*args, **kwargs):
+        raise AssertionError("network access attempted during an offline check")
+    saved = socket.socket.connect, socket.create_connection
+    socket.socket.connect, socket.create_connection = refuse, refuse
+    try:
+        yield
+    finally:
+        socket.socket.connect, socket.create_connection = saved
+
+
+def read_fixture():
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code, self.text, self.headers = status_code, text, headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+
+@contextmanager
+def stub_get(answer):
+    """Replaces requests.get with one returning `answer` (or raising it); yields the request headers sent."""
+    sent = []
+    def get(url, headers=None, timeout=None):
+        sent.append(dict(headers or {}))
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    saved = requests.get
+    requests.get = get
+    try:
+        with no_network():
+            yield sent
+    finally:
+        requests.get = saved
+
+
+def stored_revisions(cache_dir):
+    return sorted(name for name in os.listdir(os.path.join(cache_dir, url_key(WIKI_URL))) if name.endswith('.html'))
+
+
+def test_fixture_replay():
+    with no_network():
+        html = fetch_html(WIKI_URL, fixture_path=FIXTURE_PATH)
+    assert html == read_fixture()
+    df = extract_commercials(html)
+    assert len(df) == FIXTURE_ROWS
+    assert sorted(df['Year'].unique()) == ['2022', '2023', '2024']
+    assert df['Advertiser_Product_Title'].iloc[1] == 'Michelob Ultra'
+    assert (df['Product_Type'].iloc[:2] == 'Beer').all()  # rowspan carried down
+
+
+def test_offline_snapshot_replay():
+    html = read_fixture()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        meta = save_snapshot(WIKI_URL, html, etag='"sample"', cache_dir=cache_dir)
+        assert meta['revision'] == FIXTURE_REVISION == page_revision(html)
+        with no_network():
+            replayed = fetch_html(WIKI_URL, cache_dir=cache_dir, offline=True)
+        assert replayed == html
+        assert load_snapshot(WIKI_URL, cache_dir)[1]['etag'] == '"sample"'
+        assert len(extract_commercials(replayed)) == FIXTURE_ROWS
+
+
+def test_offline_without_snapshot():
+    with tempfile.TemporaryDirectory() as cache_dir, no_network():
+        try:
+            fetch_html(WIKI_URL, cache_dir=cache_dir, offline=True)
+        except SnapshotMissingError:
+            return
+    raise AssertionError("offline fetch without a snapshot did not raise SnapshotMissingError")
+
+
+def test_fresh_snapshot_skips_request():
+    html = read_fixture()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        save_snapshot(WIKI_URL, html, cache_dir=cache_dir)
+        with no_network():
+            assert fetch_html(WIKI_URL, cache_dir=cache_dir, max_age=3600) == html
+
+
+
+def test_not_modified_reuses_snapshot():
+    html = read_fixture()
+    last_modified = 'Sun, 11 Feb 2024 23:30:00 GMT'
+    with tempfile.TemporaryDirectory() as cache_dir:
+        old_meta = save_snapshot(WIKI_URL, html, etag='"rev-1"', last_modified=last_modified, cache_dir=cache_dir)
+        with stub_get(FakeResponse(304)) as sent:
+            assert fetch_html(WIKI_URL, cache_dir=cache_dir) == html
+        assert len(sent) == 1
+        assert sent[0]['If-None-Match'] == '"rev-1"' and sent[0]['If-Modified-Since'] == last_modified
+        meta = load_snapshot(WIKI_URL, cache_dir)[1]
+        assert meta['revision'] == FIXTURE_REVISION and meta['etag'] == '"rev-1"'
+        assert meta['checked_at'] >= old_meta['checked_at']
+        assert stored_revisions(cache_dir) == [f"{FIXTURE_REVISION}.html"]
+
+
+def test_modified_stores_new_revision():
+    html = read_fixture()
+    new_html = html.replace(FIXTURE_REVISION, '1200000002').replace('Temu', 'Temu (again)')
+    headers = {'ETag': '"rev-2"', 'Last-Modified': 'Mon, 12 Feb 2024 08:00:00 GMT'}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        save_snapshot(WIKI_URL, html, etag='"rev-1"', cache_dir=cache_dir)
+        with stub_get(FakeResponse(200, new_html, headers)) as sent:
+            assert fetch_html(WIKI_URL, cache_dir=cache_dir) == new_html
+        assert sent[0]['If-None-Match'] == '"rev-1"' and 'If-Modified-Since' not in sent[0]
+        stored_html, meta = load_snapshot(WIKI_URL, cache_dir)
+        assert stored_html == new_html
+        assert (meta['revision'], meta['etag'], meta['last_modified']) == ('1200000002', '"rev-2"',
+                                                                           headers['Last-Modified'])
+        assert stored_revisions(cache_dir) == [f"{FIXTURE_REVISION}.html", '1200000002.html']
+
+        # The next request revalidates against the new revision
+        with stub_get(FakeResponse(304)) as sent:
+            assert fetch_html(WIKI_URL, cache_dir=cache_dir) == new_html
+        assert sent[0]['If-None-Match'] == '"rev-2"'
+
+
+def test_first_fetch_is_unconditional():
+    html = read_fixture()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with stub_get(FakeResponse(200, html, {'ETag': '"rev-1"'})) as sent:
+            assert fetch_html(WIKI_URL, cache_dir=cache_dir) == html
+        assert 'If-None-Match' not in sent[0] and 'If-Modified-Since' not in sent[0]
+        stored_html, meta = load_snapshot(WIKI_URL, cache_dir)
+        assert stored_html == html and meta['etag'] == '"rev-1"'
+
+
+def test_network_error_falls_back_to_snapshot():
+    html = read_fixture()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        save_snapshot(WIKI_URL, html, etag='"rev-1"', cache_dir=cache_dir)
+        for failure in [requests.exceptions.ConnectionError("connection refused"), FakeResponse(503)]:
+            with stub_get(failure) as sent:
+                assert fetch_html(WIKI_URL, cache_dir=cache_dir) == html
+            assert len(sent) == 1
+        assert stored_revisions(cache_dir) == [f"{FIXTURE_REVISION}.html"]
+
+
+def test_network_error_without_snapshot_raises():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with stub_get(requests.exceptions.ConnectionError("connection refused")):
+            try:
+                fetch_html(WIKI_URL, cache_dir=cache_dir)
+            except requests.exceptions.ConnectionError:
+                return
+    raise AssertionError("a failed fetch with no snapshot did not raise")
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    print("--- HTML Cache Offline Checks ---")
+    failed = 0
+    for name, check in [(name, obj) for name, obj in list(globals().items()) if name.startswith('test_')]:
+        try:
+            check()
+            print(f"PASS: {name}")
+        except Exception as e:
+            failed += 1
+            print(f"FAIL: {name}: {type(e).__name__}: {e}")
+    print(f"\n--- {failed} check(s) failed ---" if failed else "\n--- All checks passed ---")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,127 @@
+# test_mapping_progress.py
+# Incremental MappingState updates must match a full rebuild: python -m pytest src/test_mapping_progress.py
+import pandas as pd
+import pytest
+
+from src import mapping_progress
+from src.brand_matcher import BrandMatcher
+from src.mapping_progress import MappingState
+
+BASE_MAP = pd.DataFrame([
+    ('Bud', 'BUD', 'Anheuser-Busch InBev'),
+    ('Bud Light', 'BUD', 'Anheuser-Busch InBev'),
+    ('Pepsi', 'PEP', 'PepsiCo'),
+    ('Kia', 'KIA', 'Kia Corporation'),
+    ('Coca-Cola', 'KO', 'The Coca-Cola Company'),
+], columns=['BrandName', 'StockTicker', 'ParentCompany'])
+
+BASE_TITLES = ['Bud Light "Dilly Dilly"', 'Bud Light "Dilly Dilly"', 'Budweiser Clydesdales', 'Pepsi Max',
+               'Pepsi Max', 'Pepsi Max', 'Kia Telluride', 'Nokia Lumia', 'Doritos Crash the Super Bowl',
+               'Doritos Crash the Super Bowl', 'Coca-Cola "Hilltop"', None, 'Mountain Dew Kickstart']
+
+
+def matcher_for(rows, word_boundary=False):
+    return BrandMatcher(pd.DataFrame(rows, columns=BASE_MAP.columns), word_boundary=word_boundary)
+
+
+def titles_of(values):
+    return pd.Series(values, dtype=object)
+
+
+def assert_matches_rebuild(state, matcher, titles):
+    fresh = MappingState(word_boundary=state.word_boundary)
+    fresh.update(matcher, titles_of(titles))
+    assert state.title_counts == fresh.title_counts
+    assert state.assignments == fresh.assignments
+    assert state.mapped_counts == fresh.mapped_counts
+    assert state.unmapped_counts == fresh.unmapped_counts
+    assert state.missing_titles == fresh.missing_titles
+    assert state.brand_rows == fresh.brand_rows
+    assert state.total_rows() == fresh.total_rows() == len(titles)
+    pd.testing.assert_series_equal(state.top_mapped(), fresh.top_mapped())
+    pd.testing.assert_series_equal(state.top_unmapped(), fresh.top_unmapped())
+
+
+@pytest.fixture(params=[False, True], ids=['substring', 'word_boundary'])
+def base_state(request):
+    state = MappingState(word_boundary=request.param)
+    state.update(matcher_for(BASE_MAP.values, request.param), titles_of(BASE_TITLES))
+    return state
+
+
+def test_title_edits(base_state):
+    matcher = matcher_for(BASE_MAP.values, base_state.word_boundary)
+    titles = (BASE_TITLES[:4]                      # 'Pepsi Max' 3 -> 1
+              + BASE_TITLES[6:9]                   # 'Doritos Crash the Super Bowl' 2 -> 1
+              + ['Coca-Cola "Hilltop"'] * 3        # 1 -> 3
+              + [None, None]                       # one more missing title
+              + ['Pepsi Zero Sugar', 'Kia EV9'])   # new titles; 'Mountain Dew Kickstart' removed
+    changes = base_state.update(matcher, titles_of(titles))
+    assert changes['new_titles'] == 2
+    assert changes['removed_titles'] == 1
+    assert changes['count_changes'] == 3
+    assert changes['added_brands'] == changes['removed_brands'] == changes['relabeled_brands'] == 0
+    assert_matches_rebuild(base_state, matcher, titles)
+
+
+def test_added_brands(base_state):
+    rows = [*BASE_MAP.values, ('Doritos', 'PEP', 'PepsiCo'), ('Pepsi Max', 'PEP', 'PepsiCo'),
+            ('Mountain Dew', 'PEP', 'PepsiCo')]
+    matcher = matcher_for(rows, base_state.word_boundary)
+    changes = base_state.update(matcher)
+    assert changes['added_brands'] == 3 and changes['new_titles'] == 0
+    assert base_state.assignments['Pepsi Max'] == 'pepsi max'  # longer brand takes over
+    assert_matches_rebuild(base_state, matcher, BASE_TITLES)
+
+
+def test_removed_brands(base_state):
+    rows = [row for row in BASE_MAP.values if row[0] not in ('Bud Light', 'Coca-Cola')]
+    matcher = matcher_for(rows, base_state.word_boundary)
+    changes = base_state.update(matcher)
+    assert changes['removed_brands'] == 2
+    assert base_state.assignments['Bud Light "Dilly Dilly"'] == 'bud'  # falls back to the shorter brand
+    assert base_state.assignments['Coca-Cola "Hilltop"'] is None
+    assert_matches_rebuild(base_state, matcher, BASE_TITLES)
+
+
+def test_relabelled_brands(base_state):
+    rows = [('Pepsi', 'PEP2', 'PepsiCo Inc.') if row[0] == 'Pepsi' else tuple(row) for row in BASE_MAP.values]
+    matcher = matcher_for(rows, base_state.word_boundary)
+    changes = base_state.update(matcher)
+    assert changes['relabeled_brands'] == 1 and changes['rescanned'] == 0
+    assert base_state.brand_rows['pepsi'] == ('Pepsi', 'PEP2', 'PepsiCo Inc.')
+    assert_matches_rebuild(base_state, matcher, BASE_TITLES)
+
+
+def test_titles_and_map_together(base_state):
+    rows = [*[row for row in BASE_MAP.values if row[0] != 'Kia'], ('Doritos', 'PEP', 'PepsiCo'),
+            ('Budweiser', 'BUD', 'Anheuser-Busch InBev')]
+    rows = [('Bud', 'ABI', 'AB InBev') if row[0] == 'Bud' else tuple(row) for row in rows]
+    matcher = matcher_for(rows, base_state.word_boundary)
+    titles = BASE_TITLES[2:] + ['Doritos Locos Tacos', 'Kia Telluride', 'Budweiser "Lost Dog"']
+    base_state.update(matcher, titles_of(titles))
+    assert_matches_rebuild(base_state, matcher, titles)
+
+    # and back again, in several steps
+    for step_titles, step_rows in [(BASE_TITLES, rows), (BASE_TITLES, BASE_MAP.values), ([None], BASE_MAP.values)]:
+        matcher = matcher_for(step_rows, base_state.word_boundary)
+        base_state.update(matcher, titles_of(step_titles))
+        assert_matches_rebuild(base_state, matcher, step_titles)
+
+
+def test_many_added_brands_rescan_everything(base_state, monkeypatch):
+    monkeypatch.setattr(mapping_progress, 'MAX_ADDED_BRANDS_FILTER', 0)
+    matcher = matcher_for([*BASE_MAP.values, ('Mountain Dew', 'PEP', 'PepsiCo')], base_state.word_boundary)
+    changes = base_state.update(matcher)
+    assert changes['rescanned'] == len(base_state.title_counts)
+    assert_matches_rebuild(base_state, matcher, BASE_TITLES)
+
+
+def test_save_and_load_round_trip(base_state, tmp_path):
+    path = str(tmp_path / 'state.pkl')
+    base_state.save(path)
+    loaded = MappingState.load(path)
+    matcher = matcher_for(BASE_MAP.values, base_state.word_boundary)
+    titles = BASE_TITLES + ['Pepsi Max']
+    loaded.update(matcher, titles_of(titles))
+    assert_matches_rebuild(loaded, matcher, titles)
@@ -0,0 +1,31 @@
+# test_package.py
+# Checks for the lazy package exports in src/__init__.py: python -m pytest src/test_package.py
+import pkgutil
+import subprocess
+import sys
+
+import src
+
+# Run in a fresh interpreter: whether an export shadows a submodule depends on what was imported first
+SHADOW_CHECK = """
+import importlib, sys, types
+import src
+for module_name in sys.argv[1:]:
+    getattr(src, module_name.split('.')[-1], None)  # the attribute first, as `from src import <name>` would
+    exec(f"import {module_name} as bound")
+    imported = importlib.import_module(module_name)
+    assert isinstance(bound, types.ModuleType) and bound is imported, f"{module_name} is shadowed by {bound!r}"
+"""
+
+
+def test_exports_do_not_shadow_submodules():
+    submodules = {info.name for info in pkgutil.iter_modules(src.__path__)}
+    assert not set(src.__all__) & submodules
+    result = subprocess.run([sys.executable, '-c', SHADOW_CHECK, 'src.super_bowl_dates', 'src.trends_lift'],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_renamed_export():
+    from src.trends_lift import trends_lift
+    assert src.compute_trends_lift is trends_lift
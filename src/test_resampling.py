@@ -0,0 +1,75 @@
+# test_resampling.py
+# Resampling results depend on the seed only, not on the worker count: python -m pytest src/test_resampling.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import resampling
+from src.event_study import MARKET_INDEX, run_event_study
+from src.resampling import SHARD_SIZE, bootstrap_mean_car, permutation_test, placebo_car_pools, significance_table
+from src.super_bowl_dates import super_bowl_sundays
+
+N_RESAMPLES = 2 * SHARD_SIZE + 321  # three shards, the last one partial
+JOB_COUNTS = [2, 3, None]  # compared with n_jobs=1; None = all CPUs
+
+
+@pytest.fixture(scope='module')
+def study():
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range('2012-01-02', '2024-06-28')
+    tickers = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE']
+    market = rng.normal(0.0004, 0.01, len(dates))
+    returns = pd.DataFrame({MARKET_INDEX: market}, index=dates)
+    for i, ticker in enumerate(tickers):
+        returns[ticker] = 0.0001 * i + (0.5 + 0.2 * i) * market + rng.normal(0, 0.015, len(dates))
+    returns.iloc[:400, 4] = np.nan  # EEE starts trading later
+    events = pd.DataFrame([(ticker, year) for ticker in tickers for year in range(2014, 2024)],
+                          columns=['StockTicker', 'Year'])
+    events['ParentCompany'] = events['StockTicker'].map({'AAA': 'P1', 'BBB': 'P1', 'CCC': 'P2', 'DDD': None,
+                                                         'EEE': 'P3'})
+    events['EventDate'] = pd.to_datetime(events['Year'].map(super_bowl_sundays))
+    results, _ = run_event_study(returns, events)
+    return returns, results
+
+
+def test_bootstrap_same_for_any_job_count(study):
+    _, results = study
+    for clusters in (None, results['ParentCompany']):
+        serial = bootstrap_mean_car(results['CAR[-1,+1]'], clusters=clusters, n_resamples=N_RESAMPLES, seed=11,
+                                    n_jobs=1)
+        for n_jobs in JOB_COUNTS:
+            assert bootstrap_mean_car(results['CAR[-1,+1]'], clusters=clusters, n_resamples=N_RESAMPLES, seed=11,
+                                      n_jobs=n_jobs) == serial
+        other_seed = bootstrap_mean_car(results['CAR[-1,+1]'], clusters=clusters, n_resamples=N_RESAMPLES, seed=12,
+                                        n_jobs=1)
+        assert other_seed['ci_low'] != serial['ci_low']
+
+
+def test_permutation_same_for_any_job_count(study):
+    returns, results = study
+    pools = placebo_car_pools(returns, results, n_placebos=50, seed=3, n_jobs=1)
+    pool = pools['CAR[+0,+1]']
+    serial = permutation_test(results['CAR[+0,+1]'], pool, n_resamples=N_RESAMPLES, seed=5, n_jobs=1)
+    for n_jobs in JOB_COUNTS:
+        assert permutation_test(results['CAR[+0,+1]'], pool, n_resamples=N_RESAMPLES, seed=5, n_jobs=n_jobs) == serial
+
+
+def test_placebo_pools_same_for_any_job_count(study, monkeypatch):
+    returns, results = study
+    monkeypatch.setattr(resampling, 'PLACEBO_CHUNK', 300)  # several chunks for the pool to spread
+    serial = placebo_car_pools(returns, results, n_placebos=40, seed=3, n_jobs=1)
+    for n_jobs in JOB_COUNTS:
+        pools = placebo_car_pools(returns, results, n_placebos=40, seed=3, n_jobs=n_jobs)
+        assert pools.keys() == serial.keys()
+        for col, pool in pools.items():
+            np.testing.assert_array_equal(pool, serial[col])
+
+
+def test_significance_table_same_for_any_job_count(study, monkeypatch):
+    returns, results = study
+    monkeypatch.setattr(resampling, 'PLACEBO_CHUNK', 300)
+    serial = significance_table(returns, results, n_resamples=N_RESAMPLES, n_placebos=40, seed=9, n_jobs=1)
+    assert serial[['CI_low', 'CI_high', 'p_permutation']].notna().all().all()
+    for n_jobs in JOB_COUNTS:
+        table = significance_table(returns, results, n_resamples=N_RESAMPLES, n_placebos=40, seed=9, n_jobs=n_jobs)
+        pd.testing.assert_frame_equal(table, serial, check_exact=True)
@@ -0,0 +1,100 @@
+# test_trends_normalization.py
+# Anchor-keyword rescaling of Trends batches: python -m pytest src/test_trends_normalization.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.trends_normalization import anchor_scale_factors, build_anchor_batches, normalize_batches
+
+ANCHOR = 'Wikipedia'
+KEYWORDS = [f'brand_{i}' for i in range(10)]  # batches of 4 + anchor: 4, 4, 2
+DATES = pd.date_range('2024-01-12', periods=61, freq='D', name='date')
+
+
+def true_interest(seed=0):
+    """Search interest on one absolute scale: keyword levels spanning ~50x, plus a steady anchor."""
+    rng = np.random.default_rng(seed)
+    levels = np.geomspace(0.2, 10, len(KEYWORDS))
+    values = levels * rng.gamma(4.0, 1.0, (len(DATES), len(KEYWORDS)))
+    anchor = 3.0 + rng.gamma(9.0, 0.1, len(DATES))
+    return pd.DataFrame(np.column_stack([values, anchor]), index=DATES, columns=KEYWORDS + [ANCHOR])
+
+
+def as_batches(truth, rounded=False):
+    """What Trends returns per batch: each batch scaled so its own peak is 100, plus isPartial."""
+    frames = []
+    for names in build_anchor_batches(KEYWORDS, anchor=ANCHOR):
+        frame = truth[names] * (100.0 / truth[names].to_numpy().max())
+        frame = frame.round() if rounded else frame
+        frame['isPartial'] = False
+        frames.append(frame)
+    return frames
+
+
+def test_batches_built_around_the_anchor():
+    batches = build_anchor_batches(KEYWORDS + [ANCHOR], anchor=ANCHOR)
+    assert [len(batch) for batch in batches] == [5, 5, 3]
+    assert all(batch[-1] == ANCHOR for batch in batches)
+    assert [kw for batch in batches for kw in batch[:-1]] == KEYWORDS
+
+
+def test_recovers_true_series_up_to_the_anchor_scale():
+    truth = true_interest()
+    panel = normalize_batches(as_batches(truth), anchor=ANCHOR, rescale_to_100=False)
+    assert list(panel.columns) == KEYWORDS[:4] + [ANCHOR] + KEYWORDS[4:]
+    assert panel.index.equals(DATES)
+    # One constant links every recovered value to the truth: the first batch's own scaling
+    scale = panel[ANCHOR] / truth[ANCHOR]
+    np.testing.assert_allclose(scale, scale.iloc[0], rtol=1e-12)
+    np.testing.assert_allclose(panel[truth.columns].to_numpy(), truth.to_numpy() * scale.iloc[0], rtol=1e-12)
+
+
+def test_rescale_to_100():
+    truth = true_interest(seed=1)
+    panel = normalize_batches(as_batches(truth), anchor=ANCHOR)
+    expected = truth * (100.0 / truth.to_numpy().max())
+    np.testing.assert_allclose(panel[truth.columns].to_numpy(), expected.to_numpy(), rtol=1e-12)
+    assert np.nanmax(panel.to_numpy()) == pytest.approx(100.0)
+
+
+def test_rounded_batches_stay_close():
+    # Trends rounds to whole numbers; the anchor's total keeps the scale error small
+    truth = true_interest(seed=2)
+    panel = normalize_batches(as_batches(truth, rounded=True), anchor=ANCHOR)
+    expected = truth * (100.0 / truth.to_numpy().max())
+    high = expected.to_numpy() >= 10  # rounding dominates the relative error of tiny values
+    np.testing.assert_allclose(panel[truth.columns].to_numpy()[high], expected.to_numpy()[high], rtol=0.08)
+
+
+def test_reference_skips_batches_without_anchor_interest():
+    truth = true_interest(seed=3)
+    frames = as_batches(truth)
+    frames[0][ANCHOR] = 0.0  # anchor gave nothing in the first batch
+    panel = normalize_batches(frames, anchor=ANCHOR, rescale_to_100=False)
+    assert panel[KEYWORDS[:4]].isna().all().all()
+    later = KEYWORDS[4:] + [ANCHOR]
+    scale = panel[later[0]] / truth[later[0]]
+    np.testing.assert_allclose(panel[later].to_numpy(), truth[later].to_numpy() * scale.iloc[0], rtol=1e-12)
+    # the anchor column comes from the new reference batch, unchanged
+    np.testing.assert_allclose(panel[ANCHOR], frames[1][ANCHOR], rtol=1e-12)
+
+
+def test_scale_factors():
+    series = np.array([[1.0, 3.0], [2.0, 6.0], [0.0, 0.0], [np.nan, np.nan], [0.5, np.nan]])
+    np.testing.assert_allclose(anchor_scale_factors(series), [1.0, 0.5, np.nan, np.nan, 8.0])
+    np.testing.assert_allclose(anchor_scale_factors(series, reference=1), [2.0, 1.0, np.nan, np.nan, 16.0])
+    assert np.isnan(anchor_scale_factors(np.zeros((2, 3)))).all()
+    with pytest.raises(ValueError):
+        anchor_scale_factors(series, reference=2)
+
+
+def test_duplicate_keywords_and_missing_anchor():
+    truth = true_interest(seed=4)
+    frames = as_batches(truth)
+    repeat = truth[[KEYWORDS[0], ANCHOR]] * (100.0 / truth[[KEYWORDS[0], ANCHOR]].to_numpy().max())
+    panel = normalize_batches(frames + [repeat], anchor=ANCHOR)
+    assert list(panel.columns).count(KEYWORDS[0]) == 1
+    pd.testing.assert_frame_equal(panel, normalize_batches(frames, anchor=ANCHOR))
+    with pytest.raises(ValueError, match='batch'):
+        normalize_batches([frames[0], frames[1].drop(columns=[ANCHOR])], anchor=ANCHOR)
+    assert normalize_batches([pd.DataFrame()], anchor=ANCHOR).empty
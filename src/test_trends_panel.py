@@ -0,0 +1,32 @@
+# test_trends_panel.py
+# Trends CSV discovery and import for the panel store: python -m pytest src/test_trends_panel.py
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.fetch_trends import trends_output_path
+from src.super_bowl_dates import super_bowl_sundays
+from src.trends_panel import TrendsPanel, find_trends_csvs, import_csvs
+
+
+def test_csv_names_round_trip_to_fetch_geos(tmp_path):
+    # fetch_trends names the files; find_trends_csvs must give back the geo each was fetched for
+    geos = ['US', '', 'GB']
+    for geo in geos:
+        name = os.path.basename(trends_output_path(2024, geo=geo))
+        (tmp_path / name).write_text('date,Pepsi\n')
+    assert sorted(find_trends_csvs(str(tmp_path))) == sorted((2024, geo) for geo in geos)
+
+
+def test_imported_worldwide_csv_shares_the_fetch_geo(tmp_path):
+    # A panel written for geo '' (as fetch_trends does) and an import of the _WORLD file use one geo slice
+    dates = pd.date_range(pd.Timestamp(super_bowl_sundays[2024]) - pd.Timedelta(days=3), periods=7, freq='D')
+    frame = pd.DataFrame({'Pepsi': np.arange(7, dtype=float)}, index=pd.Index(dates, name='date'))
+    panel_dir = str(tmp_path / 'panel')
+    TrendsPanel.open_or_create(panel_dir, years=[2024], keywords=['Pepsi'], geos=['']).write(2024, frame, geo='')
+    frame.to_csv(tmp_path / os.path.basename(trends_output_path(2024, geo='')))
+    panel = import_csvs(find_trends_csvs(str(tmp_path)), path=panel_dir)
+    assert panel.geos == ['']
+    windows = panel.query(['Pepsi'], years=[2024], geos=[''], window=(-3, 3))
+    assert windows.to_numpy().ravel().tolist() == list(range(7))
@@ -0,0 +1,229 @@
+# src/trends_lift.py
+# Run from the project root: python -m src.trends_lift [--panel] [--geo US]
+
+import argparse
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from src.cli import add_lift_arguments as add_arguments
+from src.config import LIFT_PATH
+from src.super_bowl_dates import super_bowl_sundays
+from src.trends_panel import (DAYS_AFTER, DAYS_BEFORE, DEFAULT_GEO, PANEL_DIR, UINT8_MISSING, TrendsPanel,
+                              find_trends_csvs)
+
+# --- Configuration ---
+RAW_DATA_DIR = 'data/raw'
+PROCESSED_DIR = 'data/processed'
+TICKER_MAP_PATH = os.path.join(RAW_DATA_DIR, 'advertiser_ticker_mapping.csv')
+COMMERCIALS_PATH = os.path.join(PROCESSED_DIR, 'wiki_super_bowl_commercials_extracted.csv')
+
+# Windows are in calendar days relative to Super Bowl Sunday (day 0), inclusive
+PRE_WINDOW = (-30, -8)   # baseline, before the pre-game teaser week
+POST_WINDOW = (0, 6)     # game day and the week after
+PEAK_WINDOW = (-3, 7)    # where the ad-driven peak is looked for
+MIN_PRE_DAYS = 7         # fewer baseline observations than this leaves the ratios NaN
+
+METRIC_COLS = ['TrendsDays', 'PreMean', 'PostMean', 'Lift', 'LiftPct', 'Peak', 'PeakOffset', 'PeakRatio',
+               'HalfLifeDays']
+
+# Trends values as a (year x keyword x day offset) array; `values` may be a memory-mapped view
+TrendsCube = namedtuple('TrendsCube', ['years', 'keywords', 'offsets', 'values'])
+
+
+def build_ad_events(commercials_df, matcher=None, sb_dates=super_bowl_sundays):
+    """
+    One event per (Primary_Advertiser, Year) with at least one matched ad: the
+    ad count that year, the brand's ad count over all years, and its ticker
+    and parent. With matcher=None the frame must already be mapped
+    (Primary_Advertiser, StockTicker, ParentCompany, as the pipeline's map stage writes).
+    """
+    if matcher is None:
+        matched = commercials_df[['Primary_Advertiser', 'StockTicker', 'ParentCompany']].rename(
+            columns={'Primary_Advertiser': 'BrandName'})
+    else:
+        matched = matcher.match(commercials_df['Advertiser_Product_Title'])
+    ads = pd.DataFrame({
+        'Primary_Advertiser': matched['BrandName'].to_numpy(),
+        'Year': pd.to_numeric(commercials_df['Year'], errors='coerce').to_numpy(),
+        'StockTicker': matched['StockTicker'].to_numpy(),
+        'ParentCompany': matched['ParentCompany'].to_numpy(),
+    }).dropna(subset=['Primary_Advertiser', 'Year'])
+    ads['Year'] = ads['Year'].astype(int)
+    ads = ads[ads['Year'].isin(list(sb_dates))]
+
+    events = ads.groupby(['Primary_Advertiser', 'Year'], sort=True).agg(
+        StockTicker=('StockTicker', 'first'), ParentCompany=('ParentCompany', 'first'),
+        NumAds=('Year', 'size'),
+    ).reset_index()
+    events['BrandAds'] = events.groupby('Primary_Advertiser')['NumAds'].transform('sum')
+    return events
+
+
+# --- Trends inputs ---
+def cube_from_csvs(csv_paths, sb_dates=super_bowl_sundays, days_before=DAYS_BEFORE, days_after=DAYS_AFTER):
+    """
+    Stacks wide per-year Trends CSVs ({year: path}) into a TrendsCube over the
+    union of their keywords. Each file's dates are turned into offsets from
+    that year's Super Bowl Sunday once, then placed with one fancy assignment.
+    """
+    frames = {year: pd.read_csv(path, index_col=0, parse_dates=True).drop(columns=['isPartial'], errors='ignore')
+              for year, path in sorted(csv_paths.items())}
+    keywords = list(dict.fromkeys(col for frame in frames.values() for col in frame.columns))
+    keyword_pos = {keyword: i for i, keyword in enumerate(keywords)}
+    offsets = np.arange(-days_before, days_after + 1)
+    values = np.full((len(frames), len(keywords), len(offsets)), np.nan, dtype=np.float32)
+    for y, (year, frame) in enumerate(frames.items()):
+        day = (pd.DatetimeIndex(frame.index).normalize() - pd.Timestamp(sb_dates[year])).days.to_numpy()
+        rows = np.flatnonzero((day >= offsets[0]) & (day <= offsets[-1]))
+        cols = np.array([keyword_pos[col] for col in frame.columns], dtype=np.intp)
+        values[y, cols[:, None], day[rows] - offsets[0]] = frame.to_numpy(dtype=np.float32, na_value=np.nan)[rows].T
+    return TrendsCube(list(frames), keywords, offsets, values)
+
+
+def cube_from_panel(panel, geo=DEFAULT_GEO):
+    """One geo of a TrendsPanel as a TrendsCube; the values stay memory-mapped."""
+    g = panel.geos.index(geo)
+    return TrendsCube(panel.years, panel.keywords, panel.offsets, panel.values[:, :, g, :])
+
+
+def gather_event_series(cube, years, keywords):
+    """
+    (event x day offset) float array for paired (year, keyword) events, read
+    with a single fancy index. Keywords match case-insensitively; events with
+    no Trends data get all-NaN rows.
+    """
+    year_pos = {year: i for i, year in enumerate(cube.years)}
+    keyword_pos = {}
+    for i, keyword in enumerate(cube.keywords):
+        keyword_pos.setdefault(str(keyword).lower(), i)
+    y = np.array([year_pos.get(year, -1) for year in years], dtype=np.intp)
+    k = np.array([keyword_pos.get(str(keyword).lower(), -1) for keyword in keywords], dtype=np.intp)
+    found = (y >= 0) & (k >= 0)
+    series = np.full((len(y), len(cube.offsets)), np.nan, dtype=np.float64)
+    if found.any():
+        raw = cube.values[y[found], k[found]]
+        rows = raw.astype(np.float64)
+        if raw.dtype == np.uint8:
+            rows[raw == UINT8_MISSING] = np.nan
+        series[found] = rows
+    return series
+
+
+def _window_mean(series, offsets, window):
+    cols = (offsets >= window[0]) & (offsets <= window[1])
+    block = series[:, cols]
+    counts = (~np.isnan(block)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nansum(block, axis=1) / counts, counts
+
+
+def lift_metrics(series, offsets, pre_window=PRE_WINDOW, post_window=POST_WINDOW, peak_window=PEAK_WINDOW,
+                 min_pre_days=MIN_PRE_DAYS):
+    """
+    Lift metrics for every row of an (event x day offset) array at once:
+
+    PreMean / PostMean  mean interest in the baseline and post-game windows
+    Lift / LiftPct      PostMean - PreMean, and PostMean / PreMean - 1
+    Peak / PeakOffset   highest interest inside peak_window and its day offset
+    PeakRatio           Peak / PreMean
+    HalfLifeDays        days after the peak until the excess over the baseline
+                        first falls to half the peak's excess (linearly
+                        interpolated); NaN if it never does inside the panel
+    """
+    offsets = np.asarray(offsets)
+    pre_mean, pre_days = _window_mean(series, offsets, pre_window)
+    post_mean, _ = _window_mean(series, offsets, post_window)
+    pre_mean[pre_days < min_pre_days] = np.nan
+
+    peak_cols = np.flatnonzero((offsets >= peak_window[0]) & (offsets <= peak_window[1]))
+    peak_block = series[:, peak_cols]
+    has_peak = ~np.isnan(peak_block).all(axis=1)
+    peak_at = peak_cols[np.where(np.isnan(peak_block), -np.inf, peak_block).argmax(axis=1)]
+    rows = np.arange(len(series))
+    peak = np.where(has_peak, series[rows, peak_at], np.nan)
+
+    # Half-life: first day after the peak where excess <= half the peak excess (NaN days never qualify)
+    excess = series - pre_mean[:, None]
+    half = (peak - pre_mean) / 2
+    with np.errstate(invalid='ignore'):
+        decayed = (np.arange(len(offsets))[None, :] > peak_at[:, None]) & (excess <= half[:, None])
+    crossed = decayed.any(axis=1) & (half > 0)
+    first = decayed.argmax(axis=1)
+    before = excess[rows, np.maximum(first - 1, 0)]
+    after = excess[rows, first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(np.isnan(before), 1.0, (before - half) / (before - after))
+    half_life = np.where(crossed, first - 1 + np.clip(fraction, 0, 1) - peak_at, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift_pct = np.where(pre_mean > 0, post_mean / pre_mean - 1, np.nan)
+        peak_ratio = np.where(pre_mean > 0, peak / pre_mean, np.nan)
+    return pd.DataFrame({
+        'TrendsDays': (~np.isnan(series)).sum(axis=1), 'PreMean': pre_mean, 'PostMean': post_mean,
+        'Lift': post_mean - pre_mean, 'LiftPct': lift_pct, 'Peak': peak,
+        'PeakOffset': np.where(has_peak, offsets[peak_at], np.nan), 'PeakRatio': peak_ratio,
+        'HalfLifeDays': half_life,
+    }, columns=METRIC_COLS)
+
+
+def trends_lift(events, cube, **window_kwargs):
+    """Tidy results: one row per (Primary_Advertiser, Year) event with its ad counts and lift metrics."""
+    series = gather_event_series(cube, events['Year'].to_numpy(), events['Primary_Advertiser'].to_numpy())
+    metrics = lift_metrics(series, cube.offsets, **window_kwargs)
+    return pd.concat([events.reset_index(drop=True), metrics], axis=1)
+
+
+def main(use_panel=False, geo=DEFAULT_GEO, panel_dir=PANEL_DIR, trends_dir=PROCESSED_DIR, output_path=LIFT_PATH):
+    print(f"--- Google Trends Lift per Advertiser and Year ---")
+    from src.brand_matcher import load_brand_matcher
+    from src.storage import load_commercials
+    try:
+        commercials_df = load_commercials(COMMERCIALS_PATH, columns=['Advertiser_Product_Title', 'Year'])
+        matcher = load_brand_matcher(TICKER_MAP_PATH)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        return
+    events = build_ad_events(commercials_df, matcher)
+    print(f"Built {len(events)} (advertiser, year) events from {int(events['NumAds'].sum())} matched ads.")
+
+    try:
+        if use_panel:
+            cube = cube_from_panel(TrendsPanel.open(panel_dir), geo=geo)
+            print(f"Trends panel '{panel_dir}' ({geo}): {len(cube.years)} years x {len(cube.keywords)} keywords.")
+        else:
+            csv_paths = {year: path for (year, csv_geo), path in find_trends_csvs(trends_dir).items()
+                         if csv_geo == geo}
+            if not csv_paths:
+                print(f"ERROR: No google_trends_<year> CSVs for {geo} in '{trends_dir}'. Run fetch_trends first.")
+                return
+            cube = cube_from_csvs(csv_paths)
+            print(f"Loaded Trends for {len(cube.years)} years x {len(cube.keywords)} keywords from CSV.")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return
+
+    results = trends_lift(events, cube)
+    covered = results[results['TrendsDays'] > 0]
+    print(f"Trends data for {len(covered)} of {len(results)} events.")
+    if not covered.empty:
+        print("\n--- Top 20 events by post-game lift ---")
+        print(covered.sort_values('LiftPct', ascending=False).head(20)[
+            ['Primary_Advertiser', 'Year', 'NumAds', 'PreMean', 'PostMean', 'LiftPct', 'PeakRatio', 'HalfLifeDays']]
+            .round(2).to_string(index=False))
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    results.to_csv(output_path, index=False)
+    print(f"\nLift results saved to: {output_path}")
+
+
+def run(args):
+    main(use_panel=args.panel, geo=args.geo, panel_dir=args.panel_dir, trends_dir=args.trends_dir,
+         output_path=args.out)
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search-interest lift around Super Bowl Sunday per advertiser-year.")
+    run(add_arguments(parser).parse_args())
@@ -0,0 +1,103 @@
+# src/trends_normalization.py
+
+import numpy as np
+import pandas as pd
+
+from src.config import ANCHOR_KEYWORD  # steady, non-advertiser search term shared by every batch
+
+KEYWORDS_PER_BATCH = 5  # Google Trends limit: 4 keywords + the anchor
+
+
+def build_anchor_batches(keywords, anchor=ANCHOR_KEYWORD, batch_size=KEYWORDS_PER_BATCH):
+    """Splits keywords into batches of batch_size-1 and appends the anchor to each."""
+    others = [kw for kw in keywords if kw != anchor]
+    step = batch_size - 1
+    return [others[start:start + step] + [anchor] for start in range(0, len(others), step)]
+
+
+def stack_batches(frames):
+    """
+    Aligns batch frames on the union of their dates and stacks them into a
+    (batch x date x keyword-slot) float array, NaN-padded for short batches.
+    Returns (array, dates, keyword names per batch).
+    """
+    dates = frames[0].index
+    for frame in frames[1:]:
+        if not frame.index.equals(dates):
+            dates = dates.union(frame.index)
+    width = max(frame.shape[1] for frame in frames)
+    stacked = np.full((len(frames), len(dates), width), np.nan, dtype=np.float64)
+    for b, frame in enumerate(frames):
+        values = frame.reindex(dates).to_numpy(dtype=np.float64, na_value=np.nan)
+        stacked[b, :, :values.shape[1]] = values
+    return stacked, dates, [list(frame.columns) for frame in frames]
+
+
+def anchor_scale_factors(anchor_series, reference=None):
+    """
+    Per-batch multipliers that put each batch on the reference batch's scale.
+    `anchor_series` is (batch x date); factors compare the anchor's total
+    interest, which is far less noisy than any single day. The reference
+    defaults to the first batch whose anchor has any interest. Batches whose
+    anchor is all zero/missing get NaN.
+    """
+    totals = np.nansum(anchor_series, axis=1)
+    if reference is None:
+        nonzero = np.flatnonzero(totals > 0)
+        if not len(nonzero):
+            return np.full(len(totals), np.nan)
+        reference = nonzero[0]
+    elif not totals[reference] > 0:
+        raise ValueError(f"Reference batch {reference} has no anchor interest to scale against")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factors = totals[reference] / totals
+    factors[~np.isfinite(factors)] = np.nan
+    return factors
+
+
+def normalize_batches(frames, anchor=ANCHOR_KEYWORD, rescale_to_100=True):
+    """
+    Merges Trends batches that all contain `anchor` into one wide panel on a
+    common scale.
+
+    Every batch is rescaled so its anchor matches the first batch's anchor
+    that has any interest (see anchor_scale_factors), in
+    one broadcast multiply over the stacked (batch x date x keyword) array;
+    the panel is then (optionally) rescaled so its overall peak is 100.
+    Keywords seen in several batches keep their first rescaled occurrence.
+    """
+    frames = [frame.drop(columns=['isPartial'], errors='ignore') for frame in frames]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    missing = [b for b, frame in enumerate(frames) if anchor not in frame.columns]
+    if missing:
+        raise ValueError(f"Anchor keyword '{anchor}' missing from batch(es) {missing}")
+
+    stacked, dates, names = stack_batches(frames)
+    anchor_slots = np.array([batch_names.index(anchor) for batch_names in names])
+    anchor_series = stacked[np.arange(len(frames)), :, anchor_slots]  # (batch x date)
+    factors = anchor_scale_factors(anchor_series)
+    if np.isnan(factors).any():
+        print(f"WARNING: Anchor '{anchor}' has no interest in batch(es) {np.flatnonzero(np.isnan(factors)).tolist()}; "
+              "their keywords are left as NaN.")
+    scaled = stacked * factors[:, None, None]
+
+    # Flatten (batch, slot) into panel columns in order of first appearance. A keyword seen in several
+    # batches (always the anchor) takes its values from the first batch that could be rescaled.
+    flat = scaled.transpose(1, 0, 2).reshape(len(dates), -1)
+    slots = pd.DataFrame({
+        'name': [name for batch_names in names for name in batch_names + [None] * (stacked.shape[2] - len(batch_names))],
+        'scaled': np.repeat(np.isfinite(factors), stacked.shape[2]),
+    }).dropna(subset=['name'])
+    columns = slots['name'].drop_duplicates()
+    source = slots.sort_values('scaled', ascending=False, kind='stable').drop_duplicates('name')
+    keep = pd.Series(source.index, index=source['name']).loc[columns].to_numpy()
+    panel = pd.DataFrame(flat[:, keep], index=dates, columns=list(columns))
+
+    if rescale_to_100:
+        peak = np.nanmax(panel.to_numpy()) if panel.notna().any().any() else np.nan
+        if peak and np.isfinite(peak):
+            panel = panel * (100.0 / peak)
+    panel.index.name = frames[0].index.name
+    return panel
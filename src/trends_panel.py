@@ -0,0 +1,326 @@
+# src/trends_panel.py
+# Run from the project root: python -m src.trends_panel [--import-csv] [--query BRAND ...]
+
+import argparse
+import glob
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.cli import add_panel_arguments as add_arguments
+from src.config import DEFAULT_GEO, PANEL_DIR, PANEL_DTYPES, PROCESSED_DIR, QUERY_WINDOW, WORLD_FILE_SUFFIX
+from src.super_bowl_dates import super_bowl_sundays
+
+# --- Configuration ---
+VALUES_FILENAME = 'values.bin'  # raw C-order array, opened with np.memmap
+INDEX_FILENAME = 'index.json'   # axes (years, keywords, geos, day offsets), dtype and shape
+PANEL_VERSION = 1
+DAYS_BEFORE = 30
+DAYS_AFTER = 30
+DTYPES = PANEL_DTYPES  # float32 (exact) or uint8 (rounded 0-100, a quarter of the space)
+UINT8_MISSING = 255  # uint8 has no NaN: this code marks "no data"
+
+# google_trends_<year>.csv (default geo) or google_trends_<year>_<geo>.csv, as written by fetch_trends
+# (worldwide data, geo '', is google_trends_<year>_WORLD.csv)
+_CSV_NAME = re.compile(r"google_trends_(\d{4})(?:_([A-Za-z0-9-]+))?\.csv$")
+
+
+def _positions(names, lookup, label):
+    """Axis positions of `names`; raises KeyError listing every name not in the panel."""
+    missing = [name for name in names if name not in lookup]
+    if missing:
+        raise KeyError(f"{label} not in the Trends panel: {missing}")
+    return np.array([lookup[name] for name in names], dtype=np.intp)
+
+
+class TrendsPanel:
+    """
+    All Trends results as one dense (year x keyword x geo x day offset) array.
+
+    The values live in a memory-mapped file next to a small JSON index of the
+    four axes, so a query only reads the pages of the (year, keyword, geo)
+    rows it asks for. Day offsets count calendar days from that year's Super
+    Bowl Sunday (0 = game day), which aligns every year's window. Missing
+    data is NaN (float32) or UINT8_MISSING (uint8); queries always return
+    float32 with NaN.
+
+    e.g. TrendsPanel.open().query(['Doritos', 'Tide'], years=range(2015, 2025))
+    """
+
+    def __init__(self, path, index, mode='r'):
+        self.path = path
+        self.index = index
+        self.years = list(index['years'])
+        self.keywords = list(index['keywords'])
+        self.geos = list(index['geos'])
+        self.offsets = np.arange(-index['days_before'], index['days_after'] + 1)
+        self.dtype = np.dtype(index['dtype'])
+        self.shape = (len(self.years), len(self.keywords), len(self.geos), len(self.offsets))
+        self._year_pos = {year: i for i, year in enumerate(self.years)}
+        self._keyword_pos = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self._keyword_lower = {}
+        for i, keyword in enumerate(self.keywords):
+            self._keyword_lower.setdefault(keyword.lower(), i)
+        self._geo_pos = {geo: i for i, geo in enumerate(self.geos)}
+
+        values_path = os.path.join(path, VALUES_FILENAME)
+        expected = int(np.prod(self.shape)) * self.dtype.itemsize
+        if os.path.getsize(values_path) != expected:
+            raise ValueError(f"Trends panel '{path}' is corrupt: {values_path} does not match the index shape {self.shape}")
+        # An empty file cannot be mapped; an empty panel needs no backing memory anyway
+        self.values = (np.memmap(values_path, dtype=self.dtype, mode=mode, shape=self.shape) if expected
+                       else np.empty(self.shape, dtype=self.dtype))
+
+    @property
+    def missing(self):
+        return UINT8_MISSING if self.dtype == np.uint8 else np.nan
+
+    # --- Creating and opening ---
+    @classmethod
+    def create(cls, path=PANEL_DIR, years=(), keywords=(), geos=(DEFAULT_GEO,), days_before=DAYS_BEFORE,
+               days_after=DAYS_AFTER, dtype='float32'):
+        """Writes an empty (all missing) panel with the given axes and opens it for writing."""
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown panel dtype '{dtype}' (expected one of {DTYPES})")
+        index = {'version': PANEL_VERSION, 'dtype': dtype, 'days_before': int(days_before),
+                 'days_after': int(days_after), 'years': sorted(int(year) for year in set(years)),
+                 'keywords': list(dict.fromkeys(keywords)), 'geos': list(dict.fromkeys(geos))}
+        os.makedirs(path, exist_ok=True)
+        shape = (len(index['years']), len(index['keywords']), len(index['geos']), days_before + days_after + 1)
+        values_path = os.path.join(path, VALUES_FILENAME)
+        with open(values_path + '.tmp', 'wb') as f:
+            f.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        if np.prod(shape):
+            values = np.memmap(values_path + '.tmp', dtype=dtype, mode='r+', shape=shape)
+            values[:] = UINT8_MISSING if dtype == 'uint8' else np.nan
+            values.flush()
+            del values
+        cls._commit(path, index)
+        return cls(path, index, mode='r+')
+
+    @staticmethod
+    def _commit(path, index):
+        # Values first, index last: a crash in between leaves a size mismatch that open() rejects
+        values_path = os.path.join(path, VALUES_FILENAME)
+        os.replace(values_path + '.tmp', values_path)
+        index_path = os.path.join(path, INDEX_FILENAME)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+        os.replace(index_path + '.tmp', index_path)
+
+    @classmethod
+    def open(cls, path=PANEL_DIR, mode='r'):
+        index_path = os.path.join(path, INDEX_FILENAME)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"No Trends panel at '{path}'")
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != PANEL_VERSION:
+            raise ValueError(f"Trends panel '{path}' has version {index.get('version')}, expected {PANEL_VERSION}")
+        return cls(path, index, mode=mode)
+
+    @classmethod
+    def open_or_create(cls, path=PANEL_DIR, years=(), keywords=(), geos=(DEFAULT_GEO,), days_before=DAYS_BEFORE,
+                       days_after=DAYS_AFTER, dtype='float32'):
+        """Opens the panel for writing, first growing its axes to cover the given years/keywords/geos."""
+        if not os.path.exists(os.path.join(path, INDEX_FILENAME)):
+            return cls.create(path, years, keywords, geos, days_before, days_after, dtype)
+        panel = cls.open(path, mode='r+')
+        if (panel.index['days_before'], panel.index['days_after']) != (days_before, days_after):
+            raise ValueError(f"Trends panel '{path}' covers days -{panel.index['days_before']}..+"
+                             f"{panel.index['days_after']}, not -{days_before}..+{days_after}")
+        return panel.extend(years=years, keywords=keywords, geos=geos)
+
+    def extend(self, years=(), keywords=(), geos=()):
+        """
+        Returns a panel whose axes also hold the given years/keywords/geos.
+        New entries are appended (years stay sorted) and the existing values are
+        copied one year at a time, so growing never needs the whole panel in memory.
+        """
+        new_years = sorted(set(self.years) | {int(year) for year in years})
+        new_keywords = self.keywords + [kw for kw in dict.fromkeys(keywords) if kw not in self._keyword_pos]
+        new_geos = self.geos + [geo for geo in dict.fromkeys(geos) if geo not in self._geo_pos]
+        if (new_years, new_keywords, new_geos) == (self.years, self.keywords, self.geos):
+            return self
+        print(f"Growing Trends panel to {len(new_years)} years x {len(new_keywords)} keywords x {len(new_geos)} geos...")
+        index = {**self.index, 'years': new_years, 'keywords': new_keywords, 'geos': new_geos}
+        shape = (len(new_years), len(new_keywords), len(new_geos), len(self.offsets))
+        values_path = os.path.join(self.path, VALUES_FILENAME)
+        with open(values_path + '.tmp', 'wb') as f:
+            f.truncate(int(np.prod(shape)) * self.dtype.itemsize)
+        if np.prod(shape):
+            grown = np.memmap(values_path + '.tmp', dtype=self.dtype, mode='r+', shape=shape)
+            grown[:] = self.missing
+            year_pos = {year: i for i, year in enumerate(new_years)}
+            # Old keywords/geos keep their positions; only the year axis can be reordered
+            for old_y, year in enumerate(self.years):
+                grown[year_pos[year], :len(self.keywords), :len(self.geos)] = self.values[old_y]
+            grown.flush()
+            del grown
+        del self.values  # this instance is stale once the new file replaces the old one
+        self._commit(self.path, index)
+        return type(self)(self.path, index, mode='r+')
+
+    # --- Writing ---
+    def write(self, year, wide_df, geo=DEFAULT_GEO, super_bowl_sunday=None):
+        """
+        Stores one year's wide date x keyword Trends frame for `geo`.
+        Dates are converted to offsets from Super Bowl Sunday; dates outside
+        the panel's window are dropped. Returns the number of keywords written.
+        """
+        sb_date = pd.Timestamp(super_bowl_sunday or super_bowl_sundays[year])
+        frame = wide_df.drop(columns=['isPartial'], errors='ignore')
+        offsets = (pd.DatetimeIndex(frame.index).normalize() - sb_date).days.to_numpy()
+        rows = np.flatnonzero((offsets >= self.offsets[0]) & (offsets <= self.offsets[-1]))
+        values = np.full((frame.shape[1], len(self.offsets)), np.nan, dtype=np.float32)
+        values[:, offsets[rows] - self.offsets[0]] = frame.to_numpy(dtype=np.float32, na_value=np.nan)[rows].T
+        keyword_pos = _positions(list(frame.columns), self._keyword_pos, 'Keyword(s)')
+        y = _positions([year], self._year_pos, 'Year')[0]
+        g = _positions([geo], self._geo_pos, 'Geo')[0]
+        self.values[y, keyword_pos, g] = self._encode(values)
+        self.values.flush()
+        return len(keyword_pos)
+
+    def _encode(self, values):
+        if self.dtype != np.uint8:
+            return values
+        encoded = np.full(values.shape, UINT8_MISSING, dtype=np.uint8)
+        present = ~np.isnan(values)
+        encoded[present] = np.clip(np.rint(values[present]), 0, UINT8_MISSING - 1)
+        return encoded
+
+    def _decode(self, values):
+        if self.dtype != np.uint8:
+            return np.asarray(values, dtype=np.float32)
+        decoded = values.astype(np.float32)
+        decoded[values == UINT8_MISSING] = np.nan
+        return decoded
+
+    # --- Queries ---
+    def keyword_positions(self, brands):
+        """Panel positions of brand keywords; exact names first, then case-insensitive."""
+        positions, missing = [], []
+        for brand in brands:
+            pos = self._keyword_pos.get(brand, self._keyword_lower.get(str(brand).lower()))
+            if pos is None:
+                missing.append(brand)
+            else:
+                positions.append(pos)
+        if missing:
+            raise KeyError(f"Keyword(s) not in the Trends panel: {missing}")
+        return np.array(positions, dtype=np.intp)
+
+    def windows(self, brands, years=None, geos=None, window=QUERY_WINDOW):
+        """
+        (year x brand x geo x offset) float32 array of the event windows
+        [window[0], window[1]] around each Super Bowl Sunday, clipped to the
+        panel's offsets (ValueError if they do not overlap). Only the requested
+        rows and offsets are read from the memory-mapped file.
+        """
+        years = self.years if years is None else [int(year) for year in years]
+        geos = self.geos if geos is None else list(geos)
+        if window[0] > window[1] or window[1] < self.offsets[0] or window[0] > self.offsets[-1]:
+            raise ValueError(f"Window [{window[0]:+d},{window[1]:+d}] does not overlap the panel's day offsets "
+                             f"[{self.offsets[0]:+d},{self.offsets[-1]:+d}]")
+        start = max(window[0], self.offsets[0]) - self.offsets[0]
+        stop = min(window[1], self.offsets[-1]) - self.offsets[0] + 1
+        rows = np.ix_(_positions(years, self._year_pos, 'Year(s)'), self.keyword_positions(brands),
+                      _positions(geos, self._geo_pos, 'Geo(s)'))
+        return self._decode(self.values[..., start:stop][rows])
+
+    def query(self, brands, years=None, geos=None, window=QUERY_WINDOW, dropna=True):
+        """
+        Aligned event windows as a frame: one row per (Year, Keyword, Geo),
+        one column per day offset from Super Bowl Sunday. Rows without any
+        data are dropped unless dropna=False.
+        """
+        brands = list(brands)
+        years = self.years if years is None else [int(year) for year in years]
+        geos = self.geos if geos is None else list(geos)
+        data = self.windows(brands, years=years, geos=geos, window=window)
+        offsets = self.offsets[(self.offsets >= window[0]) & (self.offsets <= window[1])]
+        index = pd.MultiIndex.from_product([years, [self.keywords[pos] for pos in self.keyword_positions(brands)], geos],
+                                           names=['Year', 'Keyword', 'Geo'])
+        frame = pd.DataFrame(data.reshape(-1, len(offsets)), index=index, columns=pd.Index(offsets, name='DayOffset'))
+        return frame.dropna(how='all') if dropna else frame
+
+    def coverage(self):
+        """Keywords with any data per (Year, Geo), read one year at a time."""
+        rows = []
+        for y, year in enumerate(self.years):
+            block = self._decode(self.values[y])  # keyword x geo x offset
+            has_data = ~np.isnan(block).all(axis=2)
+            rows += [{'Year': year, 'Geo': geo, 'Keywords': int(has_data[:, g].sum())} for g, geo in enumerate(self.geos)]
+        return pd.DataFrame(rows, columns=['Year', 'Geo', 'Keywords'])
+
+
+def find_trends_csvs(processed_dir=PROCESSED_DIR):
+    """{(year, geo): path} for the wide per-year CSVs written by fetch_trends (worldwide = geo '')."""
+    found = {}
+    for path in sorted(glob.glob(os.path.join(processed_dir, 'google_trends_*.csv'))):
+        match = _CSV_NAME.search(os.path.basename(path))
+        if match:
+            suffix = match.group(2)
+            geo = DEFAULT_GEO if suffix is None else '' if suffix == WORLD_FILE_SUFFIX else suffix
+            found[(int(match.group(1)), geo)] = path
+    return found
+
+
+def import_csvs(csv_paths, path=PANEL_DIR, dtype='float32'):
+    """Loads {(year, geo): wide CSV path} into the panel at `path` (created or grown as needed)."""
+    frames = {key: pd.read_csv(csv_path, index_col=0, parse_dates=True) for key, csv_path in csv_paths.items()}
+    keywords = [col for frame in frames.values() for col in frame.columns if col != 'isPartial']
+    panel = TrendsPanel.open_or_create(path, years=[year for year, _ in frames], keywords=keywords,
+                                       geos=[geo for _, geo in frames], dtype=dtype)
+    for (year, geo), frame in frames.items():
+        panel.write(year, frame, geo=geo)
+    return panel
+
+
+def main(import_csv=False, brands=None, years=None, geos=None, window=QUERY_WINDOW, out_path=None,
+         panel_dir=PANEL_DIR, dtype='float32'):
+    print(f"--- Google Trends Panel ---")
+    if import_csv:
+        csv_paths = find_trends_csvs()
+        if not csv_paths:
+            print(f"No google_trends_<year>[_<geo>].csv files found in '{PROCESSED_DIR}'.")
+            return
+        import_csvs(csv_paths, path=panel_dir, dtype=dtype)
+        print(f"Imported {len(csv_paths)} Trends CSV file(s) into '{panel_dir}'.")
+
+    try:
+        panel = TrendsPanel.open(panel_dir)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}. Run fetch_trends or --import-csv first.")
+        return
+    size_mb = os.path.getsize(os.path.join(panel_dir, VALUES_FILENAME)) / 2**20
+    print(f"Panel: {len(panel.years)} years x {len(panel.keywords)} keywords x {len(panel.geos)} geos x "
+          f"{len(panel.offsets)} days ({panel.dtype}, {size_mb:.1f} MB)")
+    if not brands:
+        print(panel.coverage().pivot(index='Year', columns='Geo', values='Keywords').to_string())
+        return
+
+    try:
+        windows = panel.query(brands, years=years, geos=geos, window=window)
+    except (KeyError, ValueError) as e:
+        print(f"ERROR: {e.args[0]}")
+        return
+    print(f"\n--- Event windows, days {window[0]:+d} to {window[1]:+d} around Super Bowl Sunday ---")
+    print(windows.astype(np.float64).round(1).to_string())
+    if out_path:
+        windows.to_csv(out_path)
+        print(f"Event windows saved to: {out_path}")
+
+
+def run(args):
+    main(import_csv=args.import_csv, brands=args.query, years=args.years, geos=args.geos, window=tuple(args.window),
+         out_path=args.out, panel_dir=args.panel_dir, dtype=args.dtype)
+
+
+# --- Main Execution Guard ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the multi-year, multi-geo Google Trends panel.")
+    run(add_arguments(parser).parse_args())
@@ -0,0 +1,289 @@
+# src/trends_scheduler.py
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import incr, span
+from src.trends_normalization import build_anchor_batches
+
+TRENDS_FIRST_YEAR = 2004  # Google Trends has no data before 2004
+KEYWORDS_PER_BATCH = 5
+REQUESTS_PER_MINUTE = 6
+BURST = 2
+MAX_WORKERS = 3
+MAX_RETRIES = 5
+BACKOFF_BASE = 30.0  # seconds; doubled on every retry
+BACKOFF_CAP = 15 * 60.0
+TRENDS_JOBS_DIR = 'data/processed/trends_jobs'
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock, self.sleep = clock, sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class JobLedger:
+    """
+    Append-only JSON-lines record of finished jobs, so a crashed run can resume.
+    The last line written for a job id wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash
+                    self.entries[entry['job_id']] = entry
+
+    def is_done(self, job_id):
+        return self.entries.get(job_id, {}).get('status') in ('done', 'empty')
+
+    def record(self, job_id, status, **fields):
+        entry = {'job_id': job_id, 'status': status, 'recorded_at': time.time(), **fields}
+        with self.lock:
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[job_id] = entry
+
+
+def build_jobs(keywords, sb_dates, years=None, keywords_per_batch=KEYWORDS_PER_BATCH,
+               days_before=30, days_after=30, anchor=None):
+    """
+    One job per (year, batch of keywords). `sb_dates` maps year -> Super Bowl
+    Sunday ('YYYY-MM-DD'); years before Google Trends coverage are skipped.
+    With an `anchor`, each batch holds keywords_per_batch-1 keywords plus the
+    anchor so the batches can be put on one scale afterwards.
+    Job ids include a hash of the keyword list, so changing the batching never
+    reuses stale ledger entries.
+    """
+    if anchor:
+        batches = build_anchor_batches(keywords, anchor=anchor, batch_size=keywords_per_batch)
+    else:
+        batches = [list(keywords[start:start + keywords_per_batch])
+                   for start in range(0, len(keywords), keywords_per_batch)]
+    years = sorted(sb_dates) if years is None else years
+    jobs = []
+    for year in years:
+        if year < TRENDS_FIRST_YEAR or year not in sb_dates:
+            continue
+        sb_date = pd.Timestamp(sb_dates[year])
+        start_date = sb_date - pd.Timedelta(days=days_before)
+        end_date = sb_date + pd.Timedelta(days=days_after)
+        timeframe = f"{start_date.strftime('%Y-%m-%d')} {end_date.strftime('%Y-%m-%d')}"
+        for batch, batch_keywords in enumerate(batches):
+            digest = hashlib.sha1('\x1f'.join(batch_keywords).encode('utf-8')).hexdigest()[:8]
+            jobs.append({
+                'job_id': f"{year}:{batch:04d}:{digest}", 'year': year, 'batch': batch,
+                'keywords': batch_keywords, 'timeframe': timeframe,
+            })
+    return jobs
+
+
+def is_rate_limited(error):
+    """True for HTTP 429 responses (pytrends raises TooManyRequestsError / ResponseError)."""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return type(error).__name__ == 'TooManyRequestsError' or '429' in str(error)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP, rng=random):
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2**attempt))."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def default_client_factory():
+    from pytrends.request import TrendReq
+    # hl='en-US': language/host; tz=360: US Pacific Timezone approx (adjust if needed, affects daily boundary)
+    return TrendReq(hl='en-US', tz=360)
+
+
+class FakeTrendReq:
+    """
+    Offline stand-in for pytrends.TrendReq with the same build_payload /
+    interest_over_time calls. Returns deterministic random 0-100 series and
+    can raise a 429 on the first `fail_first` calls to exercise backoff.
+    """
+
+    def __init__(self, seed=0, fail_first=0, latency=0.0):
+        self.seed = seed
+        self.fail_first = fail_first
+        self.latency = latency
+        self.calls = 0
+        self.kw_list = []
+        self.timeframe = None
+
+    def build_payload(self, kw_list, cat=0, timeframe='today 5-y', geo='', gprop=''):
+        self.kw_list, self.timeframe = list(kw_list), timeframe
+
+    def interest_over_time(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.calls <= self.fail_first:
+            raise RuntimeError("The request failed: Google returned a response with code 429")
+        start, end = self.timeframe.split()
+        dates = pd.date_range(start, end, freq='D', name='date')
+        rng = np.random.default_rng([self.seed] + [sum(map(ord, kw)) for kw in self.kw_list])
+        values = rng.gamma(2.0, 10.0, size=(len(dates), len(self.kw_list)))
+        values = np.rint(values / values.max() * 100).astype(int)
+        df = pd.DataFrame(values, index=dates, columns=self.kw_list)
+        df['isPartial'] = False
+        return df
+
+
+class TrendsScheduler:
+    """
+    Runs Trends (year, batch) jobs on a bounded thread pool.
+
+    Every request first takes a token from a shared TokenBucket; 429 responses
+    are retried with exponential backoff and jitter. Finished batches are
+    written to <jobs_dir>/<year>/batch_NNNN_<hash>.csv and recorded in a JobLedger,
+    so re-running skips everything already fetched.
+    """
+
+    def __init__(self, jobs_dir=TRENDS_JOBS_DIR, client_factory=default_client_factory,
+                 max_workers=MAX_WORKERS, requests_per_minute=REQUESTS_PER_MINUTE, burst=BURST,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, geo='US', sleep=time.sleep, seed=None):
+        self.jobs_dir = jobs_dir
+        self.client_factory = client_factory
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(requests_per_minute / 60.0, capacity=burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.geo = geo
+        self.sleep = sleep
+        self.rng = random.Random(seed)
+        self.ledger = JobLedger(os.path.join(jobs_dir, 'ledger.jsonl'))
+        self._local = threading.local()  # pytrends sessions are not thread-safe: one client per worker
+
+    def batch_path(self, job):
+        digest = job['job_id'].rsplit(':', 1)[-1]
+        return os.path.join(self.jobs_dir, str(job['year']), f"batch_{job['batch']:04d}_{digest}.csv")
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.client_factory()
+        return self._local.client
+
+    def _run_job(self, job):
+        attempt = 0
+        while True:
+            with span('trends.token_wait'):
+                self.bucket.acquire()
+            try:
+                client = self._client()
+                incr('trends.api_calls')
+                with span('trends.request'):
+                    client.build_payload(kw_list=job['keywords'], cat=0, timeframe=job['timeframe'], geo=self.geo, gprop='')
+                    batch_data = client.interest_over_time()
+                break
+            except Exception as e:
+                rate_limited = is_rate_limited(e)
+                incr('trends.rate_limited' if rate_limited else 'trends.errors')
+                if attempt >= self.max_retries:
+                    self.ledger.record(job['job_id'], 'failed', error=str(e), attempts=attempt + 1)
+                    logger.error("Trends job failed", extra={'fields': {'job': job['job_id'], 'attempts': attempt + 1,
+                                                                         'error': str(e)}})
+                    return 'failed', attempt
+                delay = backoff_delay(attempt, base=self.backoff_base if rate_limited else self.backoff_base / 4,
+                                      rng=self.rng)
+                logger.warning("Trends request failed; backing off", extra={'fields': {
+                    'job': job['job_id'], 'attempt': attempt + 1, 'delay_s': round(delay, 1), 'error': str(e)}})
+                incr('trends.retries'); incr('trends.backoff_s', delay)
+                self.sleep(delay)
+                attempt += 1
+
+        if batch_data is None or batch_data.empty:
+            self.ledger.record(job['job_id'], 'empty', attempts=attempt + 1)
+            return 'empty', attempt
+        if 'isPartial' in batch_data.columns:
+            batch_data = batch_data.drop(columns=['isPartial'])
+        path = self.batch_path(job)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        batch_data.to_csv(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        self.ledger.record(job['job_id'], 'done', path=path, rows=len(batch_data), attempts=attempt + 1)
+        return 'done', attempt
+
+    def run(self, jobs):
+        """
+        Runs every job not already done in the ledger; returns a status count
+        summary. A job that raises is recorded as failed and the rest still run.
+        """
+        pending = [job for job in jobs if not self.ledger.is_done(job['job_id'])]
+        summary = {'total': len(jobs), 'skipped': len(jobs) - len(pending), 'done': 0, 'empty': 0,
+                   'failed': 0, 'retries': 0}
+        print(f"Scheduling {len(pending)} of {len(jobs)} Trends jobs ({summary['skipped']} already in ledger)...")
+        incr('trends.jobs.skipped', summary['skipped'])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._run_job, job): job for job in pending}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    status, retries = future.result()
+                except Exception as e:
+                    # Errors the retry loop does not handle (e.g. saving the batch) fail only this job
+                    self.ledger.record(job['job_id'], 'failed', error=str(e))
+                    logger.error("Trends job crashed", extra={'fields': {'job': job['job_id'], 'error': str(e)}})
+                    status, retries = 'failed', 0
+                summary[status] += 1
+                summary['retries'] += retries
+                incr(f'trends.jobs.{status}')
+                logger.info("Trends job finished", extra={'fields': {'job': job['job_id'], 'status': status,
+                                                                      'retries': retries, 'keywords': job['keywords']}})
+        return summary
+
+    def load_batches(self, jobs):
+        """Frames for the given jobs that finished with data, in job order."""
+        frames = []
+        for job in jobs:
+            entry = self.ledger.entries.get(job['job_id'], {})
+            if entry.get('status') == 'done' and os.path.exists(entry.get('path', '')):
+                frames.append(pd.read_csv(entry['path'], index_col=0, parse_dates=True))
+        return frames